@@ -0,0 +1,80 @@
+"""Compare the legacy character splitter with the token-aware chunker.
+
+    python -m benchmarks.chunking --docs 5000 --workers 0 --out chunking.json
+
+The token runs use --chunk-size/--chunk-overlap/--tokenizer whatever the
+configured defaults are.
+"""
+import argparse
+import json
+import statistics
+import time
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from benchmarks.corpus import make_corpus
+from rag import chunking
+from rag.tokens import count_tokens
+from config import settings
+
+
+def _legacy_split(docs):
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        separators=["\n\n", "\n", ". ", " ", ""],
+    )
+    return splitter.split_documents(docs)
+
+
+def _measure(name, fn, docs, token_limit):
+    start = time.perf_counter()
+    chunks = fn(docs)
+    elapsed = time.perf_counter() - start
+    sizes = [count_tokens(c.page_content, "cl100k_base") for c in chunks]
+    return {
+        "splitter": name,
+        "seconds": round(elapsed, 3),
+        "docs_per_s": round(len(docs) / elapsed, 1) if elapsed else None,
+        "chunks": len(chunks),
+        "chunks_per_s": round(len(chunks) / elapsed, 1) if elapsed else None,
+        "tokens_mean": round(statistics.mean(sizes), 1) if sizes else 0,
+        "tokens_max": max(sizes, default=0),
+        "over_limit": sum(1 for s in sizes if s > token_limit),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--sections", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=0, help="0 = one per CPU")
+    parser.add_argument("--token-limit", type=int, default=512, help="embedding model input limit")
+    parser.add_argument("--chunk-size", type=int, default=256, help="tokens")
+    parser.add_argument("--chunk-overlap", type=int, default=32, help="tokens")
+    parser.add_argument("--tokenizer", default="cl100k_base")
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    docs = make_corpus(args.docs, sections=args.sections)
+    results = [_measure("legacy-chars", _legacy_split, docs, args.token_limit)]
+
+    settings.chunk_size = args.chunk_size
+    settings.chunk_overlap = args.chunk_overlap
+    settings.chunk_tokenizer = args.tokenizer
+    settings.chunk_workers = 1
+    results.append(_measure("tokens-serial", chunking.chunk_documents, docs, args.token_limit))
+
+    settings.chunk_workers = args.workers
+    settings.chunk_parallel_min_chars = 0
+    chunking.chunk_documents(docs[:2])  # start the worker pool outside the timing
+    results.append(_measure("tokens-parallel", chunking.chunk_documents, docs, args.token_limit))
+    chunking.shutdown_chunk_workers()
+
+    report = {"benchmark": "chunking", "docs": len(docs), "results": results}
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
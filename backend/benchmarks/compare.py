@@ -0,0 +1,47 @@
+"""Diff two benchmarks.run result files.
+
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+import argparse
+import json
+
+
+def _delta(old, new) -> str:
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def _key(entry: dict) -> str:
+    config = entry["config"]
+    return f"{entry['mode']} rerank={config['use_reranking']} compress={config['use_compression']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        old = json.load(f)
+    with open(args.candidate) as f:
+        new = json.load(f)
+
+    print(f"baseline {old['meta'].get('commit')}  ->  candidate {new['meta'].get('commit')}")
+    for field in ("chunks_per_s", "docs_per_s"):
+        a, b = old["ingest"].get(field), new["ingest"].get(field)
+        print(f"ingest.{field:14s} {a!s:>10} -> {b!s:>10}  {_delta(a, b)}")
+    a, b = old["memory"]["peak_rss_mb"], new["memory"]["peak_rss_mb"]
+    print(f"memory.peak_rss_mb    {a!s:>10} -> {b!s:>10}  {_delta(a, b)}")
+
+    baseline = {_key(e): e for e in old["retrieval"]}
+    for entry in new["retrieval"]:
+        before = baseline.get(_key(entry))
+        if before is None:
+            continue
+        print(f"{_key(entry):42s} p95 {before['p95_ms']:8.1f} -> {entry['p95_ms']:8.1f} ms  {_delta(before['p95_ms'], entry['p95_ms'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Deterministic synthetic corpora for offline benchmarks."""
+import random
+from langchain_core.documents import Document
+
+_WORDS = (
+    "retrieval embedding vector index latency throughput chunk token model "
+    "document query answer context provider cache shard replica ingestion "
+    "pipeline rerank score recall precision budget window stream batch "
+    "summary table heading page section report quarter revenue policy "
+    "customer contract invoice region product release incident metric"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(_WORDS, k=rng.randint(8, 20))
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(3, 8)))
+
+
+def _table(rng: random.Random) -> str:
+    rows = ["| id | name | value |", "| --- | --- | --- |"]
+    for i in range(rng.randint(3, 12)):
+        rows.append(f"| {i} | {rng.choice(_WORDS)} | {rng.randint(0, 10_000)} |")
+    return "\n".join(rows)
+
+
+def make_document(index: int, sections: int = 6, seed: int = 0) -> Document:
+    rng = random.Random(seed * 1_000_003 + index)
+    parts = [f"# Document {index}"]
+    for s in range(sections):
+        parts.append(f"## Section {s}: {rng.choice(_WORDS)} {rng.choice(_WORDS)}")
+        parts.append(_paragraph(rng))
+        if rng.random() < 0.3:
+            parts.append(_table(rng))
+        parts.append(_paragraph(rng))
+    return Document(
+        page_content="\n\n".join(parts),
+        metadata={"source_file": f"synthetic-{index}.md", "doc_id": f"synthetic-{index}"},
+    )
+
+
+def make_corpus(n_docs: int, sections: int = 6, seed: int = 0) -> list[Document]:
+    return [make_document(i, sections=sections, seed=seed) for i in range(n_docs)]
+
+
+def make_queries(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed + 7)
+    return [" ".join(rng.choices(_WORDS, k=rng.randint(4, 9))) + "?" for _ in range(n)]
@@ -0,0 +1,95 @@
+"""Time to first token with and without hedging, on stub providers with injected tails and failures.
+
+    python -m benchmarks.hedging --requests 300 --tail-rate 0.05 --failure-rate 0.02
+    python -m benchmarks.hedging --hedge-delay-ms 400 --out hedging.json
+
+Two stub providers are registered: "primary" (fast, with a slow tail and
+failures) and "secondary" (slower but steady). Each run sends the same
+prompts through providers.hedging.hedged_stream, first with only the
+primary configured, then with both. The report has first-token latency,
+error rate and how often each provider won.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+
+async def _run(n: int, concurrency: int) -> tuple[list[float], int]:
+    from langchain_core.messages import HumanMessage
+    from providers.hedging import hedged_stream
+
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            stream = hedged_stream([HumanMessage(content=f"question {i}")])
+            try:
+                async for _ in stream:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    break
+            except Exception:
+                errors += 1
+            finally:
+                await stream.aclose()
+
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--primary-ms", type=float, default=150)
+    parser.add_argument("--secondary-ms", type=float, default=400)
+    parser.add_argument("--tail-rate", type=float, default=0.05)
+    parser.add_argument("--tail-ms", type=float, default=3000)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--hedge-delay-ms", type=int, default=0, help="0 = adaptive (observed p95)")
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    os.environ["LLM_PROVIDER"] = "primary"
+
+    from benchmarks.metrics import latency_summary, run_metadata
+    from benchmarks.stubs import register_stub_providers
+    from config import settings
+    from providers import hedging
+
+    register_stub_providers(
+        "primary", first_token_ms=args.primary_ms, inter_token_ms=0, response_tokens=5,
+        tail_rate=args.tail_rate, tail_first_token_ms=args.tail_ms, failure_rate=args.failure_rate,
+    )
+    register_stub_providers("secondary", first_token_ms=args.secondary_ms, inter_token_ms=0, response_tokens=5)
+    settings.hedge_delay_ms = args.hedge_delay_ms
+    settings.hedge_auto_reorder = True
+
+    report = {"meta": run_metadata(args=vars(args)), "runs": []}
+    for label, providers in (("primary only", ["primary"]), ("hedged", ["primary", "secondary"])):
+        settings.hedge_providers = providers
+        hedging._health.clear()
+        latencies, errors = asyncio.run(_run(args.requests, args.concurrency))
+        entry = {
+            "mode": label,
+            "first_token": latency_summary(latencies),
+            "error_rate": round(errors / args.requests, 4),
+            "providers": hedging.health_snapshot()["providers"],
+        }
+        report["runs"].append(entry)
+        wins = {name: stats["wins"] for name, stats in entry["providers"].items()}
+        print(f"{label:13s} p50={entry['first_token']['p50_ms']:7.1f}ms p95={entry['first_token']['p95_ms']:7.1f}ms "
+              f"p99={entry['first_token']['p99_ms']:7.1f}ms errors={entry['error_rate']:.3f} wins={wins}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Query-embedding latency and provider requests with caching and micro-batching.
+
+    python -m benchmarks.query_embeddings --users 32 --queries 20 --embed-ms 40 --out qemb.json
+
+Each simulated user embeds a stream of questions drawn with a skew from a
+shared pool, all users at once, against a stub embedding endpoint that
+takes --embed-ms per request whatever its batch size (as a remote call
+does). "requests" is the number of calls that reached the endpoint.
+"""
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CONFIGS = {
+    "plain": {"embedding_cache_size": 0, "embedding_batch_window_ms": 0},
+    "cache": {"embedding_batch_window_ms": 0},
+    "batch": {"embedding_cache_size": 0},
+    "cache+batch": {},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=20, help="per user")
+    parser.add_argument("--pool", type=int, default=200, help="distinct questions")
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--embed-ms", type=float, default=40.0)
+    parser.add_argument("--window-ms", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    from benchmarks.corpus import make_queries
+    from benchmarks.metrics import Timer, latency_summary, run_metadata
+    from benchmarks.stubs import register_stub_providers, stub_config
+    from config import settings
+    from providers import query_embeddings
+    from providers.factory import get_embeddings
+
+    register_stub_providers()
+    settings.llm_provider = "stub"
+    stub_config.embed_latency_ms = args.embed_ms
+    defaults = {key: getattr(settings, key) for key in ("embedding_cache_size", "embedding_batch_window_ms")}
+    defaults["embedding_batch_window_ms"] = args.window_ms
+
+    pool = make_queries(args.pool, seed=args.seed)
+    weights = [1 / (rank + 1) ** args.skew for rank in range(len(pool))]
+    rng = random.Random(args.seed)
+    streams = [rng.choices(pool, weights=weights, k=args.queries) for _ in range(args.users)]
+
+    def user(stream: list[str]) -> list[float]:
+        samples = []
+        for question in stream:
+            with Timer() as t:
+                get_embeddings().embed_query(question)
+            samples.append(t.ms)
+        return samples
+
+    report = {"meta": run_metadata(args=vars(args)), "runs": []}
+    for label, overrides in CONFIGS.items():
+        for key, value in {**defaults, **overrides}.items():
+            setattr(settings, key, value)
+        query_embeddings._models.clear()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as pool_:
+            samples = [ms for user_samples in pool_.map(user, streams) for ms in user_samples]
+        elapsed = time.perf_counter() - started
+        stats = next(iter(query_embeddings.query_embedding_stats().values()))
+        run = {
+            "config": label,
+            "latency": latency_summary(samples),
+            "queries_per_s": round(len(samples) / elapsed, 1),
+            **stats,
+        }
+        report["runs"].append(run)
+        print(f"{label:12s} p50={run['latency']['p50_ms']:7.2f}ms p95={run['latency']['p95_ms']:7.2f}ms "
+              f"requests={run['requests']:5d} avg_batch={run['avg_batch'] or 0:5.2f} "
+              f"hit_rate={run['hit_rate'] or 0:.3f} qps={run['queries_per_s']}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
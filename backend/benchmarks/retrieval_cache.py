@@ -0,0 +1,88 @@
+"""Retrieval latency and hit rate with and without the retrieval result cache.
+
+    python -m benchmarks.retrieval_cache --docs 300 --questions 40 --queries 400 --out cache.json
+
+The workload draws from a fixed pool of distinct questions with a skewed
+(Zipf-like) distribution, the way dashboards and multi-query sub-queries
+repeat the same standalone question. Halfway through the cached pass the
+corpus generation is bumped, as an ingest would, so the run includes the
+cold misses that follow a write.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+
+def _workload(pool: list[str], n: int, skew: float, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** skew for rank in range(len(pool))]
+    return rng.choices(pool, weights=weights, k=n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=40, help="distinct questions in the pool")
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--rerank", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--hybrid", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="keep storage here instead of a temp dir")
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ragforge-cache-")
+    os.environ["CHROMA_PERSIST_DIR"] = os.path.join(workdir, "chromadb")
+    os.environ["SQLITE_DB_PATH"] = os.path.join(workdir, "ragforge.db")
+    os.environ["LLM_PROVIDER"] = "stub"
+
+    from benchmarks.corpus import make_corpus, make_queries
+    from benchmarks.metrics import Timer, latency_summary, run_metadata
+    from benchmarks.stubs import install_stub_reranker, register_stub_providers
+    from config import settings
+    from ingestion.processor import process_documents
+    from rag.cache import retrieval_cache
+    from rag.engine import rag_engine
+
+    register_stub_providers()
+    install_stub_reranker()
+    settings.use_reranking = args.rerank
+    settings.use_hybrid_search = args.hybrid
+
+    docs = make_corpus(args.docs, seed=args.seed)
+    print(f"Ingesting {len(docs)} documents...")
+    chunks = sum(process_documents([doc], doc.metadata["doc_id"]) for doc in docs)
+
+    workload = _workload(make_queries(args.questions, seed=args.seed), args.queries, args.skew, args.seed)
+    report = {"meta": run_metadata(args=vars(args), workdir=workdir), "chunks": chunks}
+
+    for label, size in (("uncached", 0), ("cached", 1024)):
+        settings.retrieval_cache_size = size
+        retrieval_cache.invalidate()
+        retrieval_cache.hits = retrieval_cache.disk_hits = retrieval_cache.misses = 0
+        samples = []
+        for i, question in enumerate(workload):
+            if size and i == len(workload) // 2:
+                retrieval_cache.invalidate()  # what every ingest or delete does
+            with Timer() as t:
+                rag_engine._retrieve(question)
+            samples.append(t.ms)
+        report[label] = {"latency": latency_summary(samples)}
+        if size:
+            report[label]["cache"] = retrieval_cache.stats()
+        print(f"{label:9s} p50={report[label]['latency']['p50_ms']:7.2f}ms "
+              f"p95={report[label]['latency']['p95_ms']:7.2f}ms "
+              f"mean={report[label]['latency']['mean_ms']:7.2f}ms"
+              + (f"  hit rate={retrieval_cache.stats()['hit_rate']:.3f}" if size else ""))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
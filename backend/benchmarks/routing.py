@@ -0,0 +1,123 @@
+"""Compare document-routed (two-stage) retrieval with single-stage chunk search.
+
+    python -m benchmarks.routing --docs 2000 --top-docs 1,2,5,10 --out routing.json
+
+Each synthetic document gets a handful of words of its own, and every query
+mixes those with a few words from one of its sentences, so each question
+concerns a single document. Recall@k is the overlap of the routed results with the single-stage
+results; "source_hit" is how often a chunk of the query's own document was found.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+
+def _topical_corpus(n_docs: int, seed: int):
+    from benchmarks.corpus import make_corpus
+
+    rng = random.Random(seed)
+    docs = make_corpus(n_docs, seed=seed)
+    for i, doc in enumerate(docs):
+        topic = [f"topic{i}w{j}" for j in range(6)]
+        sentences = doc.page_content.split(". ")
+        doc.page_content = ". ".join(f"{s} {' '.join(rng.sample(topic, 3))}" for s in sentences)
+    return docs
+
+
+def _queries(docs, n: int, seed: int) -> list[tuple[str, str]]:
+    rng = random.Random(seed + 1)
+    queries = []
+    for _ in range(n):
+        doc = rng.choice(docs)
+        words = rng.choice([s for s in doc.page_content.split(". ") if "topic" in s]).split()
+        generic = [w for w in words if not w.startswith("topic")]
+        topical = [w for w in words if w.startswith("topic")]
+        question = rng.sample(generic, min(5, len(generic))) + topical
+        queries.append((" ".join(question) + "?", doc.metadata["doc_id"]))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-docs", default="1,2,5,10")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--vector-backend", choices=["chroma", "local"], default="local")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="keep storage here instead of a temp dir")
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ragforge-routing-")
+    os.environ["CHROMA_PERSIST_DIR"] = os.path.join(workdir, "chromadb")
+    os.environ["LOCAL_VECTOR_DIR"] = os.path.join(workdir, "vectors")
+    os.environ["SQLITE_DB_PATH"] = os.path.join(workdir, "ragforge.db")
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["VECTOR_BACKEND"] = args.vector_backend
+
+    from benchmarks.metrics import latency_summary, run_metadata
+    from benchmarks.stubs import register_stub_providers
+    from config import settings
+    from ingestion.processor import process_documents
+    from rag.retrieval import routed_retrieve
+    from vectorstore.chroma import get_index_embeddings, similarity_search_by_vectors
+
+    register_stub_providers()
+    settings.retrieval_top_k = args.k
+
+    docs = _topical_corpus(args.docs, args.seed)
+    print(f"Ingesting {len(docs)} documents ({args.vector_backend} backend)...")
+    started = time.perf_counter()
+    chunks = sum(process_documents([doc], doc.metadata["doc_id"]) for doc in docs)
+    print(f"  {chunks} chunks in {time.perf_counter() - started:.1f}s")
+
+    queries = _queries(docs, args.queries, args.seed)
+    vectors = get_index_embeddings().embed_queries([q for q, _ in queries])
+
+    baseline, latencies = [], []
+    for vector in vectors:
+        started = time.perf_counter()
+        results = similarity_search_by_vectors([vector], args.k)[0]
+        latencies.append((time.perf_counter() - started) * 1000)
+        baseline.append({doc.metadata["chunk_id"] for doc, _ in results})
+    report = {
+        "meta": run_metadata(args=vars(args), workdir=workdir),
+        "chunks": chunks,
+        "single_stage": {"latency": latency_summary(latencies)},
+        "routed": [],
+    }
+    print(f"single-stage            p50={report['single_stage']['latency']['p50_ms']:7.2f}ms "
+          f"p95={report['single_stage']['latency']['p95_ms']:7.2f}ms")
+
+    for top_docs in [int(x) for x in args.top_docs.split(",") if x.strip()]:
+        settings.routing_top_docs = top_docs
+        latencies, overlap, hits = [], 0, 0
+        for vector, expected, (_, source_doc) in zip(vectors, baseline, queries):
+            started = time.perf_counter()
+            found = routed_retrieve([vector])[0]
+            latencies.append((time.perf_counter() - started) * 1000)
+            overlap += len(expected & {doc.metadata["chunk_id"] for doc in found}) / max(len(expected), 1)
+            hits += any(doc.metadata["doc_id"] == source_doc for doc in found)
+        entry = {
+            "top_docs": top_docs,
+            "recall_vs_single_stage": round(overlap / len(queries), 4),
+            "source_hit": round(hits / len(queries), 4),
+            "latency": latency_summary(latencies),
+        }
+        report["routed"].append(entry)
+        print(f"routed top_docs={top_docs:4d}   p50={entry['latency']['p50_ms']:7.2f}ms "
+              f"p95={entry['latency']['p95_ms']:7.2f}ms  recall@{args.k}={entry['recall_vs_single_stage']:.3f}  "
+              f"source-doc hit={entry['source_hit']:.3f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
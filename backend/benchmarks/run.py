@@ -0,0 +1,147 @@
+"""Offline backend benchmark using the deterministic stub providers.
+
+    python -m benchmarks.run --docs 500 --queries 50 --out bench.json
+    python -m benchmarks.compare before.json after.json
+
+Measures ingestion throughput, retrieval latency for every pipeline toggle
+combination and the process memory high-water mark. Nothing is sent to a
+real provider; storage goes to a throwaway directory unless --workdir is set.
+"""
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import tracemalloc
+
+RETRIEVAL_MODES = {
+    "vector": {},
+    "hybrid": {"use_hybrid_search": True},
+    "multi_query": {"use_multi_query": True},
+    "hyde": {"use_hyde": True},
+}
+
+TOGGLES = ["use_hybrid_search", "use_multi_query", "use_hyde", "use_reranking", "use_compression"]
+
+
+def _pipeline_configs():
+    for mode, (rerank, compress) in itertools.product(RETRIEVAL_MODES, itertools.product([False, True], repeat=2)):
+        config = {toggle: False for toggle in TOGGLES}
+        config.update(RETRIEVAL_MODES[mode])
+        config["use_reranking"] = rerank
+        config["use_compression"] = compress
+        yield mode, config
+
+
+def _ingest(docs, batch_size):
+    from benchmarks.metrics import Timer
+    from rag.chunking import chunk_documents
+    from vectorstore.chroma import get_vectorstore
+
+    chunk_s = index_s = 0.0
+    n_chunks = 0
+    vectorstore = get_vectorstore()
+    for start in range(0, len(docs), batch_size):
+        batch = docs[start:start + batch_size]
+        with Timer() as t:
+            chunks = chunk_documents(batch)
+        chunk_s += t.elapsed
+        with Timer() as t:
+            vectorstore.add_documents(chunks)
+        index_s += t.elapsed
+        n_chunks += len(chunks)
+
+    total = chunk_s + index_s
+    return {
+        "docs": len(docs),
+        "chunks": n_chunks,
+        "chunk_seconds": round(chunk_s, 3),
+        "index_seconds": round(index_s, 3),
+        "chunks_per_s": round(n_chunks / total, 1) if total else None,
+        "docs_per_s": round(len(docs) / total, 1) if total else None,
+    }
+
+
+def _retrieval(queries, warmup):
+    from benchmarks.metrics import Timer, latency_summary
+    from rag.engine import rag_engine
+    from config import settings
+
+    results = []
+    for mode, config in _pipeline_configs():
+        for key, value in config.items():
+            setattr(settings, key, value)
+        for q in queries[:warmup]:
+            rag_engine._retrieve(q)
+        samples = []
+        for q in queries:
+            with Timer() as t:
+                rag_engine._retrieve(q)
+            samples.append(t.ms)
+        results.append({"mode": mode, "config": config, **latency_summary(samples)})
+        print(f"  {mode:12s} rerank={config['use_reranking']!s:5s} compress={config['use_compression']!s:5s} "
+              f"p50={results[-1]['p50_ms']:.1f}ms p95={results[-1]['p95_ms']:.1f}ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=50, help="documents per ingest batch")
+    parser.add_argument("--ttft-ms", type=float, default=0.0, help="stub LLM first-token latency")
+    parser.add_argument("--vector-backend", choices=["chroma", "local"], default="chroma")
+    parser.add_argument("--local-hnsw", action="store_true", help="local backend: search an HNSW graph")
+    parser.add_argument("--workdir", help="keep storage here instead of a temp dir")
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ragforge-bench-")
+    # Storage paths are read at import time, so set them before importing the app
+    os.environ["CHROMA_PERSIST_DIR"] = os.path.join(workdir, "chromadb")
+    os.environ["SQLITE_DB_PATH"] = os.path.join(workdir, "ragforge.db")
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["VECTOR_BACKEND"] = args.vector_backend
+    os.environ["LOCAL_VECTOR_DIR"] = os.path.join(workdir, "vectors")
+    os.environ["LOCAL_USE_HNSW"] = str(args.local_hnsw).lower()
+    # Queries repeat across warm-up and timed passes; time the pipeline, not the result cache
+    os.environ["RETRIEVAL_CACHE_SIZE"] = "0"
+
+    from benchmarks.corpus import make_corpus, make_queries
+    from benchmarks.metrics import peak_rss_mb, run_metadata
+    from benchmarks.stubs import register_stub_providers, install_stub_reranker, stub_config
+    from config import settings
+
+    register_stub_providers()
+    install_stub_reranker()
+    settings.llm_provider = "stub"
+    stub_config.first_token_ms = args.ttft_ms
+    stub_config.inter_token_ms = 0.0
+
+    tracemalloc.start()
+    report = {"meta": run_metadata(args=vars(args), workdir=workdir)}
+
+    print(f"Ingesting {args.docs} synthetic documents...")
+    report["ingest"] = _ingest(make_corpus(args.docs, sections=args.sections), args.batch_size)
+    report["memory_after_ingest"] = {"peak_rss_mb": peak_rss_mb()}
+
+    print(f"Retrieval latency over {args.queries} queries per configuration...")
+    report["retrieval"] = _retrieval(make_queries(args.queries), args.warmup)
+
+    _, traced_peak = tracemalloc.get_traced_memory()
+    report["memory"] = {
+        "peak_rss_mb": peak_rss_mb(),
+        "python_heap_peak_mb": round(traced_peak / (1024 * 1024), 1),
+    }
+
+    print(json.dumps({k: report[k] for k in ("ingest", "memory")}, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Run the backend against the stub providers with a synthetic corpus.
+
+    python -m benchmarks.serve_stub --port 8765 --docs 200 --ttft-ms 300
+"""
+import argparse
+import os
+import tempfile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--itl-ms", type=float, default=20.0)
+    parser.add_argument("--response-tokens", type=int, default=80)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--workdir", help="keep storage here instead of a temp dir")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ragforge-stub-")
+    os.environ["CHROMA_PERSIST_DIR"] = os.path.join(workdir, "chromadb")
+    os.environ["SQLITE_DB_PATH"] = os.path.join(workdir, "ragforge.db")
+    os.environ["LLM_PROVIDER"] = "stub"
+
+    import uvicorn
+    from benchmarks.corpus import make_corpus
+    from benchmarks.stubs import register_stub_providers, install_stub_reranker, stub_config
+    from rag.chunking import chunk_documents
+    from vectorstore.chroma import get_vectorstore
+
+    register_stub_providers()
+    install_stub_reranker()
+    stub_config.first_token_ms = args.ttft_ms
+    stub_config.inter_token_ms = args.itl_ms
+    stub_config.response_tokens = args.response_tokens
+    stub_config.failure_rate = args.failure_rate
+
+    vectorstore = get_vectorstore()
+    if args.docs and not vectorstore.get(limit=1)["ids"]:
+        vectorstore.add_documents(chunk_documents(make_corpus(args.docs)))
+
+    from main import app
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Startup profile: import time per module, and time until the server is alive and warm.
+
+    python -m benchmarks.startup --top 25
+    python -m benchmarks.startup --runs 5 --serve --out startup.json
+
+Imports are measured with `python -X importtime -c "import main"` in fresh
+processes (median over --runs). The report lists modules by cumulative time
+(module plus everything it imported first) and top-level packages by total
+self time. --serve also starts uvicorn with the current environment and
+times /api/health (alive) and /api/ready (warm), including the warm-up steps.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from benchmarks.metrics import run_metadata
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def profile_imports(module: str = "main") -> dict[str, tuple[int, int]]:
+    """{module: (self_us, cumulative_us)} for one fresh interpreter importing module."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    timings = {}
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            timings[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return timings
+
+
+def _median_timings(runs: list[dict[str, tuple[int, int]]]) -> dict[str, tuple[float, float]]:
+    names = set().union(*runs)
+    return {
+        name: (
+            statistics.median(run[name][0] for run in runs if name in run),
+            statistics.median(run[name][1] for run in runs if name in run),
+        )
+        for name in names
+    }
+
+
+def _time_server(port: int, timeout: float) -> dict:
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    result = {"alive_ms": None, "ready_ms": None, "warmup": None}
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            path = "/api/health" if result["alive_ms"] is None else "/api/ready"
+            try:
+                with urllib.request.urlopen(base + path, timeout=2) as resp:
+                    body = json.load(resp)
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.02)
+                continue
+            elapsed = round((time.perf_counter() - started) * 1000, 1)
+            if result["alive_ms"] is None:
+                result["alive_ms"] = elapsed
+            else:
+                result["ready_ms"] = elapsed
+                result["warmup"] = body
+                break
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--serve", action="store_true", help="also time alive/ready for a real server")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    timings = _median_timings([profile_imports(args.module) for _ in range(args.runs)])
+    total_ms = timings[args.module][1] / 1000
+    print(f"import {args.module}: {total_ms:.1f}ms (median of {args.runs})")
+
+    by_cumulative = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    print(f"\nTop {args.top} modules by cumulative import time")
+    for name, (self_us, cumulative_us) in by_cumulative:
+        print(f"  {cumulative_us / 1000:9.1f}ms  {self_us / 1000:8.1f}ms self  {name}")
+
+    packages: dict[str, float] = {}
+    for name, (self_us, _) in timings.items():
+        top = name.split(".")[0]
+        packages[top] = packages.get(top, 0.0) + self_us
+    by_package = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    print(f"\nTop {args.top} packages by total self time")
+    for name, self_us in by_package:
+        print(f"  {self_us / 1000:9.1f}ms  {name}")
+
+    report = {
+        "meta": run_metadata(args=vars(args)),
+        "import_ms": round(total_ms, 1),
+        "modules": [
+            {"module": name, "cumulative_ms": round(c / 1000, 2), "self_ms": round(s / 1000, 2)}
+            for name, (s, c) in by_cumulative
+        ],
+        "packages": [{"package": name, "self_ms": round(s / 1000, 2)} for name, s in by_package],
+    }
+
+    if args.serve:
+        report["server"] = _time_server(args.port, args.timeout)
+        server = report["server"]
+        print(f"\nServer alive after {server['alive_ms']}ms, ready after {server['ready_ms']}ms")
+        for step, info in ((server["warmup"] or {}).get("steps") or {}).items():
+            print(f"  {step:12s} {info.get('ms', 0):9.1f}ms  {info['status']}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Deterministic local stand-ins for the embedding, LLM and reranker providers.
+
+    from benchmarks.stubs import register_stub_providers
+    register_stub_providers()          # adds "stub" to providers.factory._PROVIDERS
+    settings.llm_provider = "stub"
+"""
+import asyncio
+import hashlib
+import math
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterator
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from providers.base import LLMProvider, EmbeddingProvider
+
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class StubConfig:
+    dimensions: int = 384
+    embed_latency_ms: float = 0.0  # per embedding call
+    first_token_ms: float = 200.0
+    inter_token_ms: float = 15.0
+    response_tokens: int = 120
+    failure_rate: float = 0.0  # probability a call raises before the first token
+    tail_rate: float = 0.0  # probability a call's first token takes tail_first_token_ms instead
+    tail_first_token_ms: float = 3000.0
+    seed: int = 0
+
+
+stub_config = StubConfig()
+
+
+class StubProviderError(RuntimeError):
+    pass
+
+
+class HashEmbeddings(Embeddings):
+    """Feature-hashed bag of words: texts sharing words get similar vectors."""
+
+    def __init__(self, dimensions: int | None = None):
+        self.dimensions = dimensions or stub_config.dimensions
+
+    def _embed(self, text: str) -> list[float]:
+        vec = [0.0] * self.dimensions
+        for word in _WORD.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vec[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+        return [x / norm for x in vec]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if stub_config.embed_latency_ms:
+            time.sleep(stub_config.embed_latency_ms / 1000)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+class StubChatModel(BaseChatModel):
+    """Streams a canned answer with configurable first-token and inter-token latency."""
+
+    name_tag: str = "stub"
+    first_token_ms: float | None = None
+    inter_token_ms: float | None = None
+    response_tokens: int | None = None
+    failure_rate: float | None = None
+    tail_rate: float | None = None
+    tail_first_token_ms: float | None = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _setting(self, field: str):
+        value = getattr(self, field)
+        return getattr(stub_config, field) if value is None else value
+
+    def _tokens(self, messages: list[BaseMessage]) -> list[str]:
+        prompt = " ".join(str(m.content) for m in messages)
+        digest = hashlib.sha256(prompt.encode()).digest()
+        rng = random.Random(int.from_bytes(digest[:8], "little") ^ stub_config.seed)
+        words = _WORD.findall(prompt) or ["stub"]
+        return [rng.choice(words) + " " for _ in range(self._setting("response_tokens"))]
+
+    def _maybe_fail(self, messages: list[BaseMessage]):
+        rate = self._setting("failure_rate")
+        if rate and random.random() < rate:
+            raise StubProviderError(f"{self.name_tag}: injected failure")
+
+    def _first_token_s(self) -> float:
+        tail = self._setting("tail_rate")
+        if tail and random.random() < tail:
+            return self._setting("tail_first_token_ms") / 1000
+        return self._setting("first_token_ms") / 1000
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self._maybe_fail(messages)
+        tokens = self._tokens(messages)
+        time.sleep(self._first_token_s() + self._setting("inter_token_ms") * len(tokens) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self._maybe_fail(messages)
+        time.sleep(self._first_token_s())
+        for i, token in enumerate(self._tokens(messages)):
+            if i:
+                time.sleep(self._setting("inter_token_ms") / 1000)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self._maybe_fail(messages)
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self._first_token_s() + self._setting("inter_token_ms") * len(tokens) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self._maybe_fail(messages)
+        await asyncio.sleep(self._first_token_s())
+        for i, token in enumerate(self._tokens(messages)):
+            if i:
+                await asyncio.sleep(self._setting("inter_token_ms") / 1000)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class StubReranker:
+    """CrossEncoder.predict look-alike scoring by word overlap."""
+
+    def predict(self, pairs, batch_size: int = 32, **kwargs):
+        scores = []
+        for query, text in pairs:
+            q = set(_WORD.findall(query.lower()))
+            t = set(_WORD.findall(text.lower()))
+            scores.append(len(q & t) / (len(q) or 1))
+        return scores
+
+
+class StubLLMProvider(LLMProvider):
+    # StubChatModel fields (latency, failures) for providers registered with overrides
+    overrides: dict = {}
+
+    def get_llm(self):
+        return StubChatModel(**self.overrides)
+
+    def get_streaming_llm(self):
+        return StubChatModel(**self.overrides)
+
+
+class StubEmbeddingProvider(EmbeddingProvider):
+    def get_embeddings(self):
+        return HashEmbeddings()
+
+    def get_model_name(self):
+        return f"hash-{stub_config.dimensions}"
+
+
+def register_stub_providers(name: str = "stub", **llm_overrides):
+    """Register a stub provider; keyword arguments set its own StubChatModel latency/failure fields.
+
+        register_stub_providers("flaky", failure_rate=0.2, tail_rate=0.05)
+    """
+    from providers import factory
+    llm_cls = StubLLMProvider
+    if llm_overrides:
+        llm_cls = type(f"StubLLMProvider_{name}", (StubLLMProvider,), {"overrides": {"name_tag": name, **llm_overrides}})
+    factory._PROVIDERS[name] = (llm_cls, StubEmbeddingProvider)
+
+
+def install_stub_reranker():
+    from rag import reranking
+    reranking._reranker = StubReranker()
@@ -0,0 +1,92 @@
+"""Row-per-document CSV loading versus packed row blocks.
+
+    python -m benchmarks.tabular --rows 200000 --out tabular.json
+
+Generates a CSV, then loads and chunks it with LangChain's CSVLoader (one
+document per row, the previous path) and with TabularLoader. "requests" is
+the number of embedding calls at embedding_request_batch texts per call;
+peak_mb is the Python heap high-water mark while loading and chunking.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import tempfile
+import tracemalloc
+from benchmarks.metrics import Timer, run_metadata
+from config import settings
+from rag.chunking import chunk_documents
+from rag.tokens import count_tokens
+
+_WORDS = "alpha beta gamma delta north south east west widget gadget invoice refund pending shipped".split()
+
+
+def make_csv(path: str, rows: int, seed: int):
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["order_id", "customer", "region", "product", "quantity", "unit_price", "status", "notes"])
+        for i in range(rows):
+            writer.writerow([
+                100000 + i, f"customer-{rng.randrange(5000)}", rng.choice(_WORDS[4:8]), rng.choice(_WORDS[8:10]),
+                rng.randrange(1, 50), f"{rng.uniform(1, 500):.2f}", rng.choice(_WORDS[10:]),
+                " ".join(rng.choices(_WORDS, k=rng.randrange(0, 8))),
+            ])
+
+
+def _measure(label: str, loader_cls, path: str) -> dict:
+    tracemalloc.start()
+    with Timer() as t:
+        chunks = chunk_documents(loader_cls(path).load())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tokens = sum(count_tokens(chunk.page_content, "cl100k_base") for chunk in chunks)
+    return {
+        "loader": label,
+        "seconds": round(t.elapsed, 2),
+        "chunks": len(chunks),
+        "requests": math.ceil(len(chunks) / max(1, settings.embedding_request_batch)),
+        "tokens_embedded": tokens,
+        "peak_mb": round(peak / 1024 / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-csvloader", action="store_true", help="only measure the row-block path")
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    from langchain_community.document_loaders import CSVLoader
+    from ingestion.tabular import TabularLoader
+
+    # Chunking runs in-process so tracemalloc sees all of it
+    settings.chunk_workers = 1
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        make_csv(path, args.rows, args.seed)
+        report = {"meta": run_metadata(args=vars(args), chunk_size=settings.chunk_size), "runs": []}
+        loaders = [("row blocks", TabularLoader)]
+        if not args.skip_csvloader:
+            loaders.insert(0, ("CSVLoader", CSVLoader))
+        for label, loader_cls in loaders:
+            run = _measure(label, loader_cls, path)
+            report["runs"].append(run)
+            print(f"{label:10s} chunks={run['chunks']:7d} requests={run['requests']:5d} "
+                  f"tokens={run['tokens_embedded']:9d} peak={run['peak_mb']:7.1f}MB time={run['seconds']}s")
+    finally:
+        os.unlink(path)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
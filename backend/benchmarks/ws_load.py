@@ -0,0 +1,170 @@
+"""WebSocket chat load generator measuring time-to-first-token per concurrency level.
+
+    python -m benchmarks.ws_load --levels 1,4,16,64 --out ws.json
+    python -m benchmarks.ws_load --url http://127.0.0.1:8000 --script convs.json
+
+Without --url a stub-provider backend is started locally (benchmarks.serve_stub).
+A script is a JSON list of conversations, each a list of user messages; every
+session replays one conversation turn by turn on its own socket.
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import urllib.request
+import websockets
+from benchmarks.corpus import make_queries
+from benchmarks.metrics import latency_summary, run_metadata
+
+
+def _default_script(conversations: int, turns: int) -> list[list[str]]:
+    queries = make_queries(conversations * turns)
+    return [queries[i * turns:(i + 1) * turns] for i in range(conversations)]
+
+
+def _create_conversation(base_url: str) -> str:
+    req = urllib.request.Request(
+        f"{base_url}/api/conversations",
+        data=json.dumps({"title": "load test"}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.load(resp)["id"]
+
+
+async def _run_session(base_url: str, ws_url: str, turns: list[str], timeout: float, stats: dict):
+    try:
+        conversation_id = await asyncio.to_thread(_create_conversation, base_url)
+        async with websockets.connect(f"{ws_url}/ws/chat/{conversation_id}", max_size=None) as ws:
+            for message in turns:
+                sent = time.perf_counter()
+                await ws.send(json.dumps({"message": message}))
+                first = last = None
+                while True:
+                    event = json.loads(await asyncio.wait_for(ws.recv(), timeout))
+                    now = time.perf_counter()
+                    if event.get("type") == "token":
+                        if first is None:
+                            first = now
+                            stats["ttft"].append((now - sent) * 1000)
+                        else:
+                            stats["itl"].append((now - last) * 1000)
+                        last = now
+                    elif event.get("type") == "error":
+                        raise RuntimeError(event.get("message", "server error"))
+                    elif event.get("type") == "done":
+                        break
+                stats["turn"].append((time.perf_counter() - sent) * 1000)
+                stats["turns_ok"] += 1
+    except Exception as exc:
+        stats["errors"] += 1
+        stats["error_samples"].append(repr(exc)[:200])
+
+
+async def _run_level(base_url, ws_url, script, concurrency, timeout) -> dict:
+    stats = {"ttft": [], "itl": [], "turn": [], "turns_ok": 0, "errors": 0, "error_samples": []}
+    sessions = [script[i % len(script)] for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(_run_session(base_url, ws_url, turns, timeout, stats) for turns in sessions))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "sessions": concurrency,
+        "turns_ok": stats["turns_ok"],
+        "session_errors": stats["errors"],
+        "error_rate": round(stats["errors"] / concurrency, 4),
+        "turns_per_s": round(stats["turns_ok"] / elapsed, 2) if elapsed else None,
+        "ttft": latency_summary(stats["ttft"]),
+        "inter_token": latency_summary(stats["itl"]),
+        "turn_time": latency_summary(stats["turn"]),
+        "error_samples": stats["error_samples"][:5],
+    }
+
+
+def _saturation(levels: list[dict], ttft_factor: float, max_error_rate: float) -> dict | None:
+    """First level whose p95 TTFT exceeds ttft_factor x the lowest level's, or whose errors exceed the limit."""
+    if not levels:
+        return None
+    baseline = levels[0]["ttft"]["p95_ms"]
+    for level in levels:
+        if level["error_rate"] > max_error_rate:
+            return {"concurrency": level["concurrency"], "reason": f"error rate {level['error_rate']:.1%}"}
+        if baseline and level["ttft"]["p95_ms"] > baseline * ttft_factor:
+            return {
+                "concurrency": level["concurrency"],
+                "reason": f"p95 TTFT {level['ttft']['p95_ms']:.0f}ms > {ttft_factor}x baseline {baseline:.0f}ms",
+            }
+    return None
+
+
+def _wait_for_server(base_url: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/api/health", timeout=2):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"backend at {base_url} did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running backend (must use a stub LLM)")
+    parser.add_argument("--port", type=int, default=8765, help="port for the locally started backend")
+    parser.add_argument("--levels", default="1,2,4,8,16,32,64")
+    parser.add_argument("--script", help="JSON file: list of conversations (lists of messages)")
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-event receive timeout (s)")
+    parser.add_argument("--ttft-factor", type=float, default=2.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--server-args", default="", help="extra args for benchmarks.serve_stub")
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    levels = [int(x) for x in args.levels.split(",") if x.strip()]
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    else:
+        script = _default_script(max(levels), args.turns)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.serve_stub", "--port", str(args.port), *args.server_args.split()]
+        )
+    ws_url = base_url.replace("http", "ws", 1)
+
+    try:
+        _wait_for_server(base_url)
+        results = []
+        for concurrency in levels:
+            result = asyncio.run(_run_level(base_url, ws_url, script, concurrency, args.timeout))
+            results.append(result)
+            print(
+                f"c={concurrency:4d}  ttft p50={result['ttft']['p50_ms']:7.1f} p95={result['ttft']['p95_ms']:7.1f}ms  "
+                f"itl p95={result['inter_token']['p95_ms']:6.1f}ms  turns/s={result['turns_per_s']}  "
+                f"errors={result['error_rate']:.1%}"
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    saturation = _saturation(results, args.ttft_factor, args.max_error_rate)
+    print(f"Saturation point: {saturation or 'not reached'}")
+    report = {"meta": run_metadata(args=vars(args)), "levels": results, "saturation": saturation}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Messages published to one channel, in order, as an async iterator.
+
+    Messages carry an id so a replayed message that also arrives live is
+    only delivered once. While the backlog is being replayed, live messages
+    are held back and queued after it.
+    """
+
+    def __init__(self, bus: "Bus", channel: str):
+        self.channel = channel
+        self._bus = bus
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._seen: set[str] = set()
+        self._held: list[tuple[str, object]] | None = None
+
+    def _deliver(self, message_id: str, data):
+        if self._held is not None:
+            self._held.append((message_id, data))
+        else:
+            self._put(message_id, data)
+
+    def _replay(self, history: list[tuple[str, object]]):
+        for message_id, data in history + (self._held or []):
+            self._put(message_id, data)
+        self._held = None
+
+    def _put(self, message_id: str, data):
+        if message_id not in self._seen:
+            self._seen.add(message_id)
+            self._queue.put_nowait(data)
+
+    async def get(self):
+        return await self._queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._queue.get()
+
+    def close(self):
+        self._bus._unsubscribe(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+class Bus(ABC):
+    """Pub/sub and a job queue shared by every worker process of a deployment.
+
+    The memory backend only reaches the current process; the SQLite backend
+    goes through a database file every worker on the host can open. A
+    Redis-compatible backend maps onto the same methods: publish/subscribe
+    to PUBLISH/SUBSCRIBE plus a capped list per channel for replay, and the
+    job queue to a list per state moved with LMOVE, with a key per
+    dedupe_key and a heartbeat timestamp per running job.
+    """
+
+    backend = "abstract"
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._subscriptions: dict[str, set[Subscription]] = {}
+
+    # Pub/sub
+
+    async def subscribe(self, channel: str, replay: bool = False) -> Subscription:
+        """Receive messages published to channel from now on (and, with replay, the retained backlog)."""
+        subscription = Subscription(self, channel)
+        # Registered before reading the backlog so nothing published meanwhile is lost
+        if replay:
+            subscription._held = []
+        self._subscriptions.setdefault(channel, set()).add(subscription)
+        if replay:
+            try:
+                history = await self._history(channel)
+            except BaseException:
+                subscription.close()
+                raise
+            subscription._replay(history)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscriptions.get(subscription.channel)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscriptions[subscription.channel]
+
+    def _deliver(self, channel: str, message_id: str, data):
+        for subscription in list(self._subscriptions.get(channel, ())):
+            subscription._deliver(message_id, data)
+
+    @abstractmethod
+    async def publish(self, channel: str, data):
+        """Send a JSON-serializable message to every subscriber of channel in any worker."""
+
+    @abstractmethod
+    async def _history(self, channel: str) -> list[tuple[str, object]]:
+        """Retained (message_id, data) pairs for channel, oldest first."""
+
+    # Jobs
+
+    @abstractmethod
+    async def enqueue(self, kind: str, payload: dict, dedupe_key: str | None = None) -> str | None:
+        """Queue a job for any worker; None if a job with dedupe_key is already queued or running."""
+
+    @abstractmethod
+    async def claim(self, timeout: float, kinds: tuple[str, ...] | None = None, exclude: tuple[str, ...] = ()) -> dict | None:
+        """Take the oldest queued job ({id, kind, payload, attempts}) of kinds (any) but not exclude, waiting up to timeout."""
+
+    @abstractmethod
+    async def heartbeat(self, job_id: str):
+        """Extend a running job's lease; jobs whose worker stops heartbeating are queued again."""
+
+    @abstractmethod
+    async def finish(self, job_id: str, error: str | None = None):
+        ...
+
+    @abstractmethod
+    async def release(self, job_id: str):
+        """Put a claimed job back in the queue (the worker is shutting down)."""
+
+    @abstractmethod
+    async def stats(self) -> dict:
+        ...
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
@@ -0,0 +1,169 @@
+import asyncio
+import contextvars
+import logging
+from bus.base import Bus, Subscription
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+INVALIDATE_CHANNEL = "invalidate"
+MAINTENANCE = "maintenance"
+
+_bus: Bus | None = None
+_job_handlers: dict[str, callable] = {}
+_job_pools: dict[str, str] = {}
+_invalidation_handlers: dict[str, list[callable]] = {}
+_current_worker: contextvars.ContextVar["BusWorker | None"] = contextvars.ContextVar("bus_worker", default=None)
+
+
+def get_bus() -> Bus:
+    global _bus
+    if _bus is None:
+        if settings.bus_backend == "sqlite":
+            from bus.sqlite import SQLiteBus
+            _bus = SQLiteBus()
+        else:
+            from bus.memory import MemoryBus
+            _bus = MemoryBus()
+    return _bus
+
+
+def job_handler(kind: str, pool: str = "default"):
+    """Register a coroutine function as the handler for jobs of this kind (called with the payload as kwargs).
+
+    Jobs in the MAINTENANCE pool run in bus_maintenance_concurrency slots of
+    their own, so a long re-index or bulk batch never holds up uploads.
+    """
+    def decorator(fn):
+        _job_handlers[kind] = fn
+        _job_pools[kind] = pool
+        return fn
+    return decorator
+
+
+async def dispatch(kind: str, dedupe_key: str | None = None, **payload) -> str | None:
+    """Queue a job for whichever worker is free; None if dedupe_key is already queued or running."""
+    return await get_bus().enqueue(kind, payload, dedupe_key=dedupe_key)
+
+
+async def publish(channel: str, data):
+    await get_bus().publish(channel, data)
+
+
+async def subscribe(channel: str, replay: bool = False) -> Subscription:
+    return await get_bus().subscribe(channel, replay=replay)
+
+
+def on_invalidate(scope: str):
+    """Register a function run in every worker when `scope` is invalidated (sync or async, called with the data)."""
+    def decorator(fn):
+        _invalidation_handlers.setdefault(scope, []).append(fn)
+        return fn
+    return decorator
+
+
+async def invalidate(scope: str, **data):
+    """Tell every worker, this one included, to drop state cached for scope."""
+    await publish(INVALIDATE_CHANNEL, {"scope": scope, **data})
+
+
+def worker_stopping() -> bool:
+    """True in a job cancelled because its worker is shutting down.
+
+    The job then goes back to the queue for another worker, so handlers
+    must leave its inputs, status and progress stream as they are instead
+    of cleaning up as after a failure.
+    """
+    worker = _current_worker.get()
+    return worker is not None and worker._stopping
+
+
+class BusWorker:
+    """Per-process side of the bus: runs queued jobs and applies invalidations."""
+
+    def __init__(self, bus: Bus | None = None):
+        self._bus = bus
+        self._tasks: list[asyncio.Task] = []
+        self._running_jobs: set[str] = set()
+        self._stopping = False
+
+    @property
+    def bus(self) -> Bus:
+        return self._bus or get_bus()
+
+    async def start(self):
+        bus = self.bus
+        await bus.start()
+        self._stopping = False
+        subscription = await bus.subscribe(INVALIDATE_CHANNEL)
+        self._tasks.append(asyncio.create_task(self._listen(subscription)))
+        maintenance = tuple(kind for kind, pool in _job_pools.items() if pool == MAINTENANCE)
+        for _ in range(max(1, settings.bus_job_concurrency)):
+            self._tasks.append(asyncio.create_task(self._work(exclude=maintenance)))
+        if maintenance:
+            for _ in range(max(1, settings.bus_maintenance_concurrency)):
+                self._tasks.append(asyncio.create_task(self._work(kinds=maintenance)))
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        bus = self.bus
+        # Jobs cut short here go back to the queue for another worker
+        for job_id in list(self._running_jobs):
+            await bus.release(job_id)
+        self._running_jobs.clear()
+        await bus.stop()
+
+    async def _listen(self, subscription: Subscription):
+        async for message in subscription:
+            for handler in _invalidation_handlers.get(message.get("scope"), []):
+                try:
+                    result = handler(message)
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception:
+                    logger.exception("Invalidation handler for %s failed", message.get("scope"))
+
+    async def _work(self, kinds: tuple[str, ...] | None = None, exclude: tuple[str, ...] = ()):
+        bus = self.bus
+        _current_worker.set(self)
+        while not self._stopping:
+            job = await bus.claim(timeout=1.0, kinds=kinds, exclude=exclude)
+            if job is None:
+                continue
+            self._running_jobs.add(job["id"])
+            handler = _job_handlers.get(job["kind"])
+            if handler is None:
+                logger.error("No handler for job kind %s", job["kind"])
+                self._running_jobs.discard(job["id"])
+                await bus.finish(job["id"], error=f"no handler for {job['kind']}")
+                continue
+            heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+            error = None
+            try:
+                await handler(**job["payload"])
+            except asyncio.CancelledError:
+                heartbeat.cancel()
+                raise
+            except Exception as exc:
+                logger.exception("Job %s (%s) failed", job["id"], job["kind"])
+                error = str(exc) or type(exc).__name__
+            heartbeat.cancel()
+            self._running_jobs.discard(job["id"])
+            await bus.finish(job["id"], error=error)
+
+    async def _heartbeat(self, job_id: str):
+        bus = self.bus
+        interval = max(settings.bus_job_lease_s / 3, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await bus.heartbeat(job_id)
+            except Exception:
+                logger.warning("Heartbeat for job %s failed", job_id)
+
+
+bus_worker = BusWorker()
@@ -0,0 +1,98 @@
+import asyncio
+import time
+import uuid
+from collections import deque
+from config import settings
+from bus.base import Bus
+
+
+class MemoryBus(Bus):
+    """Single-process bus: the behaviour of one uvicorn worker, with no shared state."""
+
+    backend = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self._retained: dict[str, deque] = {}
+        self._jobs: list[dict] = []
+        self._job_queued = asyncio.Event()
+        self._active_keys: dict[str, str] = {}
+        self._job_keys: dict[str, str] = {}
+        self._running: set[str] = set()
+        self._finished = 0
+        self._failed = 0
+
+    async def publish(self, channel: str, data):
+        message_id = uuid.uuid4().hex
+        now = time.monotonic()
+        retained = self._retained.setdefault(channel, deque(maxlen=settings.bus_replay_messages))
+        retained.append((now, message_id, data))
+        self._prune(now)
+        self._deliver(channel, message_id, data)
+
+    def _prune(self, now: float):
+        cutoff = now - settings.bus_retention_s
+        for channel in [c for c, messages in self._retained.items() if messages and messages[-1][0] < cutoff]:
+            del self._retained[channel]
+
+    async def _history(self, channel: str) -> list[tuple[str, object]]:
+        cutoff = time.monotonic() - settings.bus_retention_s
+        return [(mid, data) for ts, mid, data in self._retained.get(channel, ()) if ts >= cutoff]
+
+    async def enqueue(self, kind: str, payload: dict, dedupe_key: str | None = None) -> str | None:
+        if dedupe_key is not None and dedupe_key in self._active_keys:
+            return None
+        job_id = uuid.uuid4().hex
+        if dedupe_key is not None:
+            self._active_keys[dedupe_key] = job_id
+            self._job_keys[job_id] = dedupe_key
+        self._jobs.append({"id": job_id, "kind": kind, "payload": payload, "attempts": 1})
+        self._job_queued.set()
+        return job_id
+
+    async def claim(self, timeout: float, kinds: tuple[str, ...] | None = None, exclude: tuple[str, ...] = ()) -> dict | None:
+        deadline = time.monotonic() + timeout
+        while True:
+            self._job_queued.clear()
+            for i, job in enumerate(self._jobs):
+                if (kinds is None or job["kind"] in kinds) and job["kind"] not in exclude:
+                    del self._jobs[i]
+                    self._running.add(job["id"])
+                    return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._job_queued.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def heartbeat(self, job_id: str):
+        pass
+
+    async def finish(self, job_id: str, error: str | None = None):
+        self._running.discard(job_id)
+        key = self._job_keys.pop(job_id, None)
+        if key is not None:
+            self._active_keys.pop(key, None)
+        if error is None:
+            self._finished += 1
+        else:
+            self._failed += 1
+
+    async def release(self, job_id: str):
+        # Nothing outlives this process, so there is no one to hand the job to
+        await self.finish(job_id, error="worker stopped")
+
+    async def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "worker_id": self.worker_id,
+            "subscriptions": {channel: len(subs) for channel, subs in self._subscriptions.items()},
+            "jobs": {
+                "queued": len(self._jobs),
+                "running": len(self._running),
+                "done": self._finished,
+                "failed": self._failed,
+            },
+        }
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+import aiosqlite
+from config import settings
+from bus.base import Bus
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bus_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bus_messages_channel ON bus_messages(channel, id);
+
+CREATE TABLE IF NOT EXISTS bus_jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedupe_key TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_bus_jobs_status ON bus_jobs(status, created_at);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_bus_jobs_dedupe ON bus_jobs(dedupe_key)
+    WHERE dedupe_key IS NOT NULL AND status IN ('queued', 'running');
+"""
+
+_MAINTENANCE_S = 10.0
+_FINISHED_JOB_RETENTION_S = 24 * 3600
+
+
+class SQLiteBus(Bus):
+    """Bus shared through a SQLite file, for several workers on one host.
+
+    Every worker polls for messages newer than the last one it saw
+    (bus_poll_ms) and delivers them to its local subscribers; messages a
+    worker publishes itself are delivered locally right away. Jobs are
+    claimed with a single UPDATE ... RETURNING, so exactly one worker gets
+    each, and a job whose worker stops heartbeating for bus_job_lease_s is
+    queued again (up to bus_job_max_attempts).
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str | None = None):
+        super().__init__()
+        self.path = path or settings.bus_sqlite_path
+        self._db: aiosqlite.Connection | None = None
+        self._last_id = 0
+        self._poller: asyncio.Task | None = None
+        self._job_queued = asyncio.Event()
+        # One connection shared by every coroutine in the worker: each
+        # statement runs (and commits) on its own so transactions never interleave
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        if self._db is not None:
+            return
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = await aiosqlite.connect(self.path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA busy_timeout=5000")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.executescript(SCHEMA)
+        await self._db.commit()
+        self._last_id = (await self._fetch("SELECT COALESCE(MAX(id), 0) FROM bus_messages"))[0][0]
+        self._poller = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def _fetch(self, sql: str, params: tuple = ()) -> list[tuple]:
+        async with self._lock:
+            cursor = await self._db.execute(sql, params)
+            return await cursor.fetchall()
+
+    async def _write(self, sql: str, params: tuple = ()) -> tuple[int, list[tuple]]:
+        """(rowcount, rows returned) of one committed statement."""
+        async with self._lock:
+            try:
+                cursor = await self._db.execute(sql, params)
+                rows = await cursor.fetchall()
+                await self._db.commit()
+            except sqlite3.Error:
+                await self._db.rollback()
+                raise
+            return cursor.rowcount, rows
+
+    async def _poll(self):
+        interval = settings.bus_poll_ms / 1000
+        next_maintenance = time.monotonic()
+        while True:
+            try:
+                rows = await self._fetch(
+                    "SELECT id, message_id, channel, payload, origin FROM bus_messages WHERE id > ? ORDER BY id",
+                    (self._last_id,),
+                )
+                for row_id, message_id, channel, payload, origin in rows:
+                    self._last_id = row_id
+                    if origin != self.worker_id:
+                        self._deliver(channel, message_id, json.loads(payload))
+                if time.monotonic() >= next_maintenance:
+                    await self._maintain()
+                    next_maintenance = time.monotonic() + _MAINTENANCE_S
+            except sqlite3.Error:
+                logger.exception("Bus poll failed; retrying")
+            await asyncio.sleep(interval)
+
+    async def _maintain(self):
+        now = time.time()
+        await self._write("DELETE FROM bus_messages WHERE created_at < ?", (now - settings.bus_retention_s,))
+        requeued, _ = await self._write(
+            """UPDATE bus_jobs
+               SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                   worker = NULL, error = 'lease expired'
+               WHERE status = 'running' AND heartbeat_at < ?""",
+            (settings.bus_job_max_attempts, now - settings.bus_job_lease_s),
+        )
+        if requeued:
+            logger.warning("Re-queued %d jobs whose workers stopped responding", requeued)
+            self._job_queued.set()
+        await self._write(
+            "DELETE FROM bus_jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (now - _FINISHED_JOB_RETENTION_S,),
+        )
+
+    async def publish(self, channel: str, data):
+        message_id = uuid.uuid4().hex
+        await self._write(
+            "INSERT INTO bus_messages (message_id, channel, payload, origin, created_at) VALUES (?, ?, ?, ?, ?)",
+            (message_id, channel, json.dumps(data), self.worker_id, time.time()),
+        )
+        self._deliver(channel, message_id, data)
+
+    async def _history(self, channel: str) -> list[tuple[str, object]]:
+        rows = await self._fetch(
+            "SELECT message_id, payload FROM bus_messages WHERE channel = ? AND created_at >= ? ORDER BY id",
+            (channel, time.time() - settings.bus_retention_s),
+        )
+        return [(message_id, json.loads(payload)) for message_id, payload in rows]
+
+    async def enqueue(self, kind: str, payload: dict, dedupe_key: str | None = None) -> str | None:
+        job_id = uuid.uuid4().hex
+        try:
+            await self._write(
+                "INSERT INTO bus_jobs (id, kind, payload, dedupe_key, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), dedupe_key, time.time()),
+            )
+        except sqlite3.IntegrityError:
+            return None  # same dedupe_key already queued or running
+        self._job_queued.set()
+        return job_id
+
+    async def claim(self, timeout: float, kinds: tuple[str, ...] | None = None, exclude: tuple[str, ...] = ()) -> dict | None:
+        deadline = time.monotonic() + timeout
+        where, params = "", []
+        if kinds is not None:
+            where += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params += kinds
+        if exclude:
+            where += f" AND kind NOT IN ({', '.join('?' * len(exclude))})"
+            params += exclude
+        while True:
+            self._job_queued.clear()
+            now = time.time()
+            _, rows = await self._write(
+                f"""UPDATE bus_jobs SET status = 'running', worker = ?, attempts = attempts + 1, heartbeat_at = ?
+                   WHERE id = (SELECT id FROM bus_jobs WHERE status = 'queued'{where} ORDER BY created_at LIMIT 1)
+                   RETURNING id, kind, payload, attempts""",
+                (self.worker_id, now, *params),
+            )
+            if rows:
+                row = rows[0]
+                return {"id": row[0], "kind": row[1], "payload": json.loads(row[2]), "attempts": row[3]}
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            # Local enqueues wake us at once; other workers' show up on the next poll
+            try:
+                await asyncio.wait_for(self._job_queued.wait(), min(remaining, settings.bus_poll_ms / 1000))
+            except asyncio.TimeoutError:
+                pass
+
+    async def heartbeat(self, job_id: str):
+        await self._write(
+            "UPDATE bus_jobs SET heartbeat_at = ? WHERE id = ? AND worker = ?",
+            (time.time(), job_id, self.worker_id),
+        )
+
+    async def finish(self, job_id: str, error: str | None = None):
+        await self._write(
+            "UPDATE bus_jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            ("failed" if error else "done", error, time.time(), job_id),
+        )
+
+    async def release(self, job_id: str):
+        await self._write(
+            "UPDATE bus_jobs SET status = 'queued', worker = NULL WHERE id = ? AND worker = ?",
+            (job_id, self.worker_id),
+        )
+
+    async def stats(self) -> dict:
+        jobs = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        jobs.update(await self._fetch("SELECT status, COUNT(*) FROM bus_jobs GROUP BY status"))
+        busy_workers = (await self._fetch("SELECT COUNT(DISTINCT worker) FROM bus_jobs WHERE status = 'running'"))[0][0]
+        return {
+            "backend": self.backend,
+            "worker_id": self.worker_id,
+            "path": self.path,
+            "subscriptions": {channel: len(subs) for channel, subs in self._subscriptions.items()},
+            "jobs": {**jobs, "busy_workers": busy_workers},
+        }
@@ -27,24 +27,138 @@ class Settings(BaseSettings):
     watsonx_embedding_model: str = "ibm/slate-125m-english-rtrvr"
 
     # Storage
+    # "chroma" or "local" (memory-mapped, vectorstore/local.py). Several processes can share a local
+    # collection on POSIX systems (writes are flock()ed); on Windows only run one worker with it
+    vector_backend: str = "chroma"
     chroma_persist_dir: str = "./chromadb"
+    local_vector_dir: str = "./vectors"
+    local_use_hnsw: bool = False  # local backend: HNSW graph (needs hnswlib) instead of exact search
     sqlite_db_path: str = "./data/ragforge.db"
 
     # RAG
-    chunk_size: int = 1000
+    chunk_size: int = 1000  # in chunk_tokenizer tokens, or characters without one
     chunk_overlap: int = 200
+    # tiktoken encoding, e.g. "cl100k_base" with chunk_size 256 and overlap 32;
+    # "" measures characters, as indexes built before token-aware chunking were
+    chunk_tokenizer: str = ""
+    chunk_workers: int = 0  # 0 = one process per CPU, 1 = no parallelism
+    chunk_parallel_min_chars: int = 1_000_000
     retrieval_top_k: int = 10
     rerank_top_k: int = 8
     bm25_weight: float = 0.4
     vector_weight: float = 0.6
 
+    # HNSW index; changing any of these rebuilds the collection in the background
+    hnsw_space: str = "l2"  # "l2", "cosine" or "ip"
+    hnsw_m: int = 16
+    hnsw_construction_ef: int = 100
+    hnsw_search_ef: int = 10
+
+    # Background re-indexing when the embedding model or chunking changes
+    reindex_batch_size: int = 64  # chunks per embedding call
+    reindex_pause_ms: int = 200  # pause between batches, leaves provider quota for live traffic
+    reindex_keep_old_collection: bool = False
+
+    # Knowledge base snapshots: embeddings and chunks exported to, and restored from, binary shards
+    snapshot_dir: str = "./data/snapshots"
+    snapshot_shard_chunks: int = 20000  # chunks per shard file
+    snapshot_batch_size: int = 1000  # chunks per upsert when importing
+
+    # Provider rate limits, per minute (0 = unlimited); provider_rate_limits overrides them
+    # per provider, e.g. {"openai": {"llm_rpm": 500, "embedding_tpm": 1000000}}
+    llm_rpm: int = 0
+    llm_tpm: int = 0
+    embedding_rpm: int = 0
+    embedding_tpm: int = 0
+    provider_rate_limits: dict[str, dict[str, int]] = {}
+    embedding_request_batch: int = 256  # texts per rate-limited embedding request
+    rate_limit_backoff_s: float = 5.0  # hold a provider's queue this long after a 429
+
+    # Query embeddings: cached per model, and concurrent queries merged into one request
+    embedding_cache_size: int = 4096  # query vectors; 0 disables
+    embedding_batch_window_ms: int = 5  # how long the first query waits for others; 0 disables batching
+    embedding_batch_max: int = 64
+
+    # Hedged generation: ordered providers tried for each answer (empty = llm_provider only)
+    hedge_providers: list[str] = []
+    hedge_delay_ms: int = 0  # 0 = the leading provider's observed p95 time to first token
+    hedge_min_delay_ms: int = 250
+    hedge_max_in_flight: int = 2
+    hedge_auto_reorder: bool = True  # re-sort providers by observed latency and errors
+
+    # Conversation memory: a rolling summary of older turns plus the latest raw messages
+    memory_recent_messages: int = 4
+    memory_summary_tokens: int = 300
+    memory_summary_delay_ms: int = 1000  # wait before summarizing, so quick follow-ups share one update
+
+    # Worker coordination: "memory" (one process) or "sqlite" (every worker on the host)
+    bus_backend: str = "memory"
+    bus_sqlite_path: str = "./data/bus.db"
+    bus_poll_ms: int = 50
+    bus_retention_s: int = 600  # how long published messages (e.g. ingest progress) can be replayed
+    bus_replay_messages: int = 200  # per channel, memory backend
+    bus_job_concurrency: int = 4  # jobs (ingestion, connector sync) run at once per worker
+    bus_maintenance_concurrency: int = 2  # long maintenance jobs (re-index, snapshots, bulk batches), on top of those
+    bus_job_lease_s: int = 60  # a running job without a heartbeat for this long is queued again
+    bus_job_max_attempts: int = 3
+    upload_dir: str = ""  # where uploads wait for their ingestion job ("" = system temp dir)
+
+    # Bulk ingestion of archives and server-side directories
+    bulk_ingest_workers: int = 4  # files parsed, chunked and embedded at once per batch
+    bulk_ingest_roots: list[str] = []  # directories /api/documents/bulk may read from; empty disables it
+    bulk_ingest_max_file_mb: int = 100  # larger entries are skipped
+
+    # Startup
+    warmup_on_startup: bool = True  # load provider SDKs and models in the background; see /api/ready
+
+    # Write-behind chat persistence
+    persist_flush_ms: int = 50
+    persist_max_batch: int = 500
+    persist_max_retries: int = 5  # failed flushes of a locked database before writes are committed one by one
+
+    # WebSocket streaming
+    ws_coalesce_ms: int = 30  # 0 sends one frame per token
+    ws_coalesce_max_chars: int = 512
+    ws_send_queue_size: int = 64  # events buffered per connection before backpressure
+
+    # Batch question answering
+    batch_max_questions: int = 5000
+    batch_concurrency: int = 8
+
+    # Prompt token budget (capped by the model's context window)
+    max_prompt_tokens: int = 4000
+    answer_token_reserve: int = 1024
+    history_token_budget: int = 800
+    min_chunk_tokens: int = 64  # smallest trimmed chunk worth keeping
+
     # Pipeline toggles
     use_hybrid_search: bool = False
     use_multi_query: bool = False
     use_hyde: bool = False
     use_reranking: bool = True
+    use_compression: bool = False
+    use_doc_routing: bool = False
+
+    # Two-stage retrieval: route to the closest documents, then search their chunks
+    routing_top_docs: int = 5
+
+    # Retrieval result cache: final ranked chunks per standalone question
+    retrieval_cache_size: int = 1024  # entries; 0 disables
+    retrieval_cache_path: str = ""  # SQLite file shared by the workers on a host ("" = memory only)
+
+    # Extractive compression
+    compression_scorer: str = "lexical"  # "lexical" or "embedding"
+    compression_max_sentences: int = 4
+    compression_window: int = 1  # neighbouring sentences kept around each hit
 
     model_config = {"env_file": ".env", "extra": "ignore"}
 
 
 settings = Settings()
+
+
+def apply_settings(fields: dict):
+    """Update the live settings in place (unknown fields are ignored)."""
+    for field, value in fields.items():
+        if hasattr(settings, field):
+            setattr(settings, field, value)
@@ -0,0 +1 @@
+"""Lets the tests under tests/ import the backend modules the way main.py does."""
@@ -17,6 +17,7 @@ CREATE TABLE IF NOT EXISTS documents (
     error_message TEXT,
     source_url TEXT,
     progress INTEGER DEFAULT 100,
+    content_hash TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -34,6 +35,7 @@ CREATE TABLE IF NOT EXISTS connectors (
 CREATE TABLE IF NOT EXISTS conversations (
     id TEXT PRIMARY KEY,
     title TEXT NOT NULL,
+    pinned_doc_ids TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -44,9 +46,51 @@ CREATE TABLE IF NOT EXISTS messages (
     role TEXT NOT NULL,
     content TEXT NOT NULL,
     sources TEXT,
+    cancelled INTEGER DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE
 );
+
+CREATE TABLE IF NOT EXISTS conversation_memory (
+    conversation_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    summarized_through TEXT NOT NULL,
+    message_count INTEGER DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS ingest_batches (
+    id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    status TEXT DEFAULT 'pending',
+    files_seen INTEGER DEFAULT 0,
+    completed INTEGER DEFAULT 0,
+    failed INTEGER DEFAULT 0,
+    duplicates INTEGER DEFAULT 0,
+    skipped INTEGER DEFAULT 0,
+    chunk_count INTEGER DEFAULT 0,
+    error_message TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS ingest_batch_files (
+    batch_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    doc_id TEXT,
+    file_size INTEGER,
+    chunk_count INTEGER,
+    content_hash TEXT,
+    error_message TEXT,
+    FOREIGN KEY (batch_id) REFERENCES ingest_batches(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS index_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
 """
 
 # Columns to add to existing documents table (safe migration)
@@ -56,6 +100,21 @@ _DOCUMENTS_MIGRATIONS = [
     ("error_message", "TEXT"),
     ("source_url", "TEXT"),
     ("progress", "INTEGER DEFAULT 100"),
+    ("content_hash", "TEXT"),  # sha256 of the uploaded file; bulk ingestion skips files already in
+]
+
+# Created after the column migrations, which some of them depend on
+_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents (content_hash)",
+    "CREATE INDEX IF NOT EXISTS idx_ingest_batch_files_batch ON ingest_batch_files (batch_id)",
+]
+
+_MESSAGES_MIGRATIONS = [
+    ("cancelled", "INTEGER DEFAULT 0"),
+]
+
+_CONVERSATIONS_MIGRATIONS = [
+    ("pinned_doc_ids", "TEXT"),  # JSON list; retrieval in the conversation stays within these documents
 ]
 
 
@@ -69,6 +128,18 @@ async def init_db():
                 await db.execute(f"ALTER TABLE documents ADD COLUMN {col_name} {col_def}")
             except Exception:
                 pass  # Column already exists
+        for col_name, col_def in _MESSAGES_MIGRATIONS:
+            try:
+                await db.execute(f"ALTER TABLE messages ADD COLUMN {col_name} {col_def}")
+            except Exception:
+                pass
+        for col_name, col_def in _CONVERSATIONS_MIGRATIONS:
+            try:
+                await db.execute(f"ALTER TABLE conversations ADD COLUMN {col_name} {col_def}")
+            except Exception:
+                pass
+        for statement in _INDEXES:
+            await db.execute(statement)
         await db.execute("PRAGMA journal_mode=WAL")
         await db.execute("PRAGMA foreign_keys=ON")
         await db.commit()
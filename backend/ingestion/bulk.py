@@ -0,0 +1,445 @@
+"""Bulk ingestion of a zip/tar archive or a directory tree.
+
+    python -m ingestion.bulk ./customer-export.zip --workers 8
+    python -m ingestion.bulk /srv/shared/handbook --url http://127.0.0.1:8000
+
+Entries are read one at a time (tar archives as a stream) and copied to a
+temporary file only once the queue of the bulk_ingest_workers parallel
+workers has room, so a batch never keeps more than about twice that many
+files on disk. Files whose content hash matches a document already
+ingested, or an earlier entry of the batch, are recorded as duplicates
+instead of being embedded again. Each file runs
+through the regular ingestion job (and still reports on its own progress
+channel); the batch publishes one event per file on batch_channel(batch_id).
+
+Without --url the batch runs in this process against the data directories;
+with --url the path is sent to a running backend, which must be able to read
+it and list it (or a parent) in bulk_ingest_roots.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tarfile
+import tempfile
+import time
+import urllib.request
+import uuid
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterator
+import aiosqlite
+from bus.factory import MAINTENANCE, job_handler, publish, worker_stopping
+from config import settings
+from database import DB_PATH, init_db
+from ingestion.loader import LOADER_MAP
+from ingestion.processor import process_document_async
+from vectorstore.chroma import delete_document_vectors
+
+logger = logging.getLogger(__name__)
+
+_COPY_BLOCK = 1 << 20
+_IGNORED_PARTS = ("__MACOSX",)
+_COUNTERS = {"completed": "completed", "failed": "failed", "duplicate": "duplicates", "skipped": "skipped"}
+
+
+def batch_channel(batch_id: str) -> str:
+    """Bus channel carrying a batch's per-file results; None marks the end."""
+    return f"ingest-batch:{batch_id}"
+
+
+@dataclass
+class _Entry:
+    path: str  # relative to the archive or directory root
+    file_path: str | None = None  # temporary copy, for entries to ingest
+    size: int | None = None
+    content_hash: str | None = None
+    skip_reason: str | None = None
+
+
+def _ignored(path: str) -> bool:
+    parts = Path(path).parts
+    return any(part.startswith(".") or part in _IGNORED_PARTS for part in parts)
+
+
+def _spool(stream: BinaryIO, suffix: str) -> tuple[str, int, str] | None:
+    """Copy a stream to a temporary file while hashing it; None if it is over the size limit."""
+    limit = settings.bulk_ingest_max_file_mb * 1024 * 1024
+    digest = hashlib.sha256()
+    size = 0
+    if settings.upload_dir:
+        os.makedirs(settings.upload_dir, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=settings.upload_dir or None)
+    with tmp:
+        # Archive headers can lie about sizes, so the limit is enforced on the bytes read
+        for block in iter(lambda: stream.read(_COPY_BLOCK), b""):
+            size += len(block)
+            if size > limit:
+                break
+            digest.update(block)
+            tmp.write(block)
+    if size > limit:
+        os.unlink(tmp.name)
+        return None
+    return tmp.name, size, digest.hexdigest()
+
+
+def _entry(path: str, open_stream) -> _Entry:
+    suffix = Path(path).suffix.lower()
+    if suffix not in LOADER_MAP:
+        return _Entry(path, skip_reason=f"unsupported file type {suffix or '(none)'}")
+    with open_stream() as stream:
+        spooled = _spool(stream, suffix)
+    if spooled is None:
+        return _Entry(path, skip_reason=f"larger than {settings.bulk_ingest_max_file_mb} MB")
+    file_path, size, content_hash = spooled
+    return _Entry(path, file_path, size, content_hash)
+
+
+def _directory_entries(root: Path) -> Iterator[_Entry]:
+    real_root = os.path.realpath(root)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not _ignored(d))
+        for filename in sorted(filenames):
+            full = os.path.join(dirpath, filename)
+            path = os.path.relpath(full, root)
+            if _ignored(path) or not os.path.isfile(full):
+                continue
+            # Symlinks must not lead out of the directory that was allowed
+            if os.path.commonpath([real_root, os.path.realpath(full)]) != real_root:
+                yield _Entry(path, skip_reason="links outside the directory")
+                continue
+            yield _entry(path, lambda: open(full, "rb"))
+
+
+def _member_path(name: str) -> str:
+    # "./docs/a.pdf" and "docs/a.pdf" name the same file
+    return str(PurePosixPath(name.lstrip("/")))
+
+
+def _escapes(name: str) -> bool:
+    # Members are never extracted, but an absolute or ".." name does not
+    # belong to the archive's tree and is not ingested under it either
+    path = PurePosixPath(name.replace("\\", "/"))
+    return path.is_absolute() or ".." in path.parts
+
+
+def _member_entries(name: str, open_stream) -> Iterator[_Entry]:
+    if _escapes(name):
+        yield _Entry(name, skip_reason="path outside the archive")
+    elif not _ignored(name):
+        yield _entry(_member_path(name), open_stream)
+
+
+def _zip_entries(source: Path) -> Iterator[_Entry]:
+    with zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            if not info.is_dir():
+                yield from _member_entries(info.filename, lambda: archive.open(info))
+
+
+def _tar_entries(source: Path) -> Iterator[_Entry]:
+    # Stream mode: members are read in order, never seeking back
+    with tarfile.open(source, "r|*") as archive:
+        for member in archive:
+            if member.isfile():
+                yield from _member_entries(member.name, lambda: archive.extractfile(member))
+
+
+def iter_entries(source: Path) -> Iterator[_Entry]:
+    if source.is_dir():
+        return _directory_entries(source)
+    if zipfile.is_zipfile(source):
+        return _zip_entries(source)
+    if tarfile.is_tarfile(source):
+        return _tar_entries(source)
+    raise ValueError(f"{source.name} is not a directory, zip or tar archive")
+
+
+def allowed_path(path: str) -> Path:
+    """The real path of a server-side source, if it lies under one of bulk_ingest_roots."""
+    if not settings.bulk_ingest_roots:
+        raise PermissionError("Server-side bulk ingestion is disabled (bulk_ingest_roots is empty)")
+    real = os.path.realpath(path)
+    for root in settings.bulk_ingest_roots:
+        real_root = os.path.realpath(root)
+        if os.path.commonpath([real_root, real]) == real_root:
+            if not os.path.exists(real):
+                raise FileNotFoundError(f"{path} does not exist")
+            return Path(real)
+    raise PermissionError(f"{path} is not under any of bulk_ingest_roots")
+
+
+async def create_batch(source: str) -> str:
+    batch_id = str(uuid.uuid4())
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(
+            "INSERT INTO ingest_batches (id, source, status, created_at) VALUES (?, ?, 'pending', ?)",
+            (batch_id, source, datetime.utcnow().isoformat()),
+        )
+        await db.commit()
+    return batch_id
+
+
+class _Batch:
+    """Counters and per-file results of one running batch."""
+
+    def __init__(self, batch_id: str):
+        self.id = batch_id
+        self.counts = {"files_seen": 0, "completed": 0, "failed": 0, "duplicates": 0, "skipped": 0, "chunk_count": 0}
+        self.hashes: dict[str, str] = {}  # content hash -> doc id, for this batch
+        # Spooled files not yet ingested (which deletes them), with their document id once created
+        self.spooled: dict[str, str | None] = {}
+        self._saved_at = 0.0
+
+    async def save(self, force: bool = False, **fields):
+        if not force and time.monotonic() - self._saved_at < 1.0:
+            return
+        self._saved_at = time.monotonic()
+        values = {**self.counts, **fields}
+        sets = ", ".join(f"{k} = ?" for k in values)
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.execute(f"UPDATE ingest_batches SET {sets} WHERE id = ?", [*values.values(), self.id])
+            await db.commit()
+
+    async def record(self, entry: _Entry, status: str, doc_id: str | None = None,
+                     chunk_count: int | None = None, error: str | None = None):
+        self.counts[_COUNTERS[status]] += 1
+        self.counts["chunk_count"] += chunk_count or 0
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.execute(
+                """INSERT INTO ingest_batch_files
+                   (batch_id, path, status, doc_id, file_size, chunk_count, content_hash, error_message)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (self.id, entry.path, status, doc_id, entry.size, chunk_count, entry.content_hash, error),
+            )
+            await db.commit()
+        await publish(batch_channel(self.id), {
+            "path": entry.path, "status": status, "doc_id": doc_id,
+            "chunk_count": chunk_count, "error": error, **self.counts,
+        })
+        await self.save()
+
+
+async def _existing_doc(content_hash: str) -> str | None:
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            "SELECT id FROM documents WHERE content_hash = ? AND status != 'failed' LIMIT 1", (content_hash,)
+        )
+        row = await cursor.fetchone()
+    return row[0] if row else None
+
+
+async def _ingest(batch: _Batch, entry: _Entry, doc_id: str):
+    suffix = Path(entry.path).suffix.lower()
+    chunk_count = await process_document_async(doc_id, entry.file_path, entry.path, entry.size, suffix)
+    if chunk_count is not None:
+        await batch.record(entry, "completed", doc_id, chunk_count)
+        return
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute("SELECT error_message FROM documents WHERE id = ?", (doc_id,))
+        row = await cursor.fetchone()
+    await batch.record(entry, "failed", doc_id, error=row[0] if row else None)
+
+
+def _read_entry(batch: _Batch, entries: Iterator[_Entry]) -> _Entry | None:
+    entry = next(entries, None)
+    if entry is not None and entry.file_path:
+        batch.spooled[entry.file_path] = None
+    return entry
+
+
+async def _next_entry(batch: _Batch, entries: Iterator[_Entry]) -> _Entry | None:
+    read = asyncio.ensure_future(asyncio.to_thread(_read_entry, batch, entries))
+    try:
+        return await asyncio.shield(read)
+    except asyncio.CancelledError:
+        # The thread cannot be stopped: let it finish the file it is spooling,
+        # so that file is tracked for deletion and the reader can be closed
+        await asyncio.wait([read])
+        raise
+
+
+async def _produce(batch: _Batch, source: Path, queue: asyncio.Queue, workers: int):
+    """Read entries in order, settle skips and duplicates here, and queue the rest."""
+    entries = None
+    try:
+        entries = iter_entries(source)
+        while True:
+            entry = await _next_entry(batch, entries)
+            if entry is None:
+                return
+            batch.counts["files_seen"] += 1
+            if entry.skip_reason:
+                await batch.record(entry, "skipped", error=entry.skip_reason)
+                continue
+            # Decided in order, so two copies in one batch never both get embedded
+            duplicate_of = batch.hashes.get(entry.content_hash) or await _existing_doc(entry.content_hash)
+            if duplicate_of:
+                os.unlink(entry.file_path)
+                del batch.spooled[entry.file_path]
+                await batch.record(entry, "duplicate", duplicate_of)
+                continue
+            doc_id = str(uuid.uuid4())
+            batch.hashes[entry.content_hash] = doc_id
+            batch.spooled[entry.file_path] = doc_id
+            async with aiosqlite.connect(DB_PATH) as db:
+                await db.execute(
+                    """INSERT INTO documents
+                       (id, filename, file_type, file_size, chunk_count, status, source_type, progress,
+                        content_hash, created_at)
+                       VALUES (?, ?, ?, ?, 0, 'pending', 'file', 0, ?, ?)""",
+                    (doc_id, entry.path, Path(entry.path).suffix.lower(), entry.size,
+                     entry.content_hash, datetime.utcnow().isoformat()),
+                )
+                await db.commit()
+            await queue.put((entry, doc_id))
+    except asyncio.CancelledError:
+        workers = 0  # cancelled along with the workers, so no one would take the sentinels
+        raise
+    finally:
+        if entries is not None:
+            entries.close()
+        for _ in range(workers):
+            await queue.put(None)
+
+
+async def _discard_spooled(batch: _Batch):
+    """Delete the files a stopped batch never finished ingesting, and their placeholder documents."""
+    doc_ids = [doc_id for doc_id in batch.spooled.values() if doc_id]
+    for file_path in batch.spooled:
+        try:
+            os.unlink(file_path)
+        except OSError:
+            pass
+    batch.spooled.clear()
+    if not doc_ids:
+        return
+    placeholders = ", ".join("?" * len(doc_ids))
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            f"SELECT id FROM documents WHERE status = 'processing' AND id IN ({placeholders})", doc_ids
+        )
+        # Cut short mid-way, so some of their chunks may be indexed already
+        for (doc_id,) in await cursor.fetchall():
+            await asyncio.to_thread(delete_document_vectors, doc_id)
+        await db.execute(
+            f"DELETE FROM documents WHERE status IN ('pending', 'processing') AND id IN ({placeholders})", doc_ids
+        )
+        await db.commit()
+
+
+async def _work(batch: _Batch, queue: asyncio.Queue):
+    while (item := await queue.get()) is not None:
+        try:
+            await _ingest(batch, *item)
+        except Exception:
+            # Keep consuming, or the producer would block on a full queue
+            logger.exception("Bulk ingestion %s: %s failed", batch.id, item[0].path)
+        # Ingestion deletes the file itself
+        batch.spooled.pop(item[0].file_path, None)
+
+
+@job_handler("ingest_batch", pool=MAINTENANCE)
+async def run_batch(batch_id: str, source: str, delete_source: bool = False, workers: int | None = None) -> dict:
+    """Ingest every supported file in source with a bounded pool of workers."""
+    batch = _Batch(batch_id)
+    workers = max(1, workers or settings.bulk_ingest_workers)
+    # A batch taken over from a worker that died or shut down starts over
+    # from the source; files it had already ingested are then found by hash
+    # and recorded as duplicates
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute("DELETE FROM ingest_batch_files WHERE batch_id = ?", (batch_id,))
+        await db.commit()
+    await batch.save(force=True, status="running")
+
+    # Holds what the workers are on plus one file each, so disk use stays bounded
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers)
+    error = None
+    requeued = False
+    try:
+        results = await asyncio.gather(
+            _produce(batch, Path(source), queue, workers),
+            *(_work(batch, queue) for _ in range(workers)),
+            return_exceptions=True,
+        )
+        failures = [r for r in results if isinstance(r, BaseException)]
+        if failures:
+            error = str(failures[0]) or type(failures[0]).__name__
+            logger.error("Bulk ingestion %s stopped: %s", batch_id, error)
+    except asyncio.CancelledError:
+        error = "cancelled"
+        requeued = worker_stopping()
+        raise
+    finally:
+        # Placeholders would be taken for duplicates when the batch runs again
+        await _discard_spooled(batch)
+        # When requeued, the next worker needs the source and reports the outcome
+        if not requeued:
+            if delete_source:
+                try:
+                    os.unlink(source)
+                except OSError:
+                    pass
+            status = "failed" if error else "completed"
+            await batch.save(
+                force=True,
+                status=status,
+                error_message=error,
+                finished_at=datetime.utcnow().isoformat(),
+            )
+            await publish(batch_channel(batch_id), {"status": status, "error": error, **batch.counts})
+            await publish(batch_channel(batch_id), None)
+    return {"id": batch_id, "status": status, "error_message": error, **batch.counts}
+
+
+def _request(url: str, method: str = "GET", body: dict | None = None) -> dict:
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode() if body is not None else None,
+        headers={"Content-Type": "application/json"},
+        method=method,
+    )
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read())
+
+
+def _run_remote(url: str, path: str) -> dict:
+    batch = _request(f"{url}/api/documents/bulk", "POST", {"path": path})
+    while batch["status"] in ("pending", "running"):
+        time.sleep(2)
+        batch = _request(f"{url}/api/documents/batches/{batch['id']}?files=false")
+        print(f"{batch['files_seen']} files: {batch['completed']} ingested, {batch['duplicates']} duplicates, "
+              f"{batch['skipped']} skipped, {batch['failed']} failed")
+    return batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="zip or tar archive, or a directory")
+    parser.add_argument("--workers", type=int, default=settings.bulk_ingest_workers)
+    parser.add_argument("--url", help="have the backend at this URL ingest the path")
+    args = parser.parse_args()
+    path = os.path.abspath(args.path)
+
+    if args.url:
+        result = _run_remote(args.url.rstrip("/"), path)
+    else:
+        async def _run():
+            from vectorstore.migration import load_index_state
+            await init_db()
+            await load_index_state()
+            batch_id = await create_batch(path)
+            return await run_batch(batch_id, path, workers=args.workers)
+        result = asyncio.run(_run())
+    print(json.dumps(result, indent=2))
+    if result["status"] == "failed":
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
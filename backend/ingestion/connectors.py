@@ -3,7 +3,10 @@ import asyncio
 import aiosqlite
 from datetime import datetime
 from database import DB_PATH
+from providers.scheduler import BACKGROUND, run_at
+from bus.factory import job_handler
 from vectorstore.chroma import get_vectorstore, reset_vectorstore_cache
+from vectorstore.migration import index_writes
 
 
 async def test_connection(connector_type: str, config: dict) -> dict:
@@ -25,6 +28,8 @@ async def test_connection(connector_type: str, config: dict) -> dict:
     return {"ok": False, "message": f"Unknown connector type: {connector_type}"}
 
 
+@job_handler("connector_sync")
+@run_at(BACKGROUND)
 async def sync_connector(connector_id: str):
     """Pull documents from a remote ChromaDB and merge into local vectorstore."""
     async with aiosqlite.connect(DB_PATH) as db:
@@ -88,8 +93,9 @@ async def sync_connector(connector_id: str):
                 lc_docs.append(Document(page_content=doc_text, metadata=m))
 
         if lc_docs:
-            vectorstore = get_vectorstore()
-            await asyncio.to_thread(vectorstore.add_documents, lc_docs)
+            async with index_writes(f"connector-{connector_id}"):
+                vectorstore = get_vectorstore()
+                await asyncio.to_thread(vectorstore.add_documents, lc_docs)
             reset_vectorstore_cache()
 
         async with aiosqlite.connect(DB_PATH) as db:
@@ -7,20 +7,20 @@ from langchain_community.document_loaders import (
     UnstructuredPowerPointLoader,
     UnstructuredExcelLoader,
     UnstructuredMarkdownLoader,
-    CSVLoader,
     TextLoader,
     JSONLoader,
 )
+from ingestion.tabular import TabularLoader
 
 LOADER_MAP = {
     ".pdf": PyPDFLoader,
     ".docx": Docx2txtLoader,
     ".doc": Docx2txtLoader,
     ".pptx": UnstructuredPowerPointLoader,
-    ".xlsx": UnstructuredExcelLoader,
+    ".xlsx": TabularLoader,
     ".xls": UnstructuredExcelLoader,
     ".md": UnstructuredMarkdownLoader,
-    ".csv": CSVLoader,
+    ".csv": TabularLoader,
     ".txt": TextLoader,
     ".json": JSONLoader,
 }
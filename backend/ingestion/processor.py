@@ -3,21 +3,17 @@ import asyncio
 import aiosqlite
 from langchain_core.documents import Document
 from rag.chunking import chunk_documents
-from vectorstore.chroma import get_vectorstore, reset_vectorstore_cache
+from vectorstore.chroma import delete_document_vectors, get_vectorstore, reset_vectorstore_cache
+from vectorstore.migration import index_writes, reindex_job
+from vectorstore.routing import update_doc_centroid
+from providers.scheduler import BACKGROUND, run_at
+from bus.factory import job_handler, publish, worker_stopping
 from database import DB_PATH
 
-# Progress channels for WebSocket streaming
-_progress_channels: dict[str, asyncio.Queue] = {}
 
-
-def get_progress_channel(doc_id: str) -> asyncio.Queue:
-    if doc_id not in _progress_channels:
-        _progress_channels[doc_id] = asyncio.Queue()
-    return _progress_channels[doc_id]
-
-
-def remove_progress_channel(doc_id: str):
-    _progress_channels.pop(doc_id, None)
+def progress_channel(doc_id: str) -> str:
+    """Bus channel carrying a document's ingestion progress; None marks the end."""
+    return f"ingest:{doc_id}"
 
 
 def process_documents(docs: list[Document], doc_id: str) -> int:
@@ -33,6 +29,8 @@ def process_documents(docs: list[Document], doc_id: str) -> int:
     vectorstore = get_vectorstore()
     vectorstore.add_documents(chunks)
     reset_vectorstore_cache()
+    reindex_job.mark_dirty(doc_id)
+    update_doc_centroid(doc_id)
 
     return len(chunks)
 
@@ -46,13 +44,15 @@ async def _update_doc(doc_id: str, **fields):
 
 
 async def _push(doc_id: str, stage: str, progress: int, detail: str | None = None, error: str | None = None):
-    queue = get_progress_channel(doc_id)
-    await queue.put({"stage": stage, "progress": progress, "detail": detail, "error": error})
+    await publish(progress_channel(doc_id), {"stage": stage, "progress": progress, "detail": detail, "error": error})
 
 
-async def process_document_async(doc_id: str, file_path: str, filename: str, file_size: int, suffix: str):
-    """Async processing with progress events pushed to a queue."""
+@job_handler("ingest_file")
+@run_at(BACKGROUND)
+async def process_document_async(doc_id: str, file_path: str, filename: str, file_size: int, suffix: str) -> int | None:
+    """Async processing with progress events pushed to a queue; the chunk count, or None if it failed."""
     from ingestion.loader import load_file
+    requeued = False
     try:
         # Stage: loading
         await _push(doc_id, "loading", 10, "Loading document...")
@@ -64,6 +64,9 @@ async def process_document_async(doc_id: str, file_path: str, filename: str, fil
         await _update_doc(doc_id, progress=40)
         for doc in docs:
             doc.metadata["doc_id"] = doc_id
+            # Cite the uploaded name, not the temporary file it was saved to
+            if filename:
+                doc.metadata["source_file"] = filename
         chunks = await asyncio.to_thread(chunk_documents, docs)
         for chunk in chunks:
             chunk.metadata["chunk_id"] = str(uuid.uuid4())
@@ -71,8 +74,11 @@ async def process_document_async(doc_id: str, file_path: str, filename: str, fil
         # Stage: embedding
         await _push(doc_id, "embedding", 70, "Generating embeddings...")
         await _update_doc(doc_id, progress=70)
-        vectorstore = get_vectorstore()
-        await asyncio.to_thread(vectorstore.add_documents, chunks)
+        async with index_writes(doc_id):
+            # A job taken over from a stopped worker may have written chunks already
+            await asyncio.to_thread(delete_document_vectors, doc_id)
+            vectorstore = get_vectorstore()
+            await asyncio.to_thread(vectorstore.add_documents, chunks)
 
         # Stage: indexing
         await _push(doc_id, "indexing", 90, "Updating search index...")
@@ -82,24 +88,33 @@ async def process_document_async(doc_id: str, file_path: str, filename: str, fil
         # Complete
         await _update_doc(doc_id, status="completed", progress=100, chunk_count=len(chunks))
         await _push(doc_id, "complete", 100, f"Done — {len(chunks)} chunks")
+        return len(chunks)
 
     except Exception as exc:
         await _update_doc(doc_id, status="failed", error_message=str(exc))
         await _push(doc_id, "error", 0, error=str(exc))
+        return None
+    except asyncio.CancelledError:
+        # Another worker runs the job again: it needs the file, and listeners keep waiting
+        requeued = worker_stopping()
+        raise
     finally:
-        import os
-        try:
-            os.unlink(file_path)
-        except OSError:
-            pass
-        # Sentinel to close WebSocket listener
-        queue = get_progress_channel(doc_id)
-        await queue.put(None)
-
-
+        if not requeued:
+            import os
+            try:
+                os.unlink(file_path)
+            except OSError:
+                pass
+            # Sentinel to close WebSocket listener
+            await publish(progress_channel(doc_id), None)
+
+
+@job_handler("ingest_url")
+@run_at(BACKGROUND)
 async def process_url_async(doc_id: str, url: str, deep_crawl: bool = False):
     """Async URL ingestion with progress events."""
     from ingestion.loader import load_url, load_url_recursive
+    requeued = False
     try:
         if deep_crawl:
             await _push(doc_id, "crawling", 5, "Crawling website links...")
@@ -122,8 +137,10 @@ async def process_url_async(doc_id: str, url: str, deep_crawl: bool = False):
 
         await _push(doc_id, "embedding", 70, "Generating embeddings...")
         await _update_doc(doc_id, progress=70)
-        vectorstore = get_vectorstore()
-        await asyncio.to_thread(vectorstore.add_documents, chunks)
+        async with index_writes(doc_id):
+            await asyncio.to_thread(delete_document_vectors, doc_id)
+            vectorstore = get_vectorstore()
+            await asyncio.to_thread(vectorstore.add_documents, chunks)
 
         await _push(doc_id, "indexing", 90, "Updating search index...")
         await _update_doc(doc_id, progress=90)
@@ -135,6 +152,9 @@ async def process_url_async(doc_id: str, url: str, deep_crawl: bool = False):
     except Exception as exc:
         await _update_doc(doc_id, status="failed", error_message=str(exc))
         await _push(doc_id, "error", 0, error=str(exc))
+    except asyncio.CancelledError:
+        requeued = worker_stopping()
+        raise
     finally:
-        queue = get_progress_channel(doc_id)
-        await queue.put(None)
+        if not requeued:
+            await publish(progress_channel(doc_id), None)
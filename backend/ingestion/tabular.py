@@ -0,0 +1,120 @@
+import csv
+import io
+from pathlib import Path
+from typing import Iterable, Iterator
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+from config import settings
+from rag.chunking import ROW_BLOCKS
+from rag.tokens import count_tokens
+
+_SNIFF_BYTES = 64 * 1024
+
+
+def _render(row: list[str]) -> str:
+    out = io.StringIO()
+    csv.writer(out, lineterminator="\n").writerow(row)
+    return out.getvalue()
+
+
+def _trim(values: Iterable) -> list[str]:
+    row = ["" if value is None else str(value) for value in values]
+    while row and not row[-1].strip():
+        row.pop()
+    return row
+
+
+def pack_rows(rows: Iterable[tuple[int, list[str]]], header: list[str], metadata: dict) -> Iterator[Document]:
+    """Pack consecutive (row number, cells) into chunk_size blocks, each starting with the header.
+
+    Rows are never split or overlapped; a row longer than a whole chunk gets
+    a block of its own.
+    """
+    prefix = (f"Sheet: {metadata['sheet']}\n" if metadata.get("sheet") else "") + _render(header)
+    budget = max(settings.chunk_size - count_tokens(prefix), 1)
+    lines: list[str] = []
+    used = 0
+    first = last = None
+
+    def block() -> Document:
+        return Document(
+            page_content=prefix + "".join(lines).rstrip("\n"),
+            metadata={**metadata, "row_start": first, "row_end": last, "chunking": ROW_BLOCKS},
+        )
+
+    for number, cells in rows:
+        line = _render(cells)
+        size = count_tokens(line)
+        if lines and used + size > budget:
+            yield block()
+            lines, used = [], 0
+        if not lines:
+            first = number
+        lines.append(line)
+        used += size
+        last = number
+    if lines:
+        yield block()
+
+
+def _table(rows: Iterator[tuple[int, list[str]]], metadata: dict) -> Iterator[Document]:
+    """Row blocks for one table whose first non-empty row is the header."""
+    for _, header in rows:
+        return pack_rows(rows, header, metadata)
+    return iter(())
+
+
+def _csv_rows(path: str) -> Iterator[tuple[int, list[str]]]:
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        sample = f.read(_SNIFF_BYTES)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        while True:
+            # Quoted newlines make a row span lines; number it by the line it starts on
+            start = reader.line_num + 1
+            try:
+                row = _trim(next(reader))
+            except StopIteration:
+                return
+            if row:
+                yield start, row
+
+
+def _sheet_rows(sheet) -> Iterator[tuple[int, list[str]]]:
+    for number, values in enumerate(sheet.iter_rows(values_only=True), start=1):
+        row = _trim(values)
+        if row:
+            yield number, row
+
+
+class TabularLoader(BaseLoader):
+    """CSV and XLSX files as blocks of whole rows, streamed rather than loaded at once.
+
+    CSVLoader makes one document (and chunk, and embedding input) per row,
+    each repeating the header. Here consecutive rows are packed up to
+    chunk_size with the header once per block, and row_start/row_end (1-based,
+    the header being row 1 of a plain table) are kept for citations. Blocks
+    are final chunks: re-indexing re-embeds them as they are instead of
+    re-chunking.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def lazy_load(self) -> Iterator[Document]:
+        metadata = {"source": self.file_path}
+        if Path(self.file_path).suffix.lower() == ".csv":
+            yield from _table(_csv_rows(self.file_path), metadata)
+            return
+
+        from openpyxl import load_workbook
+        workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                yield from _table(_sheet_rows(sheet), {**metadata, "sheet": sheet.title})
+        finally:
+            workbook.close()
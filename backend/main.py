@@ -1,20 +1,55 @@
-import json
-import uuid
-from datetime import datetime
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-import aiosqlite
-from database import init_db, DB_PATH
+from pydantic import ValidationError
+from database import init_db
+from models.schemas import RetrievalFilters
+from persistence import message_writer
+from providers.hedging import health_snapshot
+from providers.query_embeddings import query_embedding_stats
+from providers.scheduler import scheduler_stats
+from rag.cache import retrieval_cache
 from rag.engine import rag_engine
-from routers import chat, documents, conversations, settings, connectors
-from ingestion.processor import get_progress_channel, remove_progress_channel
+from rag.memory import conversation_summarizer
+from routers import chat, documents, conversations, settings, connectors, snapshots
+from bus.factory import bus_worker, get_bus, subscribe
+from ingestion.bulk import batch_channel
+from ingestion.processor import progress_channel
+from rag.chunking import shutdown_chunk_workers
+from streaming import StreamSender
+from vectorstore.local import flush_collections
+from vectorstore.migration import load_index_state, reindex_job, request_index_check
+from vectorstore.routing import backfill_doc_index
+from warmup import warmup
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    await load_index_state()
+    await message_writer.start()
+    await conversation_summarizer.start()
+    await bus_worker.start()
+    # Settings may have changed in .env since the active index was built
+    await request_index_check()
+    backfill = asyncio.create_task(backfill_doc_index())
+    warmup.start()
     yield
+    await warmup.stop()
+    backfill.cancel()
+    # Jobs still running here go back to the queue for the other workers
+    await bus_worker.stop()
+    await reindex_job.cancel()
+    flush_collections()
+    await conversation_summarizer.stop()
+    # Flush queued chat writes before the process exits
+    await message_writer.stop()
+    shutdown_chunk_workers()
 
 
 app = FastAPI(title="RAG Forge API", version="2.0.0", lifespan=lifespan)
@@ -32,6 +67,7 @@ app.include_router(documents.router, prefix="/api", tags=["Documents"])
 app.include_router(conversations.router, prefix="/api", tags=["Conversations"])
 app.include_router(settings.router, prefix="/api", tags=["Settings"])
 app.include_router(connectors.router, prefix="/api", tags=["Connectors"])
+app.include_router(snapshots.router, prefix="/api", tags=["Snapshots"])
 
 
 @app.get("/api/health")
@@ -39,66 +75,148 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/api/ready")
+async def ready():
+    """200 once models are warm, 503 while warm-up is still running (the process is alive either way)."""
+    return JSONResponse(warmup.snapshot(), status_code=200 if warmup.ready else 503)
+
+
+@app.get("/api/providers/stats")
+async def provider_stats():
+    """Rate limiter state per provider endpoint: quota left, queue depth and wait times by priority."""
+    return scheduler_stats()
+
+
+@app.get("/api/providers/health")
+async def provider_health():
+    """Hedging order, current hedge delay, and time to first token / error rate per provider."""
+    return health_snapshot()
+
+
+@app.get("/api/cache/retrieval")
+async def retrieval_cache_stats():
+    """Retrieval result cache size, corpus generation and hit rate."""
+    return retrieval_cache.stats()
+
+
+@app.get("/api/cache/embeddings")
+async def embedding_cache_stats():
+    """Query-embedding cache hit rate and average batch size per embedding model."""
+    return query_embedding_stats()
+
+
+@app.get("/api/bus")
+async def bus_stats():
+    """Bus backend, this worker's id and subscriptions, and job counts by status."""
+    return await get_bus().stats()
+
+
 @app.websocket("/ws/ingest/{doc_id}")
 async def websocket_ingest(websocket: WebSocket, doc_id: str):
+    await _relay_progress(websocket, progress_channel(doc_id))
+
+
+@app.websocket("/ws/ingest/batch/{batch_id}")
+async def websocket_ingest_batch(websocket: WebSocket, batch_id: str):
+    await _relay_progress(websocket, batch_channel(batch_id))
+
+
+async def _relay_progress(websocket: WebSocket, channel: str):
     await websocket.accept()
-    queue = get_progress_channel(doc_id)
+    # Replay catches up on events published before the socket connected,
+    # possibly by the worker that is running the ingestion job
+    subscription = await subscribe(channel, replay=True)
     try:
-        while True:
-            event = await queue.get()
+        async for event in subscription:
             if event is None:
                 break
             await websocket.send_json(event)
     except WebSocketDisconnect:
         pass
     finally:
-        remove_progress_channel(doc_id)
+        subscription.close()
         try:
             await websocket.close()
         except Exception:
             pass
 
 
+async def _run_chat_turn(sender: StreamSender, conversation_id: str, question: str, filters: RetrievalFilters | None = None):
+    """Stream one answer; on cancellation the partial answer is saved as cancelled."""
+    message_writer.add_message(conversation_id, "user", question)
+
+    full_response = ""
+    sources_data = []
+    cancelled = False
+    stream = rag_engine.stream_query(question, conversation_id=conversation_id, filters=filters)
+    try:
+        async for event in stream:
+            if event["type"] == "token":
+                full_response += event["content"]
+            elif event["type"] == "sources":
+                sources_data = event["sources"]
+            await sender.send(event)
+        await sender.send({"type": "done"})
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
+    except WebSocketDisconnect:
+        cancelled = True
+    except Exception as exc:
+        logger.exception("Chat turn failed")
+        await sender.send({"type": "error", "message": str(exc)})
+        await sender.send({"type": "done"})
+    finally:
+        # Queue the answer before anything else can be cancelled
+        message_writer.add_message(conversation_id, "assistant", full_response, sources_data, cancelled=cancelled)
+        message_writer.touch_conversation(conversation_id)
+        conversation_summarizer.note_turn(conversation_id)
+        # Closes the upstream provider stream if we stopped early
+        await stream.aclose()
+
+
+async def _cancel_turn(turn: asyncio.Task | None) -> bool:
+    if turn is None or turn.done():
+        return False
+    turn.cancel()
+    try:
+        await turn
+    except asyncio.CancelledError:
+        pass
+    return True
+
+
 @app.websocket("/ws/chat/{conversation_id}")
 async def websocket_chat(websocket: WebSocket, conversation_id: str):
+    """Chat over a socket: {"message": ..., "filters": {...}?} starts a turn, {"type": "cancel"} stops it.
+
+    A new message while a turn is in flight cancels that turn first, and a
+    disconnect cancels whatever is running.
+    """
     await websocket.accept()
+    sender = StreamSender(websocket)
+    sender.start()
+    turn: asyncio.Task | None = None
     try:
         while True:
             data = await websocket.receive_json()
-            question = data.get("message", "")
-
-            async with aiosqlite.connect(DB_PATH) as db:
-                user_msg_id = str(uuid.uuid4())
-                await db.execute(
-                    "INSERT INTO messages (id, conversation_id, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
-                    (user_msg_id, conversation_id, "user", question, datetime.utcnow().isoformat()),
-                )
-                await db.commit()
-
-            full_response = ""
-            sources_data = []
-
-            async for event in rag_engine.stream_query(question, conversation_id=conversation_id):
-                if event["type"] == "token":
-                    full_response += event["content"]
-                    await websocket.send_json(event)
-                elif event["type"] == "sources":
-                    sources_data = event["sources"]
-                    await websocket.send_json(event)
-
-            await websocket.send_json({"type": "done"})
-
-            async with aiosqlite.connect(DB_PATH) as db:
-                assistant_msg_id = str(uuid.uuid4())
-                await db.execute(
-                    "INSERT INTO messages (id, conversation_id, role, content, sources, created_at) VALUES (?, ?, ?, ?, ?, ?)",
-                    (assistant_msg_id, conversation_id, "assistant", full_response, json.dumps(sources_data), datetime.utcnow().isoformat()),
-                )
-                await db.execute(
-                    "UPDATE conversations SET updated_at = ? WHERE id = ?",
-                    (datetime.utcnow().isoformat(), conversation_id),
-                )
-                await db.commit()
-
+            if data.get("type") == "cancel":
+                if await _cancel_turn(turn):
+                    await sender.send({"type": "done", "cancelled": True})
+                turn = None
+                continue
+
+            try:
+                filters = RetrievalFilters(**data["filters"]) if data.get("filters") else None
+            except ValidationError as exc:
+                await sender.send({"type": "error", "message": f"Invalid filters: {exc}"})
+                await sender.send({"type": "done"})
+                continue
+
+            await _cancel_turn(turn)
+            turn = asyncio.create_task(_run_chat_turn(sender, conversation_id, data.get("message", ""), filters))
     except WebSocketDisconnect:
         pass
+    finally:
+        await _cancel_turn(turn)
+        await sender.close()
@@ -1,25 +1,61 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 from datetime import datetime
 from enum import Enum
 
 
+class RetrievalFilters(BaseModel):
+    """Restricts retrieval to matching documents; criteria combine with AND."""
+    doc_ids: Optional[list[str]] = None
+    source_types: Optional[list[str]] = None  # "file", "url", ...
+    filename_prefix: Optional[str] = None
+    url_prefix: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+
 class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[str] = None
+    filters: Optional[RetrievalFilters] = None
+
+
+class BatchChatRequest(BaseModel):
+    questions: list[str] = Field(..., min_length=1)
+    persist: bool = False
+    concurrency: Optional[int] = None
+    filters: Optional[RetrievalFilters] = None
+
+
+class SearchRequest(BaseModel):
+    query: str
+    filters: Optional[RetrievalFilters] = None
+    conversation_id: Optional[str] = None  # apply the conversation's pinned documents
 
 
 class Source(BaseModel):
     doc_name: str
     page: Optional[int] = None
+    sheet: Optional[str] = None  # spreadsheet sources
+    rows: Optional[str] = None  # "12-40" for CSV/XLSX row blocks
     chunk_text: str
     relevance_score: float
 
 
+class SearchHit(Source):
+    doc_id: Optional[str] = None
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: list[SearchHit]
+
+
 class ChatResponse(BaseModel):
     message: str
     sources: list[Source]
     conversation_id: str
+    prompt_tokens: Optional[int] = None
 
 
 class DocumentOut(BaseModel):
@@ -36,6 +72,35 @@ class DocumentOut(BaseModel):
     created_at: str
 
 
+class BulkIngestRequest(BaseModel):
+    path: str  # directory or zip/tar archive on the server, under bulk_ingest_roots
+
+
+class IngestBatchFile(BaseModel):
+    path: str
+    status: str  # completed, failed, duplicate or skipped
+    doc_id: Optional[str] = None  # for duplicates, the document it duplicates
+    file_size: Optional[int] = None
+    chunk_count: Optional[int] = None
+    error_message: Optional[str] = None
+
+
+class IngestBatchOut(BaseModel):
+    id: str
+    source: str
+    status: str
+    files_seen: int = 0
+    completed: int = 0
+    failed: int = 0
+    duplicates: int = 0
+    skipped: int = 0
+    chunk_count: int = 0
+    error_message: Optional[str] = None
+    created_at: str
+    finished_at: Optional[str] = None
+    files: Optional[list[IngestBatchFile]] = None
+
+
 class URLIngestRequest(BaseModel):
     url: str
     deep_crawl: bool = False
@@ -75,6 +140,7 @@ class ConversationOut(BaseModel):
     title: str
     created_at: str
     updated_at: str
+    pinned_doc_ids: list[str] = []
 
 
 class ConversationCreate(BaseModel):
@@ -86,15 +152,21 @@ class MessageOut(BaseModel):
     role: str
     content: str
     sources: Optional[list[Source]] = None
+    cancelled: bool = False
     created_at: str
 
 
+class ConversationPin(BaseModel):
+    doc_ids: list[str]  # empty unpins
+
+
 class ConversationDetail(BaseModel):
     id: str
     title: str
     messages: list[MessageOut]
     created_at: str
     updated_at: str
+    pinned_doc_ids: list[str] = []
 
 
 class SettingsOut(BaseModel):
@@ -111,6 +183,15 @@ class SettingsOut(BaseModel):
     use_multi_query: bool
     use_hyde: bool
     use_reranking: bool
+    use_compression: bool
+    use_doc_routing: bool
+    routing_top_docs: int
+    hnsw_space: str
+    hnsw_m: int
+    hnsw_construction_ef: int
+    hnsw_search_ef: int
+    hedge_providers: list[str]
+    hedge_delay_ms: int
 
 
 class SettingsUpdate(BaseModel):
@@ -133,3 +214,16 @@ class SettingsUpdate(BaseModel):
     use_multi_query: Optional[bool] = None
     use_hyde: Optional[bool] = None
     use_reranking: Optional[bool] = None
+    use_compression: Optional[bool] = None
+    use_doc_routing: Optional[bool] = None
+    routing_top_docs: Optional[int] = Field(None, ge=1)
+    hnsw_space: Optional[Literal["l2", "cosine", "ip"]] = None
+    hnsw_m: Optional[int] = Field(None, ge=2)
+    hnsw_construction_ef: Optional[int] = Field(None, ge=1)
+    hnsw_search_ef: Optional[int] = Field(None, ge=1)
+    hedge_providers: Optional[list[str]] = None
+    hedge_delay_ms: Optional[int] = Field(None, ge=0)
+
+
+class SnapshotCreate(BaseModel):
+    name: Optional[str] = None  # default: a UTC timestamp
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import uuid
+from datetime import datetime
+import aiosqlite
+from config import settings
+from database import DB_PATH
+
+logger = logging.getLogger(__name__)
+
+_INSERT_CONVERSATION = "INSERT OR IGNORE INTO conversations (id, title, created_at, updated_at) VALUES (?, ?, ?, ?)"
+_INSERT_MESSAGE = """INSERT INTO messages (id, conversation_id, role, content, sources, cancelled, created_at)
+                     VALUES (:id, :conversation_id, :role, :content, :sources, :cancelled, :created_at)"""
+_TOUCH_CONVERSATION = "UPDATE conversations SET updated_at = ? WHERE id = ?"
+
+
+class MessageWriter:
+    """Write-behind queue for conversation and message writes.
+
+    Writes are queued in memory and committed in one transaction every
+    persist_flush_ms (or sooner once persist_max_batch writes are waiting),
+    taking the per-turn INSERT/commit cycles off the request path. Queued
+    messages are visible through pending_messages() until they are committed,
+    and stop() flushes whatever is left.
+
+    A batch the database rejects is committed again one write at a time, and
+    the writes that still fail are logged and dropped, so one bad row never
+    holds back the rest. A locked database is retried persist_max_retries
+    times first.
+    """
+
+    def __init__(self):
+        self._conversations: list[tuple] = []
+        self._messages: list[dict] = []
+        self._touched: dict[str, str] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self._failed_flushes = 0
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def add_conversation(self, conversation_id: str, title: str, created_at: str | None = None):
+        now = created_at or datetime.utcnow().isoformat()
+        self._conversations.append((conversation_id, title, now, now))
+        self._queued()
+
+    def add_message(
+        self,
+        conversation_id: str,
+        role: str,
+        content: str,
+        sources: list | None = None,
+        cancelled: bool = False,
+        created_at: str | None = None,
+    ) -> str:
+        message_id = str(uuid.uuid4())
+        self._messages.append({
+            "id": message_id,
+            "conversation_id": conversation_id,
+            "role": role,
+            "content": content,
+            "sources": json.dumps(sources) if sources is not None else None,
+            "cancelled": int(cancelled),
+            "created_at": created_at or datetime.utcnow().isoformat(),
+        })
+        self._queued()
+        return message_id
+
+    def touch_conversation(self, conversation_id: str, updated_at: str | None = None):
+        self._touched[conversation_id] = updated_at or datetime.utcnow().isoformat()
+        self._queued()
+
+    def pending_messages(self, conversation_id: str) -> list[dict]:
+        """Queued, not yet committed messages for a conversation (oldest first)."""
+        return [m for m in self._messages if m["conversation_id"] == conversation_id]
+
+    def _queued(self):
+        pending = len(self._conversations) + len(self._messages) + len(self._touched)
+        if self._task is None or pending >= settings.persist_max_batch:
+            self._wakeup.set()
+
+    async def _run(self):
+        interval = settings.persist_flush_ms / 1000
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Write-behind flush failed; will retry")
+
+    async def flush(self):
+        """Commit everything queued so far in a single transaction."""
+        async with self._flush_lock:
+            if not (self._conversations or self._messages or self._touched):
+                return
+            conversations = self._conversations[:]
+            messages = self._messages[:]
+            touched = dict(self._touched)
+            statements = [
+                (_INSERT_CONVERSATION, conversations),
+                (_INSERT_MESSAGE, messages),
+                (_TOUCH_CONVERSATION, [(ts, conv_id) for conv_id, ts in touched.items()]),
+            ]
+
+            try:
+                await self._commit(statements)
+            except sqlite3.OperationalError:
+                # Locked or busy: usually gone by the next flush
+                self._failed_flushes += 1
+                if self._failed_flushes < settings.persist_max_retries:
+                    raise
+                await self._commit_each(statements)
+            except sqlite3.Error:
+                await self._commit_each(statements)
+            self._failed_flushes = 0
+
+            # Only drop what was committed; writes queued meanwhile stay
+            del self._conversations[:len(conversations)]
+            del self._messages[:len(messages)]
+            for conv_id, ts in touched.items():
+                if self._touched.get(conv_id) == ts:
+                    del self._touched[conv_id]
+            logger.debug(
+                "Flushed %d conversations, %d messages, %d touches",
+                len(conversations), len(messages), len(touched),
+            )
+
+    async def _commit(self, statements: list[tuple[str, list]]):
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.execute("PRAGMA synchronous=NORMAL")
+            for sql, rows in statements:
+                await db.executemany(sql, rows)
+            await db.commit()
+
+    async def _commit_each(self, statements: list[tuple[str, list]]):
+        """Commit every write on its own, dropping the ones the database rejects."""
+        async with aiosqlite.connect(DB_PATH) as db:
+            for sql, rows in statements:
+                for row in rows:
+                    try:
+                        await db.execute(sql, row)
+                        await db.commit()
+                    except sqlite3.Error:
+                        await db.rollback()
+                        logger.exception("Dropped a queued write that failed on its own: %s", sql.split("(")[0].strip())
+
+
+message_writer = MessageWriter()
@@ -14,6 +14,14 @@ class LLMProvider(ABC):
 
 
 class EmbeddingProvider(ABC):
+    # Whether embed_documents gives the same vector for a query as embed_query,
+    # so concurrent queries can be embedded in one batch
+    symmetric_queries = True
+
     @abstractmethod
     def get_embeddings(self) -> Embeddings:
         ...
+
+    def get_model_name(self) -> str:
+        """Identifies the embedding space; vectors from different names are incompatible."""
+        return type(self).__name__
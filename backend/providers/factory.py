@@ -1,35 +1,58 @@
+import importlib
 from providers.base import LLMProvider, EmbeddingProvider
-from providers.openai_provider import OpenAILLMProvider, OpenAIEmbeddingProvider
-from providers.watsonx_provider import WatsonxLLMProvider, WatsonxEmbeddingProvider
-from providers.gemini_provider import GeminiLLMProvider, GeminiEmbeddingProvider
-from providers.groq_provider import GroqLLMProvider, GroqEmbeddingProvider
+from providers.query_embeddings import CachedEmbeddings
+from providers.scheduler import RateLimitedEmbeddings, limit_llm
 from config import settings
 
+# "module:Class" references are imported on first use, so only the SDK of a
+# provider that is actually selected gets loaded; classes may be registered directly
 _PROVIDERS = {
-    "openai": (OpenAILLMProvider, OpenAIEmbeddingProvider),
-    "watsonx": (WatsonxLLMProvider, WatsonxEmbeddingProvider),
-    "gemini": (GeminiLLMProvider, GeminiEmbeddingProvider),
-    "groq": (GroqLLMProvider, GroqEmbeddingProvider),
+    "openai": ("providers.openai_provider:OpenAILLMProvider", "providers.openai_provider:OpenAIEmbeddingProvider"),
+    "watsonx": ("providers.watsonx_provider:WatsonxLLMProvider", "providers.watsonx_provider:WatsonxEmbeddingProvider"),
+    "gemini": ("providers.gemini_provider:GeminiLLMProvider", "providers.gemini_provider:GeminiEmbeddingProvider"),
+    "groq": ("providers.groq_provider:GroqLLMProvider", "providers.groq_provider:GroqEmbeddingProvider"),
 }
 
 
-def get_llm_provider() -> LLMProvider:
-    llm_cls, _ = _PROVIDERS[settings.llm_provider]
-    return llm_cls()
+def _resolve(ref):
+    if not isinstance(ref, str):
+        return ref
+    module, _, name = ref.partition(":")
+    return getattr(importlib.import_module(module), name)
 
 
-def get_embedding_provider() -> EmbeddingProvider:
-    _, emb_cls = _PROVIDERS[settings.llm_provider]
-    return emb_cls()
+def get_llm_provider(provider: str | None = None) -> LLMProvider:
+    llm_ref, _ = _PROVIDERS[provider or settings.llm_provider]
+    return _resolve(llm_ref)()
 
 
-def get_llm():
-    return get_llm_provider().get_llm()
+def get_embedding_provider(provider: str | None = None) -> EmbeddingProvider:
+    _, emb_ref = _PROVIDERS[provider or settings.llm_provider]
+    return _resolve(emb_ref)()
 
 
-def get_streaming_llm():
-    return get_llm_provider().get_streaming_llm()
+def get_llm(provider: str | None = None):
+    name = provider or settings.llm_provider
+    return limit_llm(get_llm_provider(name).get_llm(), name)
 
 
-def get_embeddings():
-    return get_embedding_provider().get_embeddings()
+def get_streaming_llm(provider: str | None = None):
+    name = provider or settings.llm_provider
+    return limit_llm(get_llm_provider(name).get_streaming_llm(), name)
+
+
+def get_embeddings(provider: str | None = None):
+    name = provider or settings.llm_provider
+    embedding_provider = get_embedding_provider(name)
+    limited = RateLimitedEmbeddings(embedding_provider.get_embeddings(), name)
+    return CachedEmbeddings(
+        limited,
+        f"{name}:{embedding_provider.get_model_name()}",
+        batch_queries=embedding_provider.symmetric_queries,
+    )
+
+
+def get_embedding_model_id(provider: str | None = None) -> str:
+    """Provider-qualified embedding model name, e.g. "openai:text-embedding-3-small"."""
+    name = provider or settings.llm_provider
+    return f"{name}:{get_embedding_provider(name).get_model_name()}"
@@ -21,8 +21,13 @@ class GeminiLLMProvider(LLMProvider):
 
 
 class GeminiEmbeddingProvider(EmbeddingProvider):
+    symmetric_queries = False  # queries use the retrieval_query task type
+
     def get_embeddings(self):
         return GoogleGenerativeAIEmbeddings(
             model=settings.gemini_embedding_model,
             google_api_key=settings.google_api_key,
         )
+
+    def get_model_name(self):
+        return settings.gemini_embedding_model
@@ -2,10 +2,11 @@ import os
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 from langchain_groq import ChatGroq
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from providers.base import LLMProvider, EmbeddingProvider
 from config import settings
 
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
 _cached_embeddings = None
 
 
@@ -30,7 +31,12 @@ class GroqEmbeddingProvider(EmbeddingProvider):
     def get_embeddings(self):
         global _cached_embeddings
         if _cached_embeddings is None:
+            # Pulls in sentence_transformers/torch; only paid when Groq's embeddings are used
+            from langchain_community.embeddings import HuggingFaceEmbeddings
             _cached_embeddings = HuggingFaceEmbeddings(
-                model_name="all-MiniLM-L6-v2",
+                model_name=EMBEDDING_MODEL,
             )
         return _cached_embeddings
+
+    def get_model_name(self):
+        return EMBEDDING_MODEL
@@ -0,0 +1,221 @@
+"""Hedged generation across an ordered set of LLM providers.
+
+With settings.hedge_providers set, a streamed answer starts on the first
+provider in the current order. If no token has arrived after the hedge
+delay (fixed, or that provider's observed p95 time to first token), the
+same prompt goes to the next provider as well; the first stream to
+produce a token is kept and the others are cancelled. A provider that
+fails before its first token, or ends its stream without one, is replaced
+by the next one right away.
+Time to first token and errors are tracked per provider, and the order
+is re-sorted by them so a degraded provider stops leading.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from config import settings
+from providers.factory import get_streaming_llm
+
+logger = logging.getLogger(__name__)
+
+_WINDOW = 200  # recent calls kept per provider
+_MIN_SAMPLES = 10  # before observed latency replaces the default delay
+_DEFAULT_DELAY_S = 2.0
+
+
+class ProviderHealth:
+    """Rolling time-to-first-token and error record for one provider."""
+
+    def __init__(self):
+        self.first_token_s: deque[float] = deque(maxlen=_WINDOW)
+        self.outcomes: deque[bool] = deque(maxlen=_WINDOW)
+        self.started = 0
+        self.wins = 0
+        self.cancelled = 0
+
+    def record_success(self, first_token_s: float):
+        self.first_token_s.append(first_token_s)
+        self.outcomes.append(True)
+
+    def record_error(self):
+        self.outcomes.append(False)
+
+    def p95(self) -> float | None:
+        if len(self.first_token_s) < _MIN_SAMPLES:
+            return None
+        ordered = sorted(self.first_token_s)
+        return ordered[int(len(ordered) * 0.95)]
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def score(self) -> float | None:
+        """Lower is better; None until there is enough latency data to compare."""
+        p95 = self.p95()
+        if p95 is None:
+            return None
+        return p95 * (1 + 10 * self.error_rate())
+
+    def snapshot(self) -> dict:
+        p95 = self.p95()
+        ordered = sorted(self.first_token_s)
+        return {
+            "calls": self.started,
+            "wins": self.wins,
+            "cancelled": self.cancelled,
+            "error_rate": round(self.error_rate(), 4),
+            "first_token_p50_ms": round(ordered[len(ordered) // 2] * 1000, 1) if ordered else None,
+            "first_token_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+_health: dict[str, ProviderHealth] = {}
+
+
+def get_health(provider: str) -> ProviderHealth:
+    if provider not in _health:
+        _health[provider] = ProviderHealth()
+    return _health[provider]
+
+
+def hedging_enabled() -> bool:
+    return bool(settings.hedge_providers)
+
+
+def provider_order() -> list[str]:
+    """Configured providers, measured ones sorted by score ahead of the unmeasured in configured order."""
+    configured = list(dict.fromkeys(settings.hedge_providers or [settings.llm_provider]))
+    if not settings.hedge_auto_reorder:
+        return configured
+
+    def key(item):
+        position, provider = item
+        health = _health.get(provider)
+        score = health.score() if health else None
+        return (0, score, position) if score is not None else (1, 0.0, position)
+
+    return [provider for _, provider in sorted(enumerate(configured), key=key)]
+
+
+def hedge_delay(provider: str) -> float:
+    """How long to wait for a provider's first token before hedging."""
+    if settings.hedge_delay_ms:
+        return settings.hedge_delay_ms / 1000
+    p95 = get_health(provider).p95()
+    if p95 is None:
+        return _DEFAULT_DELAY_S
+    return max(p95, settings.hedge_min_delay_ms / 1000)
+
+
+def health_snapshot() -> dict:
+    order = provider_order()
+    return {
+        "enabled": hedging_enabled(),
+        "order": order,
+        "hedge_delay_ms": round(hedge_delay(order[0]) * 1000, 1),
+        "providers": {name: get_health(name).snapshot() for name in order},
+    }
+
+
+def _has_content(chunk) -> bool:
+    return bool(chunk.content if hasattr(chunk, "content") else chunk)
+
+
+class _Attempt:
+    """One provider's stream, advanced up to its first non-empty chunk in a task."""
+
+    def __init__(self, provider: str, prompt):
+        self.provider = provider
+        self.started = time.monotonic()
+        self.failed = False
+        self.stream = get_streaming_llm(provider).astream(prompt)
+        self.first = asyncio.create_task(self._first_token())
+        get_health(provider).started += 1
+
+    async def _first_token(self):
+        # Role-only chunks some providers send first do not count as an answer
+        while True:
+            try:
+                chunk = await self.stream.__anext__()
+            except StopAsyncIteration:
+                return None
+            if _has_content(chunk):
+                return chunk
+
+    async def abort(self):
+        if not self.first.done():
+            self.first.cancel()
+            get_health(self.provider).cancelled += 1
+        await asyncio.gather(self.first, return_exceptions=True)
+        try:
+            await self.stream.aclose()
+        except Exception:
+            pass
+
+
+async def hedged_stream(prompt):
+    """Stream chunks for a prompt value from whichever provider answers first."""
+    pending = provider_order()
+    attempts: list[_Attempt] = []
+    last_error: BaseException | None = None
+
+    def launch():
+        attempts.append(_Attempt(pending.pop(0), prompt))
+
+    winner = None
+    launch()
+    try:
+        while winner is None:
+            live = [a for a in attempts if not a.failed]
+            if not live:
+                raise last_error
+            timeout = None
+            if pending and len(live) < settings.hedge_max_in_flight:
+                newest = live[-1]
+                timeout = max(0.0, newest.started + hedge_delay(newest.provider) - time.monotonic())
+            done, _ = await asyncio.wait([a.first for a in live], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                logger.debug("No first token from %s yet, hedging to %s", live[-1].provider, pending[0])
+                launch()
+                continue
+            for attempt in live:
+                if attempt.first not in done:
+                    continue
+                error = attempt.first.exception()
+                if error is None and attempt.first.result() is not None:
+                    winner = attempt
+                    break
+                attempt.failed = True
+                last_error = error or RuntimeError(f"Provider {attempt.provider} returned an empty answer")
+                get_health(attempt.provider).record_error()
+                logger.warning("Provider %s failed before answering: %s", attempt.provider, last_error)
+                if pending:
+                    launch()
+
+        health = get_health(winner.provider)
+        health.record_success(time.monotonic() - winner.started)
+        health.wins += 1
+        for attempt in attempts:
+            if attempt is not winner:
+                await attempt.abort()
+
+        yield winner.first.result()
+        try:
+            async for chunk in winner.stream:
+                yield chunk
+        except Exception:
+            # Tokens are already out, so a mid-stream failure cannot move providers
+            health.record_error()
+            raise
+    finally:
+        for attempt in attempts:
+            await attempt.abort()
+
+
+async def hedged_invoke(prompt) -> str:
+    """Complete answer text from hedged_stream."""
+    parts = []
+    async for chunk in hedged_stream(prompt):
+        parts.append(chunk.content if hasattr(chunk, "content") else str(chunk))
+    return "".join(parts)
@@ -26,3 +26,6 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
             model=settings.openai_embedding_model,
             api_key=settings.openai_api_key,
         )
+
+    def get_model_name(self):
+        return settings.openai_embedding_model
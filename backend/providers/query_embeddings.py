@@ -0,0 +1,198 @@
+import contextvars
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from langchain_core.embeddings import Embeddings
+from config import settings
+
+
+def normalize_query(text: str) -> str:
+    # Case is kept: it can change the embedding (acronyms, names)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class _QueryVectors:
+    """Query vectors for one embedding model: an LRU plus the batch being collected.
+
+    embed_query is called from worker threads. The first caller to miss
+    starts a batching thread, which waits embedding_batch_window_ms for other
+    callers to join, then embeds the waiting queries with one embed_documents
+    request per embedding_batch_max and hands each caller its vector. No
+    caller runs batches itself, so none waits on other callers' traffic.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vectors: OrderedDict[str, list[float]] = OrderedDict()
+        self._waiting: dict[str, Future] = {}
+        self._leading = False
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+        self.batched_queries = 0
+
+    def get(self, text: str, embeddings: Embeddings, batch: bool) -> list[float]:
+        with self._lock:
+            vector = self._vectors.get(text)
+            if vector is not None:
+                self._vectors.move_to_end(text)
+                self.hits += 1
+                return vector
+            self.misses += 1
+            if not batch:
+                future = None
+            else:
+                future = self._waiting.get(text)
+                if future is None:
+                    future = self._waiting[text] = Future()
+                start = not self._leading
+                self._leading = True
+
+        if future is None:
+            vector = embeddings.embed_query(text)
+            with self._lock:
+                self.requests += 1
+                self.batched_queries += 1
+            self._remember(text, vector)
+            return vector
+        if start:
+            # The batch's provider calls run at the priority of the caller that started it
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(self._run_batches, embeddings), daemon=True).start()
+        return future.result()
+
+    def get_many(self, texts: list[str], embeddings: Embeddings, symmetric: bool = True) -> list[list[float]]:
+        """Vectors for many texts, the uncached ones embedded with one embed_documents request.
+
+        Models whose query vectors differ from document vectors have no such
+        request; their queries are embedded one by one, embedding_batch_max at a time.
+        """
+        with self._lock:
+            found = {text: self._vectors[text] for text in texts if text in self._vectors}
+            for text in found:
+                self._vectors.move_to_end(text)
+            self.hits += sum(1 for text in texts if text in found)
+            missing = list(dict.fromkeys(text for text in texts if text not in found))
+            self.misses += len(missing)
+        if missing:
+            if symmetric:
+                vectors = embeddings.embed_documents(missing)
+            else:
+                vectors = self._embed_each(missing, embeddings)
+            with self._lock:
+                self.requests += 1 if symmetric else len(missing)
+                self.batched_queries += len(missing)
+            for text, vector in zip(missing, vectors):
+                self._remember(text, vector)
+                found[text] = vector
+        return [found[text] for text in texts]
+
+    @staticmethod
+    def _embed_each(texts: list[str], embeddings: Embeddings) -> list[list[float]]:
+        with ThreadPoolExecutor(max_workers=min(len(texts), max(1, settings.embedding_batch_max))) as pool:
+            # Each request keeps the caller's scheduler priority
+            futures = [pool.submit(contextvars.copy_context().run, embeddings.embed_query, text) for text in texts]
+            return [future.result() for future in futures]
+
+    def _run_batches(self, embeddings: Embeddings):
+        time.sleep(settings.embedding_batch_window_ms / 1000)
+        while True:
+            with self._lock:
+                if not self._waiting:
+                    self._leading = False
+                    return
+                texts = list(self._waiting)[:max(1, settings.embedding_batch_max)]
+                futures = [self._waiting.pop(text) for text in texts]
+            try:
+                vectors = embeddings.embed_documents(texts)
+                if len(vectors) != len(texts):
+                    raise ValueError(f"Embedding model returned {len(vectors)} vectors for {len(texts)} queries")
+                with self._lock:
+                    self.requests += 1
+                    self.batched_queries += len(texts)
+                for text, vector, future in zip(texts, vectors, futures):
+                    self._remember(text, vector)
+                    future.set_result(vector)
+            except Exception as exc:
+                # Every caller of the batch is waiting on its future
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def _remember(self, text: str, vector: list[float]):
+        if settings.embedding_cache_size <= 0:
+            return
+        with self._lock:
+            self._vectors[text] = vector
+            self._vectors.move_to_end(text)
+            while len(self._vectors) > settings.embedding_cache_size:
+                self._vectors.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._vectors),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "requests": self.requests,
+                "avg_batch": round(self.batched_queries / self.requests, 2) if self.requests else None,
+            }
+
+
+_models: dict[str, _QueryVectors] = {}
+_models_lock = threading.Lock()
+
+
+def _query_vectors(model_id: str) -> _QueryVectors:
+    with _models_lock:
+        if model_id not in _models:
+            _models[model_id] = _QueryVectors()
+        return _models[model_id]
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that caches query vectors and merges concurrent queries into batches.
+
+    State is shared by every wrapper of the same model, so the per-call
+    objects get_embeddings() returns (and the vector store holds) all hit
+    one cache. Document embedding passes straight through.
+    """
+
+    def __init__(self, inner: Embeddings, model_id: str, batch_queries: bool = True):
+        self.inner = inner
+        self.model_id = model_id
+        self.batch_queries = batch_queries
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        batch = self.batch_queries and settings.embedding_batch_window_ms > 0
+        return _query_vectors(self.model_id).get(normalize_query(text), self.inner, batch)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Query vectors for many texts, the same ones embed_query would return.
+
+        Models with symmetric query and document vectors embed the uncached
+        texts in one request; the others need embed_query for each, run
+        concurrently.
+        """
+        return _query_vectors(self.model_id).get_many(
+            [normalize_query(text) for text in texts], self.inner, symmetric=self.batch_queries
+        )
+
+    def __getattr__(self, name):
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+
+def query_embedding_stats() -> dict:
+    """Cache and batching counters per embedding model."""
+    with _models_lock:
+        models = dict(_models)
+    return {model_id: vectors.stats() for model_id, vectors in models.items()}
@@ -0,0 +1,347 @@
+"""Per-provider rate limiting with interactive calls served ahead of background work.
+
+Every LLM and embedding client handed out by providers.factory draws from a
+token bucket per (provider, kind): one bucket for requests per minute, one
+for tokens per minute. Callers that have to wait queue by priority, so a
+chat turn waiting for quota is admitted before any queued ingestion,
+connector sync or re-index batch. The priority comes from a context
+variable, which asyncio tasks and asyncio.to_thread carry along, so
+background jobs only have to declare themselves once at the top.
+"""
+import asyncio
+import functools
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.embeddings import Embeddings
+from config import settings
+
+INTERACTIVE = 0
+BATCH = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", BACKGROUND: "background"}
+
+_priority: ContextVar[int] = ContextVar("provider_priority", default=INTERACTIVE)
+
+# Longest a waiter sleeps before re-checking the buckets
+_MAX_POLL_S = 0.25
+_WAIT_SAMPLES = 1000
+
+
+@contextmanager
+def priority(level: int):
+    """Run provider calls made inside the block (and tasks/threads it starts) at this priority."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def run_at(level: int):
+    """Decorator for coroutine jobs whose provider calls all run at one priority."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with priority(level):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough 4-characters-per-token rule; exact counts would cost a tokenizer pass per call
+    return len(text) // 4 + 1
+
+
+class _Bucket:
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+
+    def refill(self, elapsed: float):
+        self.level = min(self.capacity, self.level + elapsed * self.rate)
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until the bucket holds amount (clamped to capacity)."""
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+
+class _Waiter:
+    __slots__ = ("priority", "tokens", "granted", "event")
+
+    def __init__(self, priority: int, tokens: int):
+        self.priority = priority
+        self.tokens = tokens
+        self.granted = False
+        self.event = threading.Event()
+
+
+class RateLimiter:
+    """Token buckets for one provider endpoint plus a priority queue of callers waiting on them."""
+
+    def __init__(self, name: str, rpm: int, tpm: int):
+        self.name = name
+        self.limits = (max(rpm, 0), max(tpm, 0))
+        self._lock = threading.Lock()
+        self._requests = _Bucket(rpm) if rpm > 0 else None
+        self._tokens = _Bucket(tpm) if tpm > 0 else None
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._queue: list[tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._granted = {level: 0 for level in PRIORITY_NAMES}
+        self._waits = {level: deque(maxlen=_WAIT_SAMPLES) for level in PRIORITY_NAMES}
+        self.rate_limited = 0
+
+    @property
+    def unlimited(self) -> bool:
+        return self._requests is None and self._tokens is None
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        for bucket in (self._requests, self._tokens):
+            if bucket is not None:
+                bucket.refill(elapsed)
+
+    def _dispatch(self) -> float:
+        """Admit queued callers strictly in priority order; seconds until the head can go."""
+        now = time.monotonic()
+        self._refill(now)
+        while self._queue:
+            if now < self._paused_until:
+                return self._paused_until - now
+            waiter = self._queue[0][2]
+            delay = max(
+                self._requests.wait_for(1) if self._requests else 0.0,
+                self._tokens.wait_for(waiter.tokens) if self._tokens else 0.0,
+            )
+            if delay > 0:
+                return delay
+            heapq.heappop(self._queue)
+            if self._requests:
+                self._requests.level -= 1
+            if self._tokens:
+                self._tokens.level -= min(waiter.tokens, self._tokens.capacity)
+            waiter.granted = True
+            waiter.event.set()
+        return 0.0
+
+    def _enqueue(self, tokens: int) -> _Waiter:
+        waiter = _Waiter(current_priority(), tokens)
+        heapq.heappush(self._queue, (waiter.priority, next(self._seq), waiter))
+        return waiter
+
+    def _record(self, waiter: _Waiter, started: float):
+        self._granted[waiter.priority] += 1
+        self._waits[waiter.priority].append(time.monotonic() - started)
+
+    def acquire(self, tokens: int = 0):
+        """Block the calling thread until the call may go out."""
+        if self.unlimited and not self._paused_until:
+            return
+        started = time.monotonic()
+        with self._lock:
+            waiter = self._enqueue(tokens)
+        while True:
+            with self._lock:
+                delay = self._dispatch()
+                if waiter.granted:
+                    self._record(waiter, started)
+                    return
+            waiter.event.wait(min(max(delay, 0.001), _MAX_POLL_S))
+
+    async def aacquire(self, tokens: int = 0):
+        """acquire() for coroutines: waits without holding a worker thread."""
+        if self.unlimited and not self._paused_until:
+            return
+        started = time.monotonic()
+        with self._lock:
+            waiter = self._enqueue(tokens)
+        try:
+            while True:
+                with self._lock:
+                    delay = self._dispatch()
+                    if waiter.granted:
+                        self._record(waiter, started)
+                        return
+                await asyncio.sleep(min(max(delay, 0.001), _MAX_POLL_S))
+        except asyncio.CancelledError:
+            with self._lock:
+                if not waiter.granted:
+                    self._queue = [entry for entry in self._queue if entry[2] is not waiter]
+                    heapq.heapify(self._queue)
+            raise
+
+    def consume(self, tokens: int):
+        """Settle the difference between actual usage and the estimate charged up front."""
+        if self._tokens is None or not tokens:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level - tokens)
+
+    def pause(self, seconds: float):
+        """Hold every queued call after the provider reported a rate limit."""
+        with self._lock:
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for level, _, _ in self._queue:
+                depth[PRIORITY_NAMES[level]] += 1
+            waits = {}
+            for level, samples in self._waits.items():
+                ordered = sorted(samples)
+                waits[PRIORITY_NAMES[level]] = {
+                    "granted": self._granted[level],
+                    "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1) if ordered else 0.0,
+                    "p95_ms": round(ordered[int(len(ordered) * 0.95)] * 1000, 1) if ordered else 0.0,
+                    "max_ms": round(ordered[-1] * 1000, 1) if ordered else 0.0,
+                }
+            return {
+                "rpm": int(self._requests.capacity) if self._requests else None,
+                "tpm": int(self._tokens.capacity) if self._tokens else None,
+                "requests_available": int(self._requests.level) if self._requests else None,
+                "tokens_available": int(self._tokens.level) if self._tokens else None,
+                "paused_s": round(max(0.0, self._paused_until - time.monotonic()), 2),
+                "rate_limited": self.rate_limited,
+                "queue_depth": depth,
+                "wait": waits,
+            }
+
+
+_limiters: dict[tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _limits(provider: str, kind: str) -> tuple[int, int]:
+    overrides = settings.provider_rate_limits.get(provider, {})
+    return (
+        overrides.get(f"{kind}_rpm", getattr(settings, f"{kind}_rpm")),
+        overrides.get(f"{kind}_tpm", getattr(settings, f"{kind}_tpm")),
+    )
+
+
+def get_limiter(provider: str, kind: str) -> RateLimiter:
+    """The shared limiter for a provider's "llm" or "embedding" endpoint."""
+    key = (provider, kind)
+    with _limiters_lock:
+        rpm, tpm = _limits(provider, kind)
+        limiter = _limiters.get(key)
+        if limiter is None or limiter.limits != (max(rpm, 0), max(tpm, 0)):
+            # Created on first use and replaced when the limits are changed
+            limiter = _limiters[key] = RateLimiter(f"{provider}:{kind}", rpm, tpm)
+        return limiter
+
+
+def scheduler_stats() -> dict:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
+
+
+def _is_rate_limit_error(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or "RateLimit" in type(error).__name__ or "429" in str(error)[:200]
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """Embeddings wrapper that takes quota per request and splits large batches.
+
+    Splitting lets a chat query's embedding slip in between the requests of
+    a large upload instead of queueing behind all of it.
+    """
+
+    def __init__(self, inner: Embeddings, provider: str):
+        self.inner = inner
+        self.provider = provider
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        limiter = get_limiter(self.provider, "embedding")
+        if limiter.unlimited:
+            return self.inner.embed_documents(texts)
+        size = max(1, settings.embedding_request_batch)
+        vectors = []
+        for start in range(0, len(texts), size):
+            batch = texts[start:start + size]
+            limiter.acquire(sum(estimate_tokens(t) for t in batch))
+            vectors.extend(self._call(limiter, self.inner.embed_documents, batch))
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        limiter = get_limiter(self.provider, "embedding")
+        limiter.acquire(estimate_tokens(text))
+        return self._call(limiter, self.inner.embed_query, text)
+
+    def _call(self, limiter: RateLimiter, fn, arg):
+        try:
+            return fn(arg)
+        except Exception as exc:
+            if _is_rate_limit_error(exc):
+                limiter.pause(settings.rate_limit_backoff_s)
+            raise
+
+    def __getattr__(self, name):
+        # Provider-specific attributes (model name, client) stay reachable
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+
+class RateLimitCallback(AsyncCallbackHandler):
+    """Waits for quota when an LLM call starts and settles actual usage when it ends.
+
+    LangChain awaits async handlers before sending the request and runs them
+    to completion for synchronous calls too, so one handler covers invoke,
+    ainvoke, stream and astream.
+    """
+
+    raise_error = True
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._estimates: dict = {}
+
+    async def _start(self, run_id, text: str):
+        tokens = estimate_tokens(text) + settings.answer_token_reserve
+        self._estimates[run_id] = tokens
+        await get_limiter(self.provider, "llm").aacquire(tokens)
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        await self._start(run_id, "".join(str(m.content) for batch in messages for m in batch))
+
+    async def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        await self._start(run_id, "".join(prompts))
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        estimate = self._estimates.pop(run_id, 0)
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage.get("total_tokens"):
+            get_limiter(self.provider, "llm").consume(usage["total_tokens"] - estimate)
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._estimates.pop(run_id, None)
+        if _is_rate_limit_error(error):
+            get_limiter(self.provider, "llm").pause(settings.rate_limit_backoff_s)
+
+
+def limit_llm(llm, provider: str):
+    """Attach the provider's limiter to a LangChain model instance."""
+    llm.callbacks = [*(llm.callbacks or []), RateLimitCallback(provider)]
+    return llm
@@ -34,3 +34,6 @@ class WatsonxEmbeddingProvider(EmbeddingProvider):
             apikey=settings.watsonx_api_key,
             project_id=settings.watsonx_project_id,
         )
+
+    def get_model_name(self):
+        return settings.watsonx_embedding_model
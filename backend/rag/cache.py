@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from langchain_core.documents import Document
+from bus.factory import on_invalidate
+from config import settings
+from providers.query_embeddings import normalize_query
+from vectorstore.chroma import get_active_index
+
+logger = logging.getLogger(__name__)
+
+# Settings that change which chunks come back, or in what order
+_KEY_SETTINGS = (
+    "llm_provider",  # multi-query and HyDE prompts
+    "retrieval_top_k",
+    "rerank_top_k",
+    "bm25_weight",
+    "vector_weight",
+    "use_hybrid_search",
+    "use_multi_query",
+    "use_hyde",
+    "use_reranking",
+    "use_compression",
+    "use_doc_routing",
+    "routing_top_docs",
+    "compression_scorer",
+    "compression_max_sentences",
+    "compression_window",
+    "local_use_hnsw",
+)
+
+# Bumped when what an entry holds changes (2: best-first, no long-context reorder)
+_ENTRY_VERSION = 2
+
+DISK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS retrieval_cache (
+    key TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL,
+    docs TEXT NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS retrieval_cache_meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    generation INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO retrieval_cache_meta (id, generation) VALUES (1, 0);
+"""
+
+
+def _json_default(value):
+    # NumPy scores from the local backend
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class RetrievalCache:
+    """LRU of final ranked chunk lists per standalone question.
+
+    Keys combine the normalized question, its document scope, the
+    retrieval settings and the active collection (embedding model, chunking
+    and HNSW spec) with a corpus generation that every ingest, delete and
+    index switch bumps, so a write anywhere makes all earlier entries
+    unreachable. With
+    retrieval_cache_path set, entries also go to a SQLite file shared by the
+    workers on the host; its generation is bumped alongside this one.
+    """
+
+    def __init__(self):
+        self._entries: OrderedDict[str, list[tuple[str, dict]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk_ready = False
+        self._last_disk_generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.retrieval_cache_size > 0
+
+    def key(self, question: str, scope: list[str] | None = None) -> str:
+        active = get_active_index()
+        parts = {
+            "version": _ENTRY_VERSION,
+            "question": normalize_query(question),
+            "scope": sorted(scope) if scope is not None else None,
+            "index": active["name"],
+            "spec": active["spec"],
+            "settings": {name: getattr(settings, name) for name in _KEY_SETTINGS},
+        }
+        return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def lookup(self, question: str, scope: list[str] | None = None) -> tuple[str, list[Document] | None]:
+        """(key, cached docs or None); pass the key back to store() after a miss."""
+        # The generation is read before retrieving, so results computed across
+        # an invalidation are stored under the old one and never served
+        key = f"{self.generation}:{self._disk_generation()}:{self.key(question, scope)}"
+        with self._lock:
+            chunks = self._entries.get(key)
+            if chunks is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return key, self._documents(chunks)
+        chunks = self._disk_get(key)
+        if chunks is not None:
+            self._remember(key, chunks)
+            with self._lock:
+                self.disk_hits += 1
+            return key, self._documents(chunks)
+        with self._lock:
+            self.misses += 1
+        return key, None
+
+    def store(self, key: str, docs: list[Document]):
+        chunks = [(doc.page_content, dict(doc.metadata)) for doc in docs]
+        self._remember(key, chunks)
+        self._disk_put(key, chunks)
+
+    def _remember(self, key: str, chunks: list[tuple[str, dict]]):
+        with self._lock:
+            self._entries[key] = chunks
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.retrieval_cache_size:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _documents(chunks: list[tuple[str, dict]]) -> list[Document]:
+        # Callers annotate metadata (scores, citations); never hand out the cached dicts
+        return [Document(page_content=text, metadata=dict(meta)) for text, meta in chunks]
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    # Shared SQLite tier
+
+    @contextmanager
+    def _disk(self):
+        """A transaction on the shared file, or None when there is none."""
+        path = settings.retrieval_cache_path
+        if not path:
+            yield None
+            return
+        if not self._disk_ready:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5)
+        try:
+            if not self._disk_ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(DISK_SCHEMA)
+                self._disk_ready = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _disk_generation(self) -> int:
+        # While the file is unreadable the last generation seen keeps keys, and so the memory tier, working
+        try:
+            with self._disk() as conn:
+                if conn is None:
+                    return 0
+                row = conn.execute("SELECT generation FROM retrieval_cache_meta WHERE id = 1").fetchone()
+                self._last_disk_generation = row[0]
+        except sqlite3.Error:
+            logger.warning("Could not read retrieval cache generation", exc_info=True)
+        return self._last_disk_generation
+
+    def _disk_get(self, key: str) -> list[tuple[str, dict]] | None:
+        try:
+            with self._disk() as conn:
+                if conn is None:
+                    return None
+                row = conn.execute("SELECT docs FROM retrieval_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE retrieval_cache SET used_at = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error:
+            logger.warning("Could not read retrieval cache entry", exc_info=True)
+            return None
+        return [tuple(chunk) for chunk in json.loads(row[0])]
+
+    def _disk_put(self, key: str, chunks: list[tuple[str, dict]]):
+        generation = int(key.split(":", 2)[1])
+        try:
+            with self._disk() as conn:
+                if conn is None:
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO retrieval_cache (key, generation, docs, used_at) VALUES (?, ?, ?, ?)",
+                    (key, generation, json.dumps(chunks, default=_json_default), time.time()),
+                )
+                # Same bound as the memory tier, oldest use first
+                conn.execute(
+                    """DELETE FROM retrieval_cache WHERE key IN (
+                           SELECT key FROM retrieval_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)""",
+                    (settings.retrieval_cache_size,),
+                )
+        except sqlite3.Error:
+            logger.warning("Could not write retrieval cache entry", exc_info=True)
+
+    def _disk_invalidate(self):
+        with self._disk() as conn:
+            if conn is None:
+                return
+            conn.execute("UPDATE retrieval_cache_meta SET generation = generation + 1 WHERE id = 1")
+            conn.execute(
+                "DELETE FROM retrieval_cache WHERE generation < (SELECT generation FROM retrieval_cache_meta)"
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": settings.retrieval_cache_size,
+                "shared_path": settings.retrieval_cache_path or None,
+                "generation": self.generation,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else None,
+            }
+
+
+retrieval_cache = RetrievalCache()
+
+
+@on_invalidate("vectorstore")
+@on_invalidate("index")
+async def _on_corpus_changed(message: dict):
+    retrieval_cache.invalidate()
+    # Every worker bumps the shared generation; one bump would do, more are harmless
+    await asyncio.to_thread(retrieval_cache._disk_invalidate)
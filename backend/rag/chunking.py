@@ -1,12 +1,103 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from langchain_core.documents import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from rag.tokens import count_tokens
 from config import settings
 
+# Structural boundaries first (page breaks, markdown headings), then
+# paragraphs, lines (keeps table rows whole), sentences and words.
+SEPARATORS = ["\f", "\n# ", "\n## ", "\n### ", "\n#### ", "\n\n", "\n", ". ", " ", ""]
 
-def chunk_documents(docs: list[Document]) -> list[Document]:
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=settings.chunk_size,
-        chunk_overlap=settings.chunk_overlap,
-        separators=["\n\n", "\n", ". ", " ", ""],
+# metadata["chunking"] of documents a loader already cut to chunk size (tabular
+# row blocks); they are passed through, also when re-indexing re-chunks
+ROW_BLOCKS = "rows"
+
+_executor: ProcessPoolExecutor | None = None
+_executor_workers = 0
+
+
+@lru_cache(maxsize=8)
+def get_splitter(chunk_size: int, chunk_overlap: int, tokenizer: str) -> RecursiveCharacterTextSplitter:
+    if tokenizer:
+        length_function = lambda text: count_tokens(text, tokenizer)  # noqa: E731
+    else:
+        length_function = len
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=SEPARATORS,
+        length_function=length_function,
+        add_start_index=True,
     )
-    return splitter.split_documents(docs)
+
+
+def _split_batch(docs: list[Document], chunk_size: int, chunk_overlap: int, tokenizer: str) -> list[Document]:
+    # Runs in worker processes, so settings are passed explicitly rather than
+    # read from the (possibly stale) child copy of config.settings.
+    return get_splitter(chunk_size, chunk_overlap, tokenizer).split_documents(docs)
+
+
+def _worker_count() -> int:
+    if settings.chunk_workers > 0:
+        return settings.chunk_workers
+    return os.cpu_count() or 1
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        # spawn, not fork: the parent runs an event loop and worker threads
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _executor_workers = workers
+    return _executor
+
+
+def shutdown_chunk_workers():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _make_batches(docs: list[Document], n_batches: int) -> list[list[Document]]:
+    """Split docs into contiguous batches of roughly equal text size."""
+    total = sum(len(doc.page_content) for doc in docs)
+    target = max(total // n_batches, 1)
+    batches, current, size = [], [], 0
+    for doc in docs:
+        current.append(doc)
+        size += len(doc.page_content)
+        if size >= target:
+            batches.append(current)
+            current, size = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+
+def chunk_documents(docs: list[Document]) -> list[Document]:
+    # Tabular row blocks come from the loader already chunk-sized
+    blocks = [doc for doc in docs if doc.metadata.get("chunking") == ROW_BLOCKS]
+    if blocks:
+        rest = [doc for doc in docs if doc.metadata.get("chunking") != ROW_BLOCKS]
+        return blocks + (chunk_documents(rest) if rest else [])
+
+    args = (settings.chunk_size, settings.chunk_overlap, settings.chunk_tokenizer)
+    workers = _worker_count()
+    total_chars = sum(len(doc.page_content) for doc in docs)
+
+    if workers <= 1 or len(docs) < 2 or total_chars < settings.chunk_parallel_min_chars:
+        return _split_batch(docs, *args)
+
+    executor = _get_executor(workers)
+    batches = _make_batches(docs, workers * 4)
+    futures = [executor.submit(_split_batch, batch, *args) for batch in batches]
+    chunks = []
+    for future in futures:
+        chunks.extend(future.result())
+    return chunks
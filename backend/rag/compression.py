@@ -0,0 +1,104 @@
+import math
+import re
+from langchain_core.documents import Document
+from providers.factory import get_embeddings
+from rag.postprocessing import _cosine_similarity
+from config import settings
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"\w+")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the "
+    "this to was were what when where which who why will with do does did can".split()
+)
+
+GAP_MARKER = " … "
+
+
+def split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+
+
+def _terms(text: str) -> list[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def _lexical_scores(question: str, sentences: list[list[str]]) -> list[list[float]]:
+    """IDF-weighted term overlap, IDF computed over all candidate sentences."""
+    query_terms = set(_terms(question))
+    if not query_terms:
+        return [[0.0] * len(doc_sents) for doc_sents in sentences]
+
+    sentence_terms = [[set(_terms(s)) for s in doc_sents] for doc_sents in sentences]
+    n = sum(len(doc_terms) for doc_terms in sentence_terms) or 1
+    df = {t: sum(1 for doc_terms in sentence_terms for terms in doc_terms if t in terms) for t in query_terms}
+    idf = {t: math.log(1 + n / (1 + df[t])) for t in query_terms}
+
+    return [
+        [sum(idf[t] for t in query_terms & terms) / math.sqrt(len(terms) or 1) for terms in doc_terms]
+        for doc_terms in sentence_terms
+    ]
+
+
+def _embedding_scores(question: str, sentences: list[list[str]]) -> list[list[float]]:
+    """Cosine similarity to the question, with all sentences embedded in one batch."""
+    embeddings = get_embeddings()
+    flat = [s for doc_sents in sentences for s in doc_sents]
+    if not flat:
+        return [[] for _ in sentences]
+    query_vec = embeddings.embed_query(question)
+    vectors = iter(embeddings.embed_documents(flat))
+    return [[_cosine_similarity(query_vec, next(vectors)) for _ in doc_sents] for doc_sents in sentences]
+
+
+def _select_spans(scores: list[float], max_sentences: int, window: int) -> list[int]:
+    top = sorted(
+        (i for i, score in enumerate(scores) if score > 0),
+        key=lambda i: scores[i],
+        reverse=True,
+    )[:max_sentences]
+    keep = set()
+    for i in top:
+        keep.update(range(max(i - window, 0), min(i + window + 1, len(scores))))
+    return sorted(keep)
+
+
+def _join_spans(sentences: list[str], keep: list[int]) -> str:
+    parts = []
+    prev = None
+    for i in keep:
+        if prev is not None and i != prev + 1:
+            parts.append(GAP_MARKER)
+        elif prev is not None:
+            parts.append(" ")
+        parts.append(sentences[i])
+        prev = i
+    return "".join(parts)
+
+
+def compress_documents(question: str, documents: list[Document]) -> list[Document]:
+    """Keep only the sentences of each doc relevant to the question, plus neighbours.
+
+    The uncompressed chunk is kept in metadata["original_text"] so citations
+    still show the stored chunk.
+    """
+    if not documents:
+        return documents
+
+    sentences = [split_sentences(doc.page_content) for doc in documents]
+    if settings.compression_scorer == "embedding":
+        scores = _embedding_scores(question, sentences)
+    else:
+        scores = _lexical_scores(question, sentences)
+
+    result = []
+    for doc, doc_sents, doc_scores in zip(documents, sentences, scores):
+        keep = _select_spans(doc_scores, settings.compression_max_sentences, settings.compression_window)
+        if not keep or len(keep) == len(doc_sents):
+            # Nothing matched (e.g. a purely semantic hit) or nothing to cut
+            result.append(doc)
+            continue
+        metadata = {**doc.metadata, "original_text": doc.page_content}
+        result.append(Document(page_content=_join_spans(doc_sents, keep), metadata=metadata))
+    return result
@@ -1,167 +1,342 @@
+import asyncio
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import aiosqlite
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from providers.factory import get_llm, get_streaming_llm
+from providers.hedging import hedged_invoke, hedged_stream, hedging_enabled
 from vectorstore.chroma import get_vectorstore
 from rag.prompts import RAG_PROMPT, CONDENSE_QUESTION_PROMPT
-from rag.retrieval import get_hybrid_retriever, multi_query_retrieve, hyde_retrieve
-from rag.reranking import rerank_documents
-from rag.postprocessing import remove_redundant, reorder_long_context
-from models.schemas import Source
+from rag.retrieval import get_hybrid_retriever, multi_query_retrieve, hyde_retrieve, batch_retrieve
+from rag.reranking import rerank_documents, rerank_documents_batch
+from rag.postprocessing import remove_redundant, remove_redundant_batch
+from rag.compression import compress_documents
+from rag.packing import PackedPrompt, pack_prompt, pack_history, format_chat_history, row_range
+from models.schemas import RetrievalFilters, Source
 from config import settings
-from database import DB_PATH
+from rag.memory import load_history
+from rag.cache import retrieval_cache
+from rag.filters import resolve_scope, scope_where
 
 logger = logging.getLogger(__name__)
 
-MAX_HISTORY_MESSAGES = 10
+NO_CONTEXT_ANSWER = "I don't have enough context to answer this question. Please upload relevant documents first."
+
+
+class _StageTimer:
+    """Builds "stage" events and per-stage durations for one streamed turn."""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._current: str | None = None
+        self._current_start = self._start
+        self.timings: dict[str, float] = {}
+
+    def _elapsed_ms(self, since: float) -> float:
+        return round((time.perf_counter() - since) * 1000, 1)
+
+    def _close_current(self):
+        if self._current is not None:
+            self.timings[self._current] = self._elapsed_ms(self._current_start)
+
+    def mark(self, name: str):
+        self.timings[name] = self._elapsed_ms(self._start)
+
+    def start(self, stage: str) -> dict:
+        self._close_current()
+        self._current = stage
+        self._current_start = time.perf_counter()
+        return {"type": "stage", "stage": stage, "elapsed_ms": self._elapsed_ms(self._start)}
+
+    def finish(self) -> dict:
+        self._close_current()
+        self._current = None
+        return {"type": "stage", "stage": "complete", "elapsed_ms": self._elapsed_ms(self._start), "timings": self.timings}
 
 
 class RAGEngine:
     async def _load_chat_history(self, conversation_id: str | None) -> list[dict]:
-        """Load last N messages from the conversation."""
-        if not conversation_id:
-            return []
-        async with aiosqlite.connect(DB_PATH) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute(
-                "SELECT role, content FROM messages WHERE conversation_id = ? ORDER BY created_at DESC LIMIT ?",
-                (conversation_id, MAX_HISTORY_MESSAGES),
-            )
-            rows = await cursor.fetchall()
-        # Rows come newest-first, reverse to chronological order
-        return [{"role": row["role"], "content": row["content"]} for row in reversed(rows)]
+        """Rolling summary plus the latest raw messages of the conversation."""
+        return await load_history(conversation_id)
 
     def _format_chat_history(self, chat_history: list[dict]) -> str:
         """Format history into a readable string for prompts."""
         if not chat_history:
             return ""
-        lines = []
-        for msg in chat_history:
-            role = "User" if msg["role"] == "user" else "Assistant"
-            lines.append(f"{role}: {msg['content']}")
-        return "\n".join(lines)
+        return format_chat_history(chat_history)
 
     def _condense_question(self, question: str, chat_history: list[dict]) -> str:
         """Rewrite a follow-up question into a standalone question using history."""
         if not chat_history:
             return question
         llm = get_llm()
-        history_str = self._format_chat_history(chat_history)
+        history, _ = pack_history(chat_history, settings.history_token_budget)
+        history_str = self._format_chat_history(history)
         prompt = ChatPromptTemplate.from_template(CONDENSE_QUESTION_PROMPT)
         chain = prompt | llm | StrOutputParser()
         condensed = chain.invoke({"chat_history": history_str, "question": question})
         logger.info("Condensed question: %s -> %s", question, condensed.strip())
         return condensed.strip()
 
-    def _retrieve(self, question: str, chat_history: list[dict] | None = None) -> list[Document]:
-        """Configurable retrieval pipeline based on settings."""
+    def _retrieve(self, question: str, chat_history: list[dict] | None = None, scope: list[str] | None = None) -> list[Document]:
+        """Configurable retrieval pipeline based on settings, within scope's documents if given."""
+        if scope is not None and not scope:
+            return []  # the filters match no documents
         # Condense question using conversation history
         search_question = self._condense_question(question, chat_history or [])
+        if not retrieval_cache.enabled:
+            return self._rank(search_question, scope)
+
+        key, docs = retrieval_cache.lookup(search_question, scope)
+        if docs is None:
+            docs = self._rank(search_question, scope)
+            retrieval_cache.store(key, docs)
+        return docs
+
+    def _rank(self, search_question: str, scope: list[str] | None = None) -> list[Document]:
+        docs = self._search(search_question, scope)
+        if not docs:
+            return []
+        docs = self._rerank(search_question, docs)
+        docs = remove_redundant(docs)
+        return self._finalize(search_question, docs)
 
+    def _search(self, search_question: str, scope: list[str] | None = None) -> list[Document]:
         llm = get_llm()
+        where = scope_where(scope)
 
         # Step 1: Retrieve documents
         if settings.use_multi_query:
             logger.info("Using multi-query retrieval")
-            docs = multi_query_retrieve(search_question, llm)
+            docs = multi_query_retrieve(search_question, llm, where)
         elif settings.use_hyde:
             logger.info("Using HyDE retrieval")
-            docs = hyde_retrieve(search_question, llm)
+            docs = hyde_retrieve(search_question, llm, where)
+        elif settings.use_doc_routing:
+            # Routed first, then fused with BM25 over the scope, exactly as a batch of questions
+            logger.info("Using document-routed %s search", "hybrid" if settings.use_hybrid_search else "vector")
+            docs = batch_retrieve([search_question], scope)[0]
         elif settings.use_hybrid_search:
             logger.info("Using hybrid (BM25 + vector) retrieval")
-            retriever = get_hybrid_retriever()
+            retriever = get_hybrid_retriever(where)
             docs = retriever.invoke(search_question)
         else:
             logger.info("Using simple vector similarity search")
             vectorstore = get_vectorstore()
             results = vectorstore.similarity_search_with_relevance_scores(
-                search_question, k=settings.retrieval_top_k
+                search_question, k=settings.retrieval_top_k, filter=where
             )
             docs = []
             for doc, score in results:
                 doc.metadata["relevance_score"] = score
                 docs.append(doc)
+        return docs
 
-        if not docs:
-            return []
-
+    def _rerank(self, search_question: str, docs: list[Document]) -> list[Document]:
         # Step 2: Rerank if enabled
         if settings.use_reranking:
             logger.info("Reranking %d documents", len(docs))
             docs = rerank_documents(search_question, docs)
+        return docs
 
-        # Step 3: Post-processing (always applied)
-        docs = remove_redundant(docs)
-        docs = reorder_long_context(docs)
-
+    def _finalize(self, search_question: str, docs: list[Document]) -> list[Document]:
+        # Step 3: Post-processing after de-duplication (always applied)
+        if settings.use_compression:
+            docs = compress_documents(search_question, docs)
         return docs
 
-    def _build_context(self, docs: list[Document]) -> str:
-        return "\n\n---\n\n".join(
-            f"[Source: {doc.metadata.get('source_file', 'unknown')}]\n{doc.page_content}"
-            for doc in docs
-        )
+    def _retrieve_batch(self, questions: list[str], concurrency: int, scope: list[str] | None = None) -> list[list[Document]]:
+        """Retrieve for many independent questions, sharing embedding and rerank passes."""
+        if scope is not None and not scope:
+            return [[] for _ in questions]
+        if not retrieval_cache.enabled:
+            return self._rank_batch(questions, concurrency, scope)
+
+        results: list[list[Document] | None] = []
+        misses: dict[str, list[int]] = {}
+        keys: dict[str, str] = {}
+        for index, question in enumerate(questions):
+            key, docs = retrieval_cache.lookup(question, scope)
+            results.append(docs)
+            if docs is None:
+                # Repeats within the batch are retrieved once
+                misses.setdefault(key, []).append(index)
+                keys[key] = question
+        if misses:
+            miss_keys = list(misses)
+            ranked = self._rank_batch([keys[key] for key in miss_keys], concurrency, scope)
+            for key, docs in zip(miss_keys, ranked):
+                retrieval_cache.store(key, docs)
+                for index in misses[key]:
+                    results[index] = docs
+        return results
+
+    def _rank_batch(self, questions: list[str], concurrency: int, scope: list[str] | None = None) -> list[list[Document]]:
+        if settings.use_multi_query or settings.use_hyde:
+            # Both need a per-question LLM call, so only parallelise them
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                return list(pool.map(lambda q: self._rank(q, scope), questions))
+
+        doc_lists = batch_retrieve(questions, scope)
+        if settings.use_reranking:
+            logger.info("Batch reranking %d questions", len(questions))
+            doc_lists = rerank_documents_batch(questions, doc_lists)
+        doc_lists = remove_redundant_batch(doc_lists)
+        return [self._finalize(q, docs) if docs else [] for q, docs in zip(questions, doc_lists)]
 
     def _build_sources(self, docs: list[Document]) -> list[Source]:
         return [
             Source(
                 doc_name=doc.metadata.get("source_file", "unknown"),
                 page=doc.metadata.get("page"),
-                chunk_text=doc.page_content[:300],
+                sheet=doc.metadata.get("sheet"),
+                rows=row_range(doc.metadata),
+                chunk_text=doc.metadata.get("original_text", doc.page_content)[:300],
                 relevance_score=round(doc.metadata.get("relevance_score", 0.0), 4),
             )
             for doc in docs
         ]
 
-    def _build_chat_history_block(self, chat_history: list[dict]) -> str:
-        if not chat_history:
-            return ""
-        formatted = self._format_chat_history(chat_history)
-        return f"\nConversation so far:\n{formatted}\n"
+    def _pack(self, docs: list[Document], chat_history: list[dict], question: str) -> PackedPrompt:
+        """Fit retrieved docs and history into the model's prompt token budget."""
+        return pack_prompt(docs, chat_history, question)
 
-    async def query(self, question: str, conversation_id: str | None = None) -> tuple[str, list[Source]]:
+    async def search(self, query: str, filters: RetrievalFilters | None = None, conversation_id: str | None = None) -> list[Document]:
+        """Ranked chunks for a query as-is (no history, no generation)."""
+        scope = await resolve_scope(filters, conversation_id)
+        return await asyncio.to_thread(self._retrieve, query, None, scope)
+
+    async def query(
+        self, question: str, conversation_id: str | None = None, filters: RetrievalFilters | None = None
+    ) -> tuple[str, list[Source], int]:
         chat_history = await self._load_chat_history(conversation_id)
-        docs = self._retrieve(question, chat_history)
+        scope = await resolve_scope(filters, conversation_id)
+        docs = await asyncio.to_thread(self._retrieve, question, chat_history, scope)
 
         if not docs:
-            return "I don't have enough context to answer this question. Please upload relevant documents first.", []
-
-        llm = get_llm()
-        context = self._build_context(docs)
-        chat_history_block = self._build_chat_history_block(chat_history)
+            return NO_CONTEXT_ANSWER, [], 0
 
+        packed = self._pack(docs, chat_history, question)
         prompt = ChatPromptTemplate.from_template(RAG_PROMPT)
-        chain = prompt | llm | StrOutputParser()
-        answer = chain.invoke({"context": context, "question": question, "chat_history_block": chat_history_block})
+        inputs = {"context": packed.context, "question": question, "chat_history_block": packed.chat_history_block}
+        if hedging_enabled():
+            answer = await hedged_invoke(prompt.invoke(inputs))
+        else:
+            chain = prompt | get_llm() | StrOutputParser()
+            answer = await chain.ainvoke(inputs)
+
+        return answer, self._build_sources(packed.docs), packed.prompt_tokens
 
-        return answer, self._build_sources(docs)
+    async def stream_query(self, question: str, conversation_id: str | None = None, filters: RetrievalFilters | None = None):
+        """Stream a RAG answer as events.
 
-    async def stream_query(self, question: str, conversation_id: str | None = None):
+        Emits a "stage" event as each pipeline stage starts (with elapsed time
+        since the turn began), "sources" before generation, then "token"s as
+        the provider returns them. Blocking pipeline work runs in threads so
+        other sessions on the event loop keep streaming. Retrieval stays within
+        the filters and the conversation's pinned documents.
+        """
+        timer = _StageTimer()
         chat_history = await self._load_chat_history(conversation_id)
-        docs = self._retrieve(question, chat_history)
+        scope = await resolve_scope(filters, conversation_id)
+
+        search_question = question
+        if chat_history:
+            yield timer.start("condensing")
+            search_question = await asyncio.to_thread(self._condense_question, question, chat_history)
+
+        yield timer.start("retrieving")
+        cache_key, docs = None, None
+        if scope is not None and not scope:
+            docs = []
+        elif retrieval_cache.enabled:
+            cache_key, docs = await asyncio.to_thread(retrieval_cache.lookup, search_question, scope)
+
+        if docs is None:
+            docs = await asyncio.to_thread(self._search, search_question, scope)
+            if docs:
+                if settings.use_reranking:
+                    yield timer.start("reranking")
+                    docs = await asyncio.to_thread(self._rerank, search_question, docs)
+                yield timer.start("postprocessing")
+                docs = await asyncio.to_thread(remove_redundant, docs)
+                docs = await asyncio.to_thread(self._finalize, search_question, docs)
+            if cache_key is not None:
+                await asyncio.to_thread(retrieval_cache.store, cache_key, docs)
 
         if not docs:
-            yield {"type": "token", "content": "I don't have enough context to answer this question. Please upload relevant documents first."}
             yield {"type": "sources", "sources": []}
+            yield {"type": "token", "content": NO_CONTEXT_ANSWER}
+            yield timer.finish()
             return
 
-        streaming_llm = get_streaming_llm()
-        context = self._build_context(docs)
-        chat_history_block = self._build_chat_history_block(chat_history)
+        packed = self._pack(docs, chat_history, question)
+        sources = self._build_sources(packed.docs)
+        yield {"type": "sources", "sources": [s.model_dump() for s in sources]}
+        yield {"type": "usage", **packed.usage()}
 
+        yield timer.start("generating")
         prompt = ChatPromptTemplate.from_template(RAG_PROMPT)
-        chain = prompt | streaming_llm
+        inputs = {"context": packed.context, "question": question, "chat_history_block": packed.chat_history_block}
+        if hedging_enabled():
+            stream = hedged_stream(prompt.invoke(inputs))
+        else:
+            stream = (prompt | get_streaming_llm()).astream(inputs)
 
-        async for chunk in chain.astream({"context": context, "question": question, "chat_history_block": chat_history_block}):
+        first_token = True
+        async for chunk in stream:
             token = chunk.content if hasattr(chunk, "content") else str(chunk)
             if token:
+                if first_token:
+                    timer.mark("first_token")
+                    first_token = False
                 yield {"type": "token", "content": token}
 
-        sources = self._build_sources(docs)
-        yield {"type": "sources", "sources": [s.model_dump() for s in sources]}
+        yield timer.finish()
+
+    async def batch_query(self, questions: list[str], concurrency: int = 8, filters: RetrievalFilters | None = None):
+        """Answer independent questions, yielding results as they complete.
+
+        Retrieval and reranking run once for the whole batch; LLM calls are
+        dispatched with at most `concurrency` in flight.
+        """
+        scope = await resolve_scope(filters)
+        doc_lists = await asyncio.to_thread(self._retrieve_batch, questions, concurrency, scope)
+
+        llm = get_llm()
+        prompt = ChatPromptTemplate.from_template(RAG_PROMPT)
+        chain = prompt | llm | StrOutputParser()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def answer(index: int) -> dict:
+            question = questions[index]
+            docs = doc_lists[index]
+            result = {"index": index, "question": question, "message": NO_CONTEXT_ANSWER, "sources": [], "prompt_tokens": 0}
+            if not docs:
+                return result
+            packed = self._pack(docs, [], question)
+            try:
+                async with semaphore:
+                    result["message"] = await chain.ainvoke(
+                        {"context": packed.context, "question": question, "chat_history_block": ""}
+                    )
+            except Exception as exc:
+                logger.warning("Batch question %d failed: %s", index, exc)
+                return {**result, "message": "", "error": str(exc)}
+            result["sources"] = self._build_sources(packed.docs)
+            result["prompt_tokens"] = packed.prompt_tokens
+            return result
+
+        tasks = [asyncio.create_task(answer(i)) for i in range(len(questions))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
 
 
 rag_engine = RAGEngine()
@@ -0,0 +1,77 @@
+import json
+from datetime import timezone
+import aiosqlite
+from database import DB_PATH
+from models.schemas import RetrievalFilters
+
+
+def _like_prefix(prefix: str) -> str:
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def _iso(value) -> str:
+    # created_at is stored as naive UTC isoformat
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+async def _matching_doc_ids(filters: RetrievalFilters) -> list[str] | None:
+    """Documents matching the filters, or None if they do not restrict anything."""
+    clauses, params = [], []
+    if filters.source_types:
+        clauses.append(f"source_type IN ({','.join('?' * len(filters.source_types))})")
+        params += filters.source_types
+    if filters.filename_prefix:
+        clauses.append("filename LIKE ? ESCAPE '\\'")
+        params.append(_like_prefix(filters.filename_prefix))
+    if filters.url_prefix:
+        clauses.append("source_url LIKE ? ESCAPE '\\'")
+        params.append(_like_prefix(filters.url_prefix))
+    if filters.created_after:
+        clauses.append("created_at >= ?")
+        params.append(_iso(filters.created_after))
+    if filters.created_before:
+        clauses.append("created_at < ?")
+        params.append(_iso(filters.created_before))
+
+    if not clauses:
+        # Explicit ids pass through as-is (connector chunks have no documents row)
+        return list(dict.fromkeys(filters.doc_ids)) if filters.doc_ids is not None else None
+    if filters.doc_ids is not None:
+        clauses.append(f"id IN ({','.join('?' * len(filters.doc_ids))})")
+        params += filters.doc_ids
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(f"SELECT id FROM documents WHERE {' AND '.join(clauses)}", params)
+        return [row[0] for row in await cursor.fetchall()]
+
+
+async def pinned_doc_ids(conversation_id: str | None) -> list[str] | None:
+    if not conversation_id:
+        return None
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute("SELECT pinned_doc_ids FROM conversations WHERE id = ?", (conversation_id,))
+        row = await cursor.fetchone()
+    return json.loads(row[0]) if row and row[0] else None
+
+
+async def resolve_scope(filters: RetrievalFilters | None, conversation_id: str | None = None) -> list[str] | None:
+    """Document ids a question may search (possibly none), or None for the whole corpus.
+
+    Filters on document attributes are resolved against the documents table
+    here; retrieval then pushes the resulting ids down as one doc_id where
+    clause to the vector index, the BM25 corpus and the document router. A
+    conversation pinned to documents narrows the filters further.
+    """
+    scope = await _matching_doc_ids(filters) if filters else None
+    pinned = await pinned_doc_ids(conversation_id)
+    if pinned is not None:
+        allowed = set(pinned)
+        scope = pinned if scope is None else [doc_id for doc_id in scope if doc_id in allowed]
+    return scope
+
+
+def scope_where(scope: list[str] | None) -> dict | None:
+    """Chroma-style where clause for a non-empty scope."""
+    return {"doc_id": {"$in": scope}} if scope else None
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from datetime import datetime
+import aiosqlite
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from config import settings
+from database import DB_PATH
+from persistence import message_writer
+from providers.factory import get_llm
+from providers.scheduler import BACKGROUND, priority
+from rag.packing import PROMPT_ENCODING, format_chat_history
+from rag.prompts import SUMMARY_PROMPT
+from rag.tokens import truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_ROLE = "summary"
+
+
+async def _messages(conversation_id: str, after: str, limit: int | None = None) -> list[dict]:
+    """Messages created after a timestamp, committed and still queued, oldest first (newest `limit`)."""
+    # Snapshot queued write-behind messages before reading, so a flush in
+    # between can only duplicate (deduped by id) rather than hide them
+    pending = [m for m in message_writer.pending_messages(conversation_id) if m["created_at"] > after]
+    query = "SELECT id, role, content, created_at FROM messages WHERE conversation_id = ? AND created_at > ? ORDER BY created_at DESC"
+    params: tuple = (conversation_id, after)
+    if limit is not None:
+        query += " LIMIT ?"
+        params += (limit,)
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(query, params)
+        rows = await cursor.fetchall()
+    merged = {row["id"]: dict(row) for row in reversed(rows)}
+    for msg in pending:
+        merged.setdefault(msg["id"], msg)
+    ordered = sorted(merged.values(), key=lambda msg: msg["created_at"])
+    return ordered[-limit:] if limit is not None else ordered
+
+
+async def _load_summary(conversation_id: str) -> tuple[str, str]:
+    """(summary, created_at of the last message folded into it)."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            "SELECT summary, summarized_through FROM conversation_memory WHERE conversation_id = ?",
+            (conversation_id,),
+        )
+        row = await cursor.fetchone()
+    return (row[0], row[1]) if row else ("", "")
+
+
+async def load_history(conversation_id: str | None) -> list[dict]:
+    """Rolling summary (as a "summary" message) followed by the latest raw messages.
+
+    Older turns only reach the prompt through the summary, so history costs
+    about the same number of tokens at turn 5 as at turn 500. Messages that
+    have left the raw window but are not yet folded into the summary are
+    skipped until the summarizer catches up.
+    """
+    if not conversation_id:
+        return []
+    summary, through = await _load_summary(conversation_id)
+    recent = await _messages(conversation_id, through, limit=settings.memory_recent_messages)
+    history = [{"role": msg["role"], "content": msg["content"]} for msg in recent]
+    if summary:
+        history.insert(0, {"role": SUMMARY_ROLE, "content": summary})
+    return history
+
+
+class ConversationSummarizer:
+    """Folds turns that scroll out of the raw window into each conversation's summary.
+
+    Runs off the request path: a finished turn only marks its conversation,
+    and the summaries of marked conversations are updated after
+    memory_summary_delay_ms (so quick follow-ups share one LLM call), at
+    background provider priority.
+    """
+
+    def __init__(self):
+        self._pending: set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Pending updates are dropped; the next turn in each conversation catches its summary up
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def note_turn(self, conversation_id: str):
+        self._pending.add(conversation_id)
+        self._wakeup.set()
+
+    async def _run(self):
+        with priority(BACKGROUND):
+            while not self._stopping:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                if self._stopping:
+                    break
+                await asyncio.sleep(settings.memory_summary_delay_ms / 1000)
+                conversation_ids, self._pending = self._pending, set()
+                for conversation_id in conversation_ids:
+                    try:
+                        await self.update(conversation_id)
+                    except Exception:
+                        logger.exception("Summary update failed for %s; will retry after its next turn", conversation_id)
+
+    async def update(self, conversation_id: str) -> bool:
+        """Fold everything older than the raw window into the summary; False if nothing to fold."""
+        summary, through = await _load_summary(conversation_id)
+        unsummarized = await _messages(conversation_id, through)
+        keep = settings.memory_recent_messages
+        fold = unsummarized[:-keep] if keep else unsummarized
+        if not fold:
+            return False
+
+        prompt = ChatPromptTemplate.from_template(SUMMARY_PROMPT)
+        chain = prompt | get_llm() | StrOutputParser()
+        new_summary = await chain.ainvoke({
+            "summary": summary or "(none yet)",
+            "messages": format_chat_history(fold),
+            "max_words": max(settings.memory_summary_tokens * 3 // 4, 20),
+        })
+        new_summary = truncate_tokens(new_summary.strip(), settings.memory_summary_tokens, PROMPT_ENCODING)
+
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.execute(
+                """INSERT INTO conversation_memory (conversation_id, summary, summarized_through, message_count, updated_at)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(conversation_id) DO UPDATE SET
+                       summary = excluded.summary,
+                       summarized_through = excluded.summarized_through,
+                       message_count = message_count + excluded.message_count,
+                       updated_at = excluded.updated_at""",
+                (conversation_id, new_summary, fold[-1]["created_at"], len(fold), datetime.utcnow().isoformat()),
+            )
+            await db.commit()
+        logger.debug("Folded %d messages into the summary of %s", len(fold), conversation_id)
+        return True
+
+
+conversation_summarizer = ConversationSummarizer()
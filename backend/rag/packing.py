@@ -0,0 +1,181 @@
+import logging
+from dataclasses import dataclass, field
+from langchain_core.documents import Document
+from rag.postprocessing import reorder_long_context
+from rag.prompts import RAG_PROMPT
+from rag.tokens import count_tokens, truncate_tokens
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prompt sizes are estimated with one tokenizer for every provider; close
+# enough for budgeting, and far cheaper than loading each vendor's tokenizer.
+PROMPT_ENCODING = "cl100k_base"
+
+DEFAULT_CONTEXT_WINDOW = 8192
+
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o-mini": 128_000,
+    "gpt-4o": 128_000,
+    "llama-3.1-8b-instant": 131_072,
+    "llama-3.1-70b-versatile": 131_072,
+    "gemini-2.0-flash": 1_048_576,
+    "ibm/granite-13b-chat-v2": 8192,
+}
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+
+@dataclass
+class PackedPrompt:
+    context: str
+    chat_history_block: str
+    docs: list[Document] = field(default_factory=list)
+    context_tokens: int = 0
+    history_tokens: int = 0
+    prompt_tokens: int = 0
+    dropped_docs: int = 0
+    trimmed_docs: int = 0
+
+    def usage(self) -> dict:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "context_tokens": self.context_tokens,
+            "history_tokens": self.history_tokens,
+            "dropped_docs": self.dropped_docs,
+            "trimmed_docs": self.trimmed_docs,
+        }
+
+
+def _tokens(text: str) -> int:
+    return count_tokens(text, PROMPT_ENCODING)
+
+
+def _active_model() -> str:
+    return getattr(settings, f"{settings.llm_provider}_model", "")
+
+
+def get_prompt_budget() -> int:
+    """Prompt token budget for the active model, leaving room for the answer."""
+    window = MODEL_CONTEXT_WINDOWS.get(_active_model(), DEFAULT_CONTEXT_WINDOW)
+    return max(min(settings.max_prompt_tokens, window - settings.answer_token_reserve), 0)
+
+
+def row_range(metadata: dict) -> str | None:
+    """"12-40" for a CSV/XLSX row block, None for any other chunk."""
+    if metadata.get("row_start") is None:
+        return None
+    return f"{metadata['row_start']}-{metadata['row_end']}"
+
+
+def format_doc(doc: Document) -> str:
+    label = doc.metadata.get("source_file", "unknown")
+    rows = row_range(doc.metadata)
+    if rows:
+        label += f", rows {rows}"
+    return f"[Source: {label}]\n{doc.page_content}"
+
+
+_ROLE_LABELS = {"user": "User", "summary": "Earlier in this conversation"}
+
+
+def _role_label(msg: dict) -> str:
+    return _ROLE_LABELS.get(msg["role"], "Assistant")
+
+
+def format_chat_history(chat_history: list[dict]) -> str:
+    return "\n".join(f"{_role_label(msg)}: {msg['content']}" for msg in chat_history)
+
+
+def pack_history(chat_history: list[dict], budget: int) -> tuple[list[dict], int]:
+    """Keep the newest messages that fit in budget (trimming the newest if needed)."""
+    kept = []
+    used = 0
+    for msg in reversed(chat_history):
+        role = _role_label(msg)
+        cost = _tokens(f"{role}: {msg['content']}\n")
+        if used + cost <= budget:
+            kept.append(msg)
+            used += cost
+            continue
+        if not kept:
+            content = truncate_tokens(msg["content"], budget - _tokens(f"{role}: \n"), PROMPT_ENCODING)
+            if content:
+                kept.append({"role": msg["role"], "content": content})
+                used += _tokens(f"{role}: {content}\n")
+        break
+    kept.reverse()
+    return kept, used
+
+
+def pack_context(docs: list[Document], budget: int) -> tuple[list[Document], int, int, int]:
+    """Greedily pack the highest-ranked docs into budget tokens.
+
+    docs come best first. They are re-sorted by relevance_score only when
+    every doc has one; hybrid and multi-query results without a reranker
+    carry no scores, so their retrieval rank is kept. Returns the packed
+    docs (in their original order), tokens used, and the number of dropped
+    and trimmed docs.
+    """
+    sep_cost = _tokens(CONTEXT_SEPARATOR)
+    ranked = list(range(len(docs)))
+    if all("relevance_score" in doc.metadata for doc in docs):
+        ranked.sort(key=lambda i: docs[i].metadata["relevance_score"], reverse=True)
+    selected: dict[int, Document] = {}
+    used = 0
+    trimmed = 0
+    for i in ranked:
+        doc = docs[i]
+        overhead = sep_cost if selected else 0
+        cost = _tokens(format_doc(doc)) + overhead
+        if used + cost <= budget:
+            selected[i] = doc
+            used += cost
+            continue
+        header_cost = _tokens(format_doc(Document(page_content="", metadata=doc.metadata))) + overhead
+        remaining = budget - used - header_cost
+        if remaining >= settings.min_chunk_tokens:
+            content = truncate_tokens(doc.page_content, remaining, PROMPT_ENCODING)
+            metadata = {**doc.metadata, "truncated": True}
+            selected[i] = Document(page_content=content, metadata=metadata)
+            used += header_cost + _tokens(content)
+            trimmed += 1
+        # Everything ranked lower is dropped once the budget is exhausted
+        break
+
+    packed = [selected[i] for i in sorted(selected)]
+    return packed, used, len(docs) - len(packed), trimmed
+
+
+def pack_prompt(docs: list[Document], chat_history: list[dict], question: str) -> PackedPrompt:
+    budget = get_prompt_budget()
+    fixed = _tokens(RAG_PROMPT.format(context="", question=question, chat_history_block=""))
+
+    history, history_tokens = pack_history(
+        chat_history, min(settings.history_token_budget, max(budget - fixed, 0))
+    )
+    chat_history_block = ""
+    if history:
+        chat_history_block = f"\nConversation so far:\n{format_chat_history(history)}\n"
+        history_tokens = _tokens(chat_history_block)
+
+    context_budget = max(budget - fixed - history_tokens, 0)
+    packed_docs, context_tokens, dropped, trimmed = pack_context(docs, context_budget)
+    # Reordered only once the budget has picked the docs, so it never trims the runner-up first
+    context = CONTEXT_SEPARATOR.join(format_doc(doc) for doc in reorder_long_context(packed_docs))
+
+    packed = PackedPrompt(
+        context=context,
+        chat_history_block=chat_history_block,
+        docs=packed_docs,
+        context_tokens=context_tokens,
+        history_tokens=history_tokens,
+        prompt_tokens=fixed + history_tokens + context_tokens,
+        dropped_docs=dropped,
+        trimmed_docs=trimmed,
+    )
+    logger.info(
+        "Packed prompt: %d tokens (context %d, history %d) of budget %d; dropped %d, trimmed %d",
+        packed.prompt_tokens, context_tokens, history_tokens, budget, dropped, trimmed,
+    )
+    return packed
@@ -1,16 +1,20 @@
 from langchain_core.documents import Document
-from langchain.retrievers.document_compressors import EmbeddingsFilter
 from langchain_community.document_transformers import LongContextReorder
 from providers.factory import get_embeddings
 
 
-def remove_redundant(documents: list[Document], threshold: float = 0.95) -> list[Document]:
+def remove_redundant(
+    documents: list[Document],
+    threshold: float = 0.95,
+    vectors: list[list[float]] | None = None,
+) -> list[Document]:
     if len(documents) <= 1:
         return documents
 
-    embeddings = get_embeddings()
-    texts = [doc.page_content for doc in documents]
-    vectors = embeddings.embed_documents(texts)
+    if vectors is None:
+        embeddings = get_embeddings()
+        texts = [doc.page_content for doc in documents]
+        vectors = embeddings.embed_documents(texts)
 
     keep = [0]
     for i in range(1, len(documents)):
@@ -26,6 +30,20 @@ def remove_redundant(documents: list[Document], threshold: float = 0.95) -> list
     return [documents[i] for i in keep]
 
 
+def remove_redundant_batch(doc_lists: list[list[Document]], threshold: float = 0.95) -> list[list[Document]]:
+    """remove_redundant for many lists, embedding every text in one call."""
+    texts = [doc.page_content for docs in doc_lists if len(docs) > 1 for doc in docs]
+    vectors = iter(get_embeddings().embed_documents(texts) if texts else [])
+    results = []
+    for docs in doc_lists:
+        if len(docs) <= 1:
+            results.append(docs)
+            continue
+        doc_vectors = [next(vectors) for _ in docs]
+        results.append(remove_redundant(docs, threshold, vectors=doc_vectors))
+    return results
+
+
 def reorder_long_context(documents: list[Document]) -> list[Document]:
     if len(documents) <= 2:
         return documents
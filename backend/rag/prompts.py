@@ -18,6 +18,18 @@ Follow-up Question: {question}
 
 Standalone Question:"""
 
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an assistant with the new messages below.
+Keep facts, names, numbers, decisions and open questions the user may refer back to; drop pleasantries and repetition.
+Write at most {max_words} words of plain prose.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
 RAG_PROMPT = """You are a knowledgeable assistant. Use the following context to provide a detailed, comprehensive answer to the question.
 
 Instructions:
@@ -1,14 +1,17 @@
 from langchain_core.documents import Document
-from sentence_transformers import CrossEncoder
 from config import settings
 
+RERANKER_MODEL = "BAAI/bge-reranker-v2-m3"
+
 _reranker = None
 
 
-def get_reranker() -> CrossEncoder:
+def get_reranker():
     global _reranker
     if _reranker is None:
-        _reranker = CrossEncoder("BAAI/bge-reranker-v2-m3")
+        # Imported here: sentence_transformers brings torch with it
+        from sentence_transformers import CrossEncoder
+        _reranker = CrossEncoder(RERANKER_MODEL)
     return _reranker
 
 
@@ -19,7 +22,25 @@ def rerank_documents(query: str, documents: list[Document]) -> list[Document]:
     reranker = get_reranker()
     pairs = [[query, doc.page_content] for doc in documents]
     scores = reranker.predict(pairs)
+    return _top_scored(documents, scores)
+
+
+def rerank_documents_batch(queries: list[str], doc_lists: list[list[Document]]) -> list[list[Document]]:
+    """Rerank several (query, documents) lists in a single cross-encoder pass."""
+    pairs = [[query, doc.page_content] for query, docs in zip(queries, doc_lists) for doc in docs]
+    if not pairs:
+        return [[] for _ in doc_lists]
+
+    scores = get_reranker().predict(pairs, batch_size=64)
+    results = []
+    offset = 0
+    for docs in doc_lists:
+        results.append(_top_scored(docs, scores[offset:offset + len(docs)]))
+        offset += len(docs)
+    return results
+
 
+def _top_scored(documents: list[Document], scores) -> list[Document]:
     scored_docs = list(zip(documents, scores))
     scored_docs.sort(key=lambda x: x[1], reverse=True)
 
@@ -4,17 +4,20 @@ from langchain_community.retrievers import BM25Retriever
 from langchain_core.language_models import BaseChatModel, BaseLLM
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from vectorstore.chroma import get_vectorstore
+from vectorstore.chroma import get_index_embeddings, get_vectorstore, similarity_search_by_vectors
+from vectorstore.routing import route_documents
+from rag.filters import scope_where
 from rag.prompts import MULTI_QUERY_PROMPT, HYDE_PROMPT
 from config import settings
 
 
-def get_hybrid_retriever() -> EnsembleRetriever:
+def _build_bm25_retriever(where: dict | None = None) -> BM25Retriever | None:
     vectorstore = get_vectorstore()
-    all_docs = vectorstore.get()
+    # A scoped query only ranks the chunks of its documents
+    all_docs = vectorstore.get(where=where) if where else vectorstore.get()
 
     if not all_docs or not all_docs.get("documents"):
-        return vectorstore.as_retriever(search_kwargs={"k": settings.retrieval_top_k})
+        return None
 
     # Build BM25 retriever from existing docs
     docs_for_bm25 = []
@@ -25,10 +28,19 @@ def get_hybrid_retriever() -> EnsembleRetriever:
 
     bm25_retriever = BM25Retriever.from_documents(docs_for_bm25)
     bm25_retriever.k = settings.retrieval_top_k
+    return bm25_retriever
 
-    vector_retriever = vectorstore.as_retriever(
-        search_kwargs={"k": settings.retrieval_top_k}
-    )
+
+def get_hybrid_retriever(where: dict | None = None) -> EnsembleRetriever:
+    vectorstore = get_vectorstore()
+    search_kwargs = {"k": settings.retrieval_top_k}
+    if where:
+        search_kwargs["filter"] = where
+    vector_retriever = vectorstore.as_retriever(search_kwargs=search_kwargs)
+
+    bm25_retriever = _build_bm25_retriever(where)
+    if bm25_retriever is None:
+        return vector_retriever
 
     return EnsembleRetriever(
         retrievers=[bm25_retriever, vector_retriever],
@@ -36,7 +48,60 @@ def get_hybrid_retriever() -> EnsembleRetriever:
     )
 
 
-def multi_query_retrieve(question: str, llm: BaseChatModel | BaseLLM) -> list[Document]:
+def _scored_docs(results: list[tuple[Document, float]]) -> list[Document]:
+    docs = []
+    for doc, score in results:
+        doc.metadata["relevance_score"] = score
+        docs.append(doc)
+    return docs
+
+
+def routed_retrieve(vectors: list[list[float]], scope: list[str] | None = None) -> list[list[Document]]:
+    """Two-stage search: route each query to its closest documents, then search only their chunks.
+
+    Falls back to a full search while the document index is still empty.
+    Routing only picks among the scope's documents, and is skipped when the
+    scope is no larger than routing_top_docs.
+    """
+    if scope is not None and len(scope) <= settings.routing_top_docs:
+        routes = None
+    else:
+        routes = route_documents(vectors, settings.routing_top_docs, doc_ids=scope)
+    if routes is None:
+        where = scope_where(scope)
+        return [_scored_docs(r) for r in similarity_search_by_vectors(vectors, settings.retrieval_top_k, where=where)]
+    return [
+        _scored_docs(similarity_search_by_vectors([vector], settings.retrieval_top_k, where={"doc_id": {"$in": doc_ids}})[0])
+        for vector, doc_ids in zip(vectors, routes)
+    ]
+
+
+def batch_retrieve(questions: list[str], scope: list[str] | None = None) -> list[list[Document]]:
+    """Vector (or hybrid) retrieval for many questions, embedded as queries in one call where the model allows."""
+    if not questions:
+        return []
+    vectors = get_index_embeddings().embed_queries(questions)
+    where = scope_where(scope)
+
+    if settings.use_doc_routing:
+        doc_lists = routed_retrieve(vectors, scope)
+    else:
+        doc_lists = [_scored_docs(r) for r in similarity_search_by_vectors(vectors, settings.retrieval_top_k, where=where)]
+
+    if not settings.use_hybrid_search:
+        return doc_lists
+
+    ensemble = get_hybrid_retriever(where)
+    if not isinstance(ensemble, EnsembleRetriever):
+        return doc_lists
+    bm25_retriever = ensemble.retrievers[0]
+    return [
+        ensemble.weighted_reciprocal_rank([bm25_retriever.invoke(q), docs])
+        for q, docs in zip(questions, doc_lists)
+    ]
+
+
+def multi_query_retrieve(question: str, llm: BaseChatModel | BaseLLM, where: dict | None = None) -> list[Document]:
     prompt = ChatPromptTemplate.from_template(MULTI_QUERY_PROMPT)
     chain = prompt | llm | StrOutputParser()
     result = chain.invoke({"question": question})
@@ -45,7 +110,7 @@ def multi_query_retrieve(question: str, llm: BaseChatModel | BaseLLM) -> list[Do
     queries = queries[:3]
     queries.append(question)
 
-    retriever = get_hybrid_retriever()
+    retriever = get_hybrid_retriever(where)
     all_docs = []
     seen = set()
     for q in queries:
@@ -59,11 +124,11 @@ def multi_query_retrieve(question: str, llm: BaseChatModel | BaseLLM) -> list[Do
     return all_docs
 
 
-def hyde_retrieve(question: str, llm: BaseChatModel | BaseLLM) -> list[Document]:
+def hyde_retrieve(question: str, llm: BaseChatModel | BaseLLM, where: dict | None = None) -> list[Document]:
     prompt = ChatPromptTemplate.from_template(HYDE_PROMPT)
     chain = prompt | llm | StrOutputParser()
     hypothetical_answer = chain.invoke({"question": question})
 
     vectorstore = get_vectorstore()
-    docs = vectorstore.similarity_search(hypothetical_answer, k=settings.retrieval_top_k)
+    docs = vectorstore.similarity_search(hypothetical_answer, k=settings.retrieval_top_k, filter=where)
     return docs
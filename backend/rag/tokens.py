@@ -0,0 +1,30 @@
+from functools import lru_cache
+import tiktoken
+from config import settings
+
+
+@lru_cache(maxsize=8)
+def get_encoding(name: str) -> tiktoken.Encoding:
+    return tiktoken.get_encoding(name)
+
+
+def count_tokens(text: str, encoding_name: str | None = None) -> int:
+    """Count tokens with the configured tokenizer (falls back to characters)."""
+    name = encoding_name if encoding_name is not None else settings.chunk_tokenizer
+    if not name:
+        return len(text)
+    return len(get_encoding(name).encode_ordinary(text))
+
+
+def truncate_tokens(text: str, max_tokens: int, encoding_name: str | None = None) -> str:
+    """Cut text down to at most max_tokens tokens."""
+    if max_tokens <= 0:
+        return ""
+    name = encoding_name if encoding_name is not None else settings.chunk_tokenizer
+    if not name:
+        return text[:max_tokens]
+    enc = get_encoding(name)
+    tokens = enc.encode_ordinary(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens])
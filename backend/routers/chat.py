@@ -1,49 +1,86 @@
 import json
 import uuid
 from datetime import datetime
-from fastapi import APIRouter
-from models.schemas import ChatRequest, ChatResponse
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from models.schemas import ChatRequest, ChatResponse, BatchChatRequest, SearchRequest, SearchResponse, SearchHit
 from rag.engine import rag_engine
-from database import get_db
+from persistence import message_writer
+from rag.memory import conversation_summarizer
+from providers.scheduler import BATCH, priority
+from config import settings
 
 router = APIRouter()
 
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
-    async for db in get_db():
-        # Create conversation if needed
-        conversation_id = request.conversation_id
-        if not conversation_id:
-            conversation_id = str(uuid.uuid4())
-            await db.execute(
-                "INSERT INTO conversations (id, title, created_at, updated_at) VALUES (?, ?, ?, ?)",
-                (conversation_id, request.message[:50], datetime.utcnow().isoformat(), datetime.utcnow().isoformat()),
-            )
-
-        # Save user message
-        user_msg_id = str(uuid.uuid4())
-        await db.execute(
-            "INSERT INTO messages (id, conversation_id, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
-            (user_msg_id, conversation_id, "user", request.message, datetime.utcnow().isoformat()),
-        )
-        await db.commit()
+    # Create conversation if needed
+    conversation_id = request.conversation_id
+    if not conversation_id:
+        conversation_id = str(uuid.uuid4())
+        message_writer.add_conversation(conversation_id, request.message[:50])
 
-        # Run RAG with conversation context
-        answer, sources = await rag_engine.query(request.message, conversation_id=conversation_id)
+    # Save user message (write-behind, visible to history loading right away)
+    message_writer.add_message(conversation_id, "user", request.message)
 
-        # Save assistant message
-        assistant_msg_id = str(uuid.uuid4())
-        await db.execute(
-            "INSERT INTO messages (id, conversation_id, role, content, sources, created_at) VALUES (?, ?, ?, ?, ?, ?)",
-            (assistant_msg_id, conversation_id, "assistant", answer, json.dumps([s.model_dump() for s in sources]), datetime.utcnow().isoformat()),
-        )
+    # Run RAG with conversation context
+    answer, sources, prompt_tokens = await rag_engine.query(
+        request.message, conversation_id=conversation_id, filters=request.filters
+    )
+
+    # Save assistant message and bump the conversation timestamp
+    message_writer.add_message(conversation_id, "assistant", answer, [s.model_dump() for s in sources])
+    message_writer.touch_conversation(conversation_id)
+    conversation_summarizer.note_turn(conversation_id)
+
+    return ChatResponse(message=answer, sources=sources, conversation_id=conversation_id, prompt_tokens=prompt_tokens)
+
+
+def _save_batch_result(result: dict, asked_at: str) -> str:
+    # The question dates from the request and the answer from when it came
+    # back, so history (ordered by created_at) shows them in order
+    conversation_id = str(uuid.uuid4())
+    message_writer.add_conversation(conversation_id, result["question"][:50], created_at=asked_at)
+    message_writer.add_message(conversation_id, "user", result["question"], created_at=asked_at)
+    answered_at = datetime.utcnow().isoformat()
+    message_writer.add_message(conversation_id, "assistant", result["message"], result["sources"], created_at=answered_at)
+    message_writer.touch_conversation(conversation_id, answered_at)
+    return conversation_id
 
-        # Update conversation timestamp
-        await db.execute(
-            "UPDATE conversations SET updated_at = ? WHERE id = ?",
-            (datetime.utcnow().isoformat(), conversation_id),
+
+@router.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest):
+    """Answer many questions at once, streaming one NDJSON line per answer as it completes."""
+    if len(request.questions) > settings.batch_max_questions:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.batch_max_questions} questions per batch",
         )
-        await db.commit()
+    concurrency = max(1, request.concurrency or settings.batch_concurrency)
+
+    asked_at = datetime.utcnow().isoformat()
+
+    async def stream():
+        # Batch answers queue for provider quota behind live chat turns
+        with priority(BATCH):
+            async for result in rag_engine.batch_query(request.questions, concurrency=concurrency, filters=request.filters):
+                result["sources"] = [s.model_dump() for s in result["sources"]]
+                result["conversation_id"] = None
+                if request.persist and "error" not in result:
+                    result["conversation_id"] = _save_batch_result(result, asked_at)
+                yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 
-        return ChatResponse(message=answer, sources=sources, conversation_id=conversation_id)
+@router.post("/search", response_model=SearchResponse)
+async def search(request: SearchRequest):
+    """Ranked chunks for a query, through the configured retrieval pipeline, without generating an answer."""
+    docs = await rag_engine.search(request.query, filters=request.filters, conversation_id=request.conversation_id)
+    sources = rag_engine._build_sources(docs)
+    results = [
+        SearchHit(**source.model_dump(), doc_id=doc.metadata.get("doc_id"))
+        for source, doc in zip(sources, docs)
+    ]
+    return SearchResponse(query=request.query, results=results)
@@ -1,10 +1,10 @@
 import uuid
 import json
-import asyncio
 from datetime import datetime
 from fastapi import APIRouter, HTTPException
 from models.schemas import ConnectorCreate, ConnectorOut
-from ingestion.connectors import test_connection, sync_connector
+from ingestion.connectors import test_connection
+from bus.factory import dispatch
 from database import get_db
 
 router = APIRouter()
@@ -71,7 +71,8 @@ async def trigger_sync(connector_id: str):
         cursor = await db.execute("SELECT id FROM connectors WHERE id = ?", (connector_id,))
         if not await cursor.fetchone():
             raise HTTPException(status_code=404, detail="Connector not found")
-    asyncio.create_task(sync_connector(connector_id))
+    # Runs on whichever worker is free; a sync already queued or running is not repeated
+    await dispatch("connector_sync", dedupe_key=f"connector-sync:{connector_id}", connector_id=connector_id)
     return {"status": "sync_started"}
 
 
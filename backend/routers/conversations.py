@@ -2,14 +2,20 @@ import json
 import uuid
 from datetime import datetime
 from fastapi import APIRouter, HTTPException
-from models.schemas import ConversationOut, ConversationCreate, ConversationDetail, MessageOut, Source
+from models.schemas import ConversationOut, ConversationCreate, ConversationDetail, ConversationPin, MessageOut, Source
+from persistence import message_writer
 from database import get_db
 
 router = APIRouter()
 
 
+def _pinned(row) -> list[str]:
+    return json.loads(row["pinned_doc_ids"]) if row["pinned_doc_ids"] else []
+
+
 @router.get("/conversations", response_model=list[ConversationOut])
 async def list_conversations():
+    await message_writer.flush()
     async for db in get_db():
         cursor = await db.execute("SELECT * FROM conversations ORDER BY updated_at DESC")
         rows = await cursor.fetchall()
@@ -17,6 +23,7 @@ async def list_conversations():
             ConversationOut(
                 id=row["id"], title=row["title"],
                 created_at=row["created_at"], updated_at=row["updated_at"],
+                pinned_doc_ids=_pinned(row),
             )
             for row in rows
         ]
@@ -37,6 +44,7 @@ async def create_conversation(body: ConversationCreate):
 
 @router.get("/conversations/{conv_id}", response_model=ConversationDetail)
 async def get_conversation(conv_id: str):
+    await message_writer.flush()
     async for db in get_db():
         cursor = await db.execute("SELECT * FROM conversations WHERE id = ?", (conv_id,))
         conv = await cursor.fetchone()
@@ -57,22 +65,47 @@ async def get_conversation(conv_id: str):
                 sources = [Source(**s) for s in raw]
             messages.append(MessageOut(
                 id=row["id"], role=row["role"], content=row["content"],
-                sources=sources, created_at=row["created_at"],
+                sources=sources, cancelled=bool(row["cancelled"]), created_at=row["created_at"],
             ))
 
         return ConversationDetail(
             id=conv["id"], title=conv["title"], messages=messages,
             created_at=conv["created_at"], updated_at=conv["updated_at"],
+            pinned_doc_ids=_pinned(conv),
+        )
+
+
+@router.put("/conversations/{conv_id}/pin", response_model=ConversationOut)
+async def pin_conversation(conv_id: str, body: ConversationPin):
+    """Keep retrieval in this conversation within these documents (an empty list unpins)."""
+    await message_writer.flush()
+    doc_ids = list(dict.fromkeys(body.doc_ids))
+    async for db in get_db():
+        cursor = await db.execute("SELECT * FROM conversations WHERE id = ?", (conv_id,))
+        conv = await cursor.fetchone()
+        if not conv:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        await db.execute(
+            "UPDATE conversations SET pinned_doc_ids = ? WHERE id = ?",
+            (json.dumps(doc_ids) if doc_ids else None, conv_id),
+        )
+        await db.commit()
+        return ConversationOut(
+            id=conv["id"], title=conv["title"],
+            created_at=conv["created_at"], updated_at=conv["updated_at"],
+            pinned_doc_ids=doc_ids,
         )
 
 
 @router.delete("/conversations/{conv_id}")
 async def delete_conversation(conv_id: str):
+    await message_writer.flush()
     async for db in get_db():
         cursor = await db.execute("SELECT id FROM conversations WHERE id = ?", (conv_id,))
         if not await cursor.fetchone():
             raise HTTPException(status_code=404, detail="Conversation not found")
         await db.execute("DELETE FROM messages WHERE conversation_id = ?", (conv_id,))
+        await db.execute("DELETE FROM conversation_memory WHERE conversation_id = ?", (conv_id,))
         await db.execute("DELETE FROM conversations WHERE id = ?", (conv_id,))
         await db.commit()
     return {"status": "deleted"}
@@ -1,12 +1,19 @@
 import os
 import uuid
 import asyncio
+import hashlib
+import shutil
+import tarfile
 import tempfile
+import zipfile
 from datetime import datetime
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from models.schemas import DocumentOut, URLIngestRequest
-from ingestion.processor import process_document_async, process_url_async
+from models.schemas import BulkIngestRequest, DocumentOut, IngestBatchFile, IngestBatchOut, URLIngestRequest
+from bus.factory import dispatch
+from config import settings
+from ingestion.bulk import allowed_path, create_batch
 from vectorstore.chroma import delete_document_vectors
+from vectorstore.migration import index_writes
 from database import get_db
 
 router = APIRouter()
@@ -31,12 +38,16 @@ def _doc_from_row(row) -> DocumentOut:
 @router.post("/documents/upload", response_model=list[DocumentOut])
 async def upload_documents(files: list[UploadFile] = File(...)):
     results = []
+    jobs = []
     async for db in get_db():
         for file in files:
             doc_id = str(uuid.uuid4())
             suffix = os.path.splitext(file.filename or "")[1]
 
-            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+            # Kept until the ingestion job (on any worker) has loaded it
+            if settings.upload_dir:
+                os.makedirs(settings.upload_dir, exist_ok=True)
+            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=settings.upload_dir or None)
             content = await file.read()
             tmp.write(content)
             tmp.close()
@@ -45,9 +56,11 @@ async def upload_documents(files: list[UploadFile] = File(...)):
             now = datetime.utcnow().isoformat()
             await db.execute(
                 """INSERT INTO documents
-                   (id, filename, file_type, file_size, chunk_count, status, source_type, progress, created_at)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (doc_id, file.filename, suffix, len(content), 0, "pending", "file", 0, now),
+                   (id, filename, file_type, file_size, chunk_count, status, source_type, progress,
+                    content_hash, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (doc_id, file.filename, suffix, len(content), 0, "pending", "file", 0,
+                 hashlib.sha256(content).hexdigest(), now),
             )
 
             doc = DocumentOut(
@@ -63,14 +76,90 @@ async def upload_documents(files: list[UploadFile] = File(...)):
             )
             results.append(doc)
 
-            asyncio.create_task(
-                process_document_async(doc_id, tmp_path, file.filename or "", len(content), suffix)
-            )
+            jobs.append({
+                "doc_id": doc_id, "file_path": tmp_path, "filename": file.filename or "",
+                "file_size": len(content), "suffix": suffix,
+            })
 
         await db.commit()
+    for job in jobs:
+        await dispatch("ingest_file", **job)
     return results
 
 
+def _batch_from_row(row, files=None) -> IngestBatchOut:
+    return IngestBatchOut(**{key: row[key] for key in row.keys()}, files=files)
+
+
+async def _start_batch(source: str, label: str, delete_source: bool = False) -> IngestBatchOut:
+    batch_id = await create_batch(label)
+    await dispatch("ingest_batch", batch_id=batch_id, source=source, delete_source=delete_source)
+    return await get_batch(batch_id, files=False)
+
+
+def _is_archive(path: str) -> bool:
+    return zipfile.is_zipfile(path) or tarfile.is_tarfile(path)
+
+
+@router.post("/documents/archive", response_model=IngestBatchOut)
+async def upload_archive(file: UploadFile = File(...)):
+    """Ingest every supported file in a zip or tar archive as one batch."""
+    if settings.upload_dir:
+        os.makedirs(settings.upload_dir, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".archive", dir=settings.upload_dir or None)
+    # Streamed to disk: archives can be far larger than a request body should be in memory
+    with tmp:
+        await asyncio.to_thread(shutil.copyfileobj, file.file, tmp, 1 << 20)
+    if not await asyncio.to_thread(_is_archive, tmp.name):
+        os.unlink(tmp.name)
+        raise HTTPException(status_code=400, detail="Not a zip or tar archive")
+    return await _start_batch(tmp.name, file.filename or "archive", delete_source=True)
+
+
+@router.post("/documents/bulk", response_model=IngestBatchOut)
+async def ingest_path(request: BulkIngestRequest):
+    """Ingest a directory tree or archive that is already on the server."""
+    try:
+        path = allowed_path(request.path)
+    except PermissionError as exc:
+        raise HTTPException(status_code=403, detail=str(exc))
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    if not path.is_dir() and not await asyncio.to_thread(_is_archive, str(path)):
+        raise HTTPException(status_code=400, detail="Not a directory, zip or tar archive")
+    return await _start_batch(str(path), str(path))
+
+
+@router.get("/documents/batches", response_model=list[IngestBatchOut])
+async def list_batches(limit: int = 50):
+    async for db in get_db():
+        cursor = await db.execute("SELECT * FROM ingest_batches ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [_batch_from_row(row) for row in await cursor.fetchall()]
+
+
+@router.get("/documents/batches/{batch_id}", response_model=IngestBatchOut)
+async def get_batch(batch_id: str, files: bool = True, status: str | None = None):
+    """A batch's counters and, unless files=false, its per-file results (optionally one status only)."""
+    async for db in get_db():
+        cursor = await db.execute("SELECT * FROM ingest_batches WHERE id = ?", (batch_id,))
+        row = await cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Batch not found")
+        results = None
+        if files:
+            sql = "SELECT * FROM ingest_batch_files WHERE batch_id = ?"
+            params = [batch_id]
+            if status:
+                sql += " AND status = ?"
+                params.append(status)
+            cursor = await db.execute(sql + " ORDER BY rowid", params)
+            results = [
+                IngestBatchFile(**{key: r[key] for key in r.keys() if key in IngestBatchFile.model_fields})
+                for r in await cursor.fetchall()
+            ]
+        return _batch_from_row(row, results)
+
+
 @router.post("/documents/url", response_model=DocumentOut)
 async def ingest_url(request: URLIngestRequest):
     doc_id = str(uuid.uuid4())
@@ -85,7 +174,7 @@ async def ingest_url(request: URLIngestRequest):
         )
         await db.commit()
 
-    asyncio.create_task(process_url_async(doc_id, request.url, deep_crawl=request.deep_crawl))
+    await dispatch("ingest_url", doc_id=doc_id, url=request.url, deep_crawl=request.deep_crawl)
 
     return DocumentOut(
         id=doc_id,
@@ -132,7 +221,8 @@ async def delete_document(doc_id: str):
         if not await cursor.fetchone():
             raise HTTPException(status_code=404, detail="Document not found")
 
-        delete_document_vectors(doc_id)
+        async with index_writes(doc_id):
+            delete_document_vectors(doc_id)
         await db.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
         await db.commit()
 
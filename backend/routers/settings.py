@@ -1,6 +1,9 @@
 from fastapi import APIRouter
 from models.schemas import SettingsOut, SettingsUpdate
-from config import settings
+from bus.factory import invalidate
+from config import apply_settings, settings
+from vectorstore.chroma import get_active_index
+from vectorstore.migration import reindex_status, request_index_check
 
 router = APIRouter()
 
@@ -21,13 +24,35 @@ async def get_settings():
         use_multi_query=settings.use_multi_query,
         use_hyde=settings.use_hyde,
         use_reranking=settings.use_reranking,
+        use_compression=settings.use_compression,
+        use_doc_routing=settings.use_doc_routing,
+        routing_top_docs=settings.routing_top_docs,
+        hnsw_space=settings.hnsw_space,
+        hnsw_m=settings.hnsw_m,
+        hnsw_construction_ef=settings.hnsw_construction_ef,
+        hnsw_search_ef=settings.hnsw_search_ef,
+        hedge_providers=settings.hedge_providers,
+        hedge_delay_ms=settings.hedge_delay_ms,
     )
 
 
 @router.put("/settings", response_model=SettingsOut)
 async def update_settings(body: SettingsUpdate):
-    for field, value in body.model_dump(exclude_none=True).items():
-        if hasattr(settings, field):
-            setattr(settings, field, value)
+    fields = body.model_dump(exclude_none=True)
+    apply_settings(fields)
+    # Every worker serves requests, so every worker applies the change
+    await invalidate("settings", fields=fields)
 
+    # A new embedding model or chunking config re-indexes in the background;
+    # queries keep using the current collection until it is done
+    await request_index_check(fields)
     return await get_settings()
+
+
+@router.get("/settings/index")
+async def get_index_status():
+    active = get_active_index()
+    return {
+        "active": {"collection": active["name"], "provider": active["provider"], "spec": active["spec"]},
+        "reindex": await reindex_status(),
+    }
@@ -0,0 +1,74 @@
+import asyncio
+from fastapi import APIRouter, HTTPException
+from models.schemas import SnapshotCreate
+from bus.factory import dispatch
+from vectorstore.snapshot import (
+    check_compatible,
+    default_snapshot_name,
+    list_snapshots,
+    read_manifest,
+    snapshot_path,
+    snapshot_status,
+    summary,
+)
+
+router = APIRouter()
+
+
+def _path(name: str):
+    try:
+        return snapshot_path(name)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+def _manifest(name: str) -> dict:
+    try:
+        return read_manifest(_path(name))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+async def _start(kind: str, name: str):
+    # One export or import at a time across all workers
+    if await dispatch(kind, dedupe_key="snapshot", name=name) is None:
+        raise HTTPException(status_code=409, detail="A snapshot export or import is already running")
+
+
+@router.get("/snapshots")
+async def get_snapshots():
+    return await asyncio.to_thread(list_snapshots)
+
+
+@router.get("/snapshots/status")
+async def get_snapshot_status():
+    return await snapshot_status()
+
+
+@router.post("/snapshots", status_code=202)
+async def create_snapshot(body: SnapshotCreate | None = None):
+    name = (body.name if body else None) or default_snapshot_name()
+    if _path(name).exists():
+        raise HTTPException(status_code=409, detail="Snapshot already exists")
+    await _start("snapshot_export", name)
+    return {"name": name, "status": "queued"}
+
+
+@router.get("/snapshots/{name}")
+async def get_snapshot(name: str):
+    manifest = _manifest(name)
+    return {**summary(name, manifest), "index": manifest["index"], "shards": manifest["shards"]}
+
+
+@router.post("/snapshots/{name}/import", status_code=202)
+async def import_snapshot(name: str):
+    manifest = _manifest(name)
+    # Checksums are verified by the job; refuse incompatible vectors up front
+    try:
+        check_compatible(manifest)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    await _start("snapshot_import", name)
+    return {"name": name, "status": "queued"}
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from fastapi import WebSocket, WebSocketDisconnect
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_CLOSE = object()
+
+
+class StreamSender:
+    """Per-connection outbound buffer that coalesces token events into frames.
+
+    Events go through a bounded queue drained by one sender task, so a slow
+    client makes send() wait (backpressure up to the LLM stream) instead of
+    buffering without limit. Consecutive token events are merged into one
+    frame until ws_coalesce_ms passes or ws_coalesce_max_chars is reached; the
+    first token after any other event is sent immediately.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self._websocket = websocket
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.ws_send_queue_size)
+        self._window = settings.ws_coalesce_ms / 1000
+        self._max_chars = settings.ws_coalesce_max_chars
+        self._task: asyncio.Task | None = None
+        self._error: Exception | None = None
+        self.frames_sent = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def send(self, event: dict):
+        if self._error is not None:
+            raise WebSocketDisconnect(code=1006) from self._error
+        await self._queue.put(event)
+
+    async def close(self):
+        """Flush everything queued, then stop the sender task."""
+        if self._task is None:
+            return
+        await self._queue.put(_CLOSE)
+        await self._task
+        self._task = None
+
+    async def _send_frame(self, event: dict):
+        if self._error is not None:
+            return  # client is gone, discard so producers never block
+        try:
+            await self._websocket.send_json(event)
+            self.frames_sent += 1
+        except Exception as exc:
+            logger.debug("WebSocket send failed: %s", exc)
+            self._error = exc
+
+    async def _run(self):
+        flush_next_token = True
+        pending = None
+        while True:
+            item = pending if pending is not None else await self._queue.get()
+            pending = None
+            if item is _CLOSE:
+                return
+            if item.get("type") != "token":
+                await self._send_frame(item)
+                flush_next_token = True
+                continue
+            if flush_next_token or self._window <= 0:
+                await self._send_frame(item)
+                flush_next_token = False
+                continue
+
+            # Coalesce tokens until the window closes, the frame is full or
+            # a non-token event arrives
+            parts = [item["content"]]
+            size = len(item["content"])
+            deadline = asyncio.get_running_loop().time() + self._window
+            while size < self._max_chars:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    nxt = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if nxt is _CLOSE or nxt.get("type") != "token":
+                    pending = nxt
+                    break
+                parts.append(nxt["content"])
+                size += len(nxt["content"])
+            await self._send_frame({"type": "token", "content": "".join(parts)})
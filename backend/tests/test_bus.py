@@ -0,0 +1,43 @@
+import asyncio
+
+from bus.factory import BusWorker, job_handler, worker_stopping
+from bus.sqlite import SQLiteBus
+
+runs: list[str] = []
+stopping_seen: list[bool] = []
+
+
+@job_handler("test_resumable")
+async def _resumable(name: str):
+    runs.append(name)
+    if len(runs) == 1:
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            stopping_seen.append(worker_stopping())
+            raise
+
+
+def test_stopped_worker_hands_its_job_to_another(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "bus.db")
+        first, second = BusWorker(bus=SQLiteBus(path)), BusWorker(bus=SQLiteBus(path))
+        await first.start()
+        job_id = await first.bus.enqueue("test_resumable", {"name": "job"})
+        while not runs:
+            await asyncio.sleep(0.01)
+        await second.start()
+        await first.stop()
+        try:
+            for _ in range(300):
+                status = (await second.bus._fetch("SELECT status FROM bus_jobs WHERE id = ?", (job_id,)))[0][0]
+                if status == "done":
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await second.stop()
+        return status
+
+    assert asyncio.run(scenario()) == "done"
+    assert runs == ["job", "job"]
+    assert stopping_seen == [True]
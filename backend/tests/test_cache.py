@@ -0,0 +1,18 @@
+from langchain_core.documents import Document
+
+import rag.cache as cache
+from config import settings
+
+
+def test_unreadable_shared_tier_falls_back_to_memory(tmp_path, monkeypatch):
+    shared = tmp_path / "cache.db"
+    shared.write_bytes(b"not a database" * 100)
+    monkeypatch.setattr(settings, "retrieval_cache_path", str(shared))
+    monkeypatch.setattr(cache, "get_active_index", lambda: {"name": "test", "spec": {}})
+    retrieval_cache = cache.RetrievalCache()
+
+    key, docs = retrieval_cache.lookup("what is a cat?")
+    assert docs is None
+    retrieval_cache.store(key, [Document("cats purr", metadata={"doc_id": "a"})])
+    _, docs = retrieval_cache.lookup("what is a cat?")
+    assert [d.page_content for d in docs] == ["cats purr"]
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+import providers.hedging as hedging
+from config import settings
+
+
+class _LLM:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def astream(self, prompt):
+        for chunk in self.chunks:
+            yield chunk
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    llms = {"empty": _LLM([]), "ok": _LLM(["hello", " world"])}
+    monkeypatch.setattr(hedging, "get_streaming_llm", llms.__getitem__)
+    monkeypatch.setattr(hedging, "_health", {})
+    monkeypatch.setattr(settings, "hedge_auto_reorder", False)
+    return llms
+
+
+def test_empty_stream_falls_through_to_the_next_provider(providers, monkeypatch):
+    monkeypatch.setattr(settings, "hedge_providers", ["empty", "ok"])
+    assert asyncio.run(hedging.hedged_invoke("hi")) == "hello world"
+    assert list(hedging.get_health("empty").outcomes) == [False]
+    assert hedging.get_health("empty").wins == 0
+    assert hedging.get_health("ok").wins == 1
+
+
+def test_only_empty_streams_raise(providers, monkeypatch):
+    monkeypatch.setattr(settings, "hedge_providers", ["empty"])
+    with pytest.raises(RuntimeError, match="empty answer"):
+        asyncio.run(hedging.hedged_invoke("hi"))
@@ -0,0 +1,19 @@
+import numpy as np
+
+from vectorstore.local import LocalCollection
+
+
+def test_collections_shared_between_processes_keep_rows_apart(tmp_path):
+    # Two instances on one directory stand in for two processes
+    first, second = LocalCollection(str(tmp_path)), LocalCollection(str(tmp_path))
+    vectors = np.eye(4, dtype=np.float32)
+    first.upsert(["a", "b"], vectors[:2], metadatas=[{"doc_id": "1"}, {"doc_id": "2"}])
+    second.upsert(["c"], vectors[2:3], metadatas=[{"doc_id": "3"}])
+    first.upsert(["d"], vectors[3:], metadatas=[{"doc_id": "4"}])
+    assert second.get()["ids"] == ["a", "b", "c", "d"]
+
+    second.delete(where={"doc_id": "1"})
+    second.compact()
+    result = first.query(vectors[[2, 3]], n_results=1)
+    assert result["ids"] == [["c"], ["d"]]
+    assert first.get(include=("embeddings",))["embeddings"] == vectors[1:].tolist()
@@ -0,0 +1,72 @@
+import asyncio
+import sqlite3
+
+import aiosqlite
+import pytest
+
+import database
+import persistence
+from config import settings
+from persistence import MessageWriter
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "app.db")
+    monkeypatch.setattr(database, "DB_PATH", path)
+    monkeypatch.setattr(persistence, "DB_PATH", path)
+    asyncio.run(database.init_db())
+    return path
+
+
+async def _contents(path: str) -> list[str]:
+    async with aiosqlite.connect(path) as db:
+        cursor = await db.execute("SELECT content FROM messages ORDER BY created_at")
+        return [row[0] for row in await cursor.fetchall()]
+
+
+def test_rejected_write_is_dropped_without_holding_back_the_rest(db_path):
+    async def scenario():
+        writer = MessageWriter()
+        writer.add_conversation("c1", "title")
+        writer.add_message("c1", "user", "first", created_at="1")
+        await writer.flush()
+        # Same id again: the batch's INSERT fails on the primary key
+        writer._messages.append({**(await _first_message(db_path)), "content": "dup"})
+        writer.add_message("c1", "assistant", "second", created_at="2")
+        await writer.flush()
+        assert not writer._messages
+        return await _contents(db_path)
+
+    assert asyncio.run(scenario()) == ["first", "second"]
+
+
+async def _first_message(path: str) -> dict:
+    async with aiosqlite.connect(path) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT id, conversation_id, role, content, sources, cancelled, created_at FROM messages"
+        )
+        return dict(await cursor.fetchone())
+
+
+def test_locked_database_is_retried_a_bounded_number_of_times(db_path, monkeypatch):
+    monkeypatch.setattr(settings, "persist_max_retries", 3)
+
+    async def locked(statements):
+        raise sqlite3.OperationalError("database is locked")
+
+    async def scenario():
+        writer = MessageWriter()
+        writer.add_conversation("c1", "title")
+        writer.add_message("c1", "user", "hello", created_at="1")
+        monkeypatch.setattr(writer, "_commit", locked)
+        for _ in range(2):
+            with pytest.raises(sqlite3.OperationalError):
+                await writer.flush()
+            assert writer.pending_messages("c1")
+        await writer.flush()
+        assert not writer.pending_messages("c1")
+        return await _contents(db_path)
+
+    assert asyncio.run(scenario()) == ["hello"]
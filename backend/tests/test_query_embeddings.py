@@ -0,0 +1,81 @@
+import threading
+import time
+
+from providers.query_embeddings import CachedEmbeddings, _QueryVectors
+from providers.scheduler import BATCH, current_priority, priority
+
+
+class _QueryOnly:
+    """Model whose query vectors differ from its document vectors."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = self.most_in_flight = 0
+        self.calls = 0
+        self.priorities = set()
+
+    def embed_documents(self, texts):
+        raise AssertionError("queries must not be embedded as documents")
+
+    def embed_query(self, text):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+            self.priorities.add(current_priority())
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        return [float(len(text))]
+
+
+def test_asymmetric_queries_are_embedded_concurrently_and_cached():
+    model = _QueryOnly()
+    embeddings = CachedEmbeddings(model, "test-asymmetric", batch_queries=False)
+    texts = [f"question {i}" for i in range(20)]
+    with priority(BATCH):
+        vectors = embeddings.embed_queries(texts)
+    assert vectors == [[float(len(text))] for text in texts]
+    assert model.most_in_flight > 1
+    assert model.priorities == {BATCH}
+
+    assert embeddings.embed_queries(texts[:5]) == vectors[:5]
+    assert model.calls == 20
+
+
+class _Symmetric:
+    def __init__(self):
+        self.priorities = []
+
+    def embed_documents(self, texts):
+        self.priorities.append(current_priority())
+        return [[float(len(text))] for text in texts]
+
+
+def test_batched_queries_keep_the_callers_priority():
+    model = _Symmetric()
+    with priority(BATCH):
+        assert CachedEmbeddings(model, "test-priority").embed_query("hello") == [5.0]
+    assert model.priorities == [BATCH]
+
+
+def test_failed_batch_reaches_every_waiting_caller(monkeypatch):
+    def broken(self, text, vector):
+        raise RuntimeError("cache broken")
+
+    monkeypatch.setattr(_QueryVectors, "_remember", broken)
+    embeddings = CachedEmbeddings(_Symmetric(), "test-failing")
+    errors = []
+
+    def ask(text):
+        try:
+            embeddings.embed_query(text)
+        except RuntimeError as exc:
+            errors.append(str(exc))
+
+    threads = [threading.Thread(target=ask, args=(f"q{i}",), daemon=True) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert errors == ["cache broken"] * 5
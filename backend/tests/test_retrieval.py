@@ -0,0 +1,40 @@
+from langchain.retrievers import EnsembleRetriever
+from langchain_community.retrievers import BM25Retriever
+from langchain_core.documents import Document
+
+import rag.engine as engine
+import rag.retrieval as retrieval
+from config import settings
+
+
+class _Embeddings:
+    def embed_queries(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+
+def test_single_question_is_routed_before_hybrid_fusion(monkeypatch):
+    for flag, value in (("use_multi_query", False), ("use_hyde", False),
+                        ("use_hybrid_search", True), ("use_doc_routing", True)):
+        monkeypatch.setattr(settings, flag, value)
+    routed = Document("cats sit on mats", metadata={"doc_id": "cats"})
+    keyword = Document("birds watch cats", metadata={"doc_id": "birds"})
+    searched = []
+
+    def search(vectors, k, where=None):
+        searched.append(where)
+        return [[(Document(routed.page_content, metadata=dict(routed.metadata)), 0.9)] for _ in vectors]
+
+    bm25 = BM25Retriever.from_documents([keyword])
+    monkeypatch.setattr(engine, "get_llm", lambda: None)
+    monkeypatch.setattr(retrieval, "get_index_embeddings", _Embeddings)
+    monkeypatch.setattr(retrieval, "route_documents", lambda vectors, top_n, doc_ids=None: [["cats"] for _ in vectors])
+    monkeypatch.setattr(retrieval, "similarity_search_by_vectors", search)
+    monkeypatch.setattr(retrieval, "get_hybrid_retriever",
+                        lambda where=None: EnsembleRetriever(retrievers=[bm25, bm25], weights=[0.5, 0.5]))
+
+    single = engine.RAGEngine()._search("cats")
+    batch = retrieval.batch_retrieve(["cats"])[0]
+
+    assert searched == [{"doc_id": {"$in": ["cats"]}}] * 2
+    assert [d.page_content for d in single] == [d.page_content for d in batch]
+    assert {d.metadata["doc_id"] for d in single} == {"cats", "birds"}
@@ -0,0 +1,11 @@
+import numpy as np
+
+from vectorstore.tune import exact_neighbours
+
+
+def test_exact_neighbours_are_nearest_first():
+    rng = np.random.default_rng(0)
+    corpus = rng.random((200, 8)).astype(np.float32)
+    queries = corpus[:20]
+    expected = np.argsort(((corpus[None] - queries[:, None]) ** 2).sum(axis=2), axis=1)[:, :6]
+    assert (exact_neighbours(corpus, queries, 6, "l2", block=37) == expected).all()
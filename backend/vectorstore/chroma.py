@@ -1,31 +1,197 @@
+import hashlib
+import json
+import threading
+from functools import lru_cache
 import chromadb
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
 from langchain_community.vectorstores import Chroma
-from providers.factory import get_embeddings
+from providers.factory import get_embeddings, get_embedding_model_id
+from bus.factory import on_invalidate
 from config import settings
 
+# Collection used before indexes were keyed by embedding model; adopted as-is
+# on first start so existing data keeps serving
+LEGACY_COLLECTION = "ragforge"
+
+# Chroma's own defaults, which collections created without metadata use
+HNSW_DEFAULTS = {"hnsw_space": "l2", "hnsw_m": 16, "hnsw_construction_ef": 100, "hnsw_search_ef": 10}
+_HNSW_METADATA_KEYS = {
+    "hnsw_space": "hnsw:space",
+    "hnsw_m": "hnsw:M",
+    "hnsw_construction_ef": "hnsw:construction_ef",
+    "hnsw_search_ef": "hnsw:search_ef",
+}
+
+_LIST_PAGE_SIZE = 5000
+
 _cached_vectorstore = None
+_active_index: dict | None = None
+# Chroma fails when two threads create the same collection at once
+_create_lock = threading.Lock()
+
+
+def index_spec() -> dict:
+    """Everything that makes stored vectors incompatible when it changes."""
+    return {
+        "vector_backend": settings.vector_backend,
+        "embedding": get_embedding_model_id(),
+        "chunk_size": settings.chunk_size,
+        "chunk_overlap": settings.chunk_overlap,
+        "chunk_tokenizer": settings.chunk_tokenizer,
+        **{key: getattr(settings, key) for key in _HNSW_METADATA_KEYS},
+    }
+
+
+def hnsw_metadata(spec: dict) -> dict:
+    return {meta_key: spec.get(key, HNSW_DEFAULTS[key]) for key, meta_key in _HNSW_METADATA_KEYS.items()}
+
+
+def collection_hnsw_params(index: dict) -> dict:
+    """HNSW parameters an existing collection was actually built with."""
+    try:
+        metadata = get_client(index).get_collection(index["name"]).metadata or {}
+    except Exception:
+        return {}
+    return {key: metadata.get(meta_key, HNSW_DEFAULTS[key]) for key, meta_key in _HNSW_METADATA_KEYS.items()}
+
+
+def collection_name_for(spec: dict) -> str:
+    digest = hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:12]
+    return f"ragforge_{digest}"
+
+
+def get_active_index() -> dict:
+    """The collection queries and ingestion currently use: {name, provider, spec}."""
+    global _active_index
+    if _active_index is None:
+        _active_index = {
+            "name": LEGACY_COLLECTION,
+            "provider": settings.llm_provider,
+            "spec": index_spec(),
+        }
+    return _active_index
+
+
+def set_active_index(index: dict):
+    global _active_index
+    _active_index = index
+    reset_vectorstore_cache()
+
 
+def get_index_embeddings():
+    """Embeddings matching the active collection, which may lag settings.llm_provider."""
+    return get_embeddings(get_active_index()["provider"])
 
-def get_vectorstore() -> Chroma:
+
+def get_client(index: dict | None = None):
+    """Client for the backend holding an index (the active one by default)."""
+    index = index or get_active_index()
+    if index["spec"].get("vector_backend", "chroma") == "local":
+        from vectorstore.local import LocalClient
+        return LocalClient(settings.local_vector_dir)
+    return _chroma_client(settings.chroma_persist_dir)
+
+
+@lru_cache(maxsize=None)
+def _chroma_client(path: str):
+    # Creating a client costs milliseconds; routed queries need one per search
+    return chromadb.PersistentClient(path=path)
+
+
+def get_or_create(client, name: str, metadata: dict | None = None):
+    """A collection, created (with metadata) by one thread at a time if missing."""
+    try:
+        return client.get_collection(name)
+    except Exception:
+        with _create_lock:
+            return client.get_or_create_collection(name, metadata=metadata)
+
+
+def ensure_collection(index: dict):
+    """Get the index's collection, creating it with its HNSW parameters if missing.
+
+    HNSW parameters are fixed once a collection has data, so they are only
+    ever passed on creation.
+    """
+    return get_or_create(get_client(index), index["name"], hnsw_metadata(index["spec"]))
+
+
+def get_vectorstore() -> VectorStore:
     global _cached_vectorstore
     if _cached_vectorstore is None:
-        _cached_vectorstore = Chroma(
-            collection_name="ragforge",
-            embedding_function=get_embeddings(),
-            persist_directory=settings.chroma_persist_dir,
-        )
+        index = get_active_index()
+        ensure_collection(index)
+        if index["spec"].get("vector_backend", "chroma") == "local":
+            from vectorstore.local import LocalVectorStore
+            _cached_vectorstore = LocalVectorStore(
+                collection_name=index["name"],
+                embedding_function=get_index_embeddings(),
+                persist_directory=settings.local_vector_dir,
+            )
+        else:
+            _cached_vectorstore = Chroma(
+                collection_name=index["name"],
+                embedding_function=get_index_embeddings(),
+                persist_directory=settings.chroma_persist_dir,
+            )
     return _cached_vectorstore
 
 
+def similarity_search_by_vectors(
+    vectors: list[list[float]], k: int, where: dict | None = None
+) -> list[list[tuple[Document, float]]]:
+    """Run many pre-embedded queries in a single collection query."""
+    if not vectors:
+        return []
+    vectorstore = get_vectorstore()
+    results = vectorstore._collection.query(
+        query_embeddings=vectors,
+        n_results=k,
+        where=where,
+        include=["documents", "metadatas", "distances"],
+    )
+    relevance_fn = vectorstore._select_relevance_score_fn()
+    batches = []
+    for texts, metadatas, distances in zip(results["documents"], results["metadatas"], results["distances"]):
+        batches.append([
+            (Document(page_content=text, metadata=metadata or {}), relevance_fn(distance))
+            for text, metadata, distance in zip(texts, metadatas, distances)
+        ])
+    return batches
+
+
+def list_doc_ids(index: dict) -> list[str]:
+    collection = get_client(index).get_or_create_collection(index["name"])
+    doc_ids: dict[str, None] = {}
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=_LIST_PAGE_SIZE, offset=offset)
+        for meta in page["metadatas"]:
+            if meta and meta.get("doc_id"):
+                doc_ids[meta["doc_id"]] = None
+        if len(page["ids"]) < _LIST_PAGE_SIZE:
+            return list(doc_ids)
+        offset += _LIST_PAGE_SIZE
+
+
 def reset_vectorstore_cache():
     global _cached_vectorstore
     _cached_vectorstore = None
 
 
-def delete_document_vectors(doc_id: str):
-    client = chromadb.PersistentClient(path=settings.chroma_persist_dir)
-    collection = client.get_or_create_collection("ragforge")
-    results = collection.get(where={"doc_id": doc_id})
+@on_invalidate("vectorstore")
+def _on_vectorstore_written(message: dict):
+    # Another worker (or this one) wrote to the active collection
+    reset_vectorstore_cache()
+
+
+def delete_document_vectors(doc_id: str, collection_name: str | None = None):
+    if collection_name is None:
+        collection = ensure_collection(get_active_index())
+    else:
+        collection = get_or_create(get_client(), collection_name)
+    results = collection.get(where={"doc_id": doc_id}, include=[])
     if results["ids"]:
         collection.delete(ids=results["ids"])
     reset_vectorstore_cache()
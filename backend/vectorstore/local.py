@@ -0,0 +1,614 @@
+"""Embedded vector store: memory-mapped float32 vectors plus a SQLite row table.
+
+A collection is a directory:
+
+    collection.json   dimensions and collection metadata (hnsw:space, hnsw:M, ...)
+    vectors.f32       row-major float32 vectors, appended in place
+    alive.u8          1 per live row, 0 once deleted or replaced
+    rows.sqlite       row number -> id, doc_id, document text, metadata JSON
+    hnsw.bin          optional graph over row numbers (settings.local_use_hnsw)
+    write.lock        flock()ed around every write
+
+Several processes (uvicorn workers, a CLI next to the server) can share a
+collection: writes hold an exclusive lock on write.lock and first catch up
+on rows the others appended or compacted away, so row numbers are only
+ever assigned by one process at a time. Without fcntl (Windows) a
+collection must only be opened by one process.
+
+Opening a collection maps the files without reading them, so cold start does
+not depend on corpus size; pages are faulted in by the first searches. Search
+is exact (blocked NumPy scan) unless the HNSW graph is enabled and hnswlib is
+installed. LocalCollection mirrors the subset of the chromadb Collection API
+the rest of the backend uses, so re-indexing and tuning work on either backend.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Iterable
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_SEARCH_BLOCK = 65_536
+_SQL_BATCH = 500
+_KEY_RE = re.compile(r"^[\w.\-]+$")
+_OPS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+# Compact once tombstones outnumber live rows (and there are enough to matter)
+_COMPACT_MIN_DEAD = 10_000
+
+_open_collections: dict[str, "LocalCollection"] = {}
+_open_lock = threading.Lock()
+_hnswlib_missing = False
+
+
+def _where_sql(where: dict) -> tuple[str, list]:
+    """Translate a Chroma-style where filter into SQL over the rows table."""
+    clauses, params = [], []
+    for key, cond in where.items():
+        if key in ("$and", "$or"):
+            parts = [_where_sql(sub) for sub in cond]
+            joiner = " AND " if key == "$and" else " OR "
+            clauses.append("(" + joiner.join(f"({sql})" for sql, _ in parts) + ")")
+            for _, sub_params in parts:
+                params.extend(sub_params)
+            continue
+        if not _KEY_RE.match(key):
+            raise ValueError(f"Unsupported metadata key in filter: {key!r}")
+        column = "doc_id" if key == "doc_id" else f"json_extract(metadata, '$.\"{key}\"')"
+        op, value = next(iter(cond.items())) if isinstance(cond, dict) else ("$eq", cond)
+        if op in ("$in", "$nin"):
+            values = list(value)
+            if not values:
+                clauses.append("0" if op == "$in" else "1")
+                continue
+            negate = "NOT " if op == "$nin" else ""
+            clauses.append(f"{column} {negate}IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        elif op in _OPS:
+            clauses.append(f"{column} {_OPS[op]} ?")
+            params.append(value)
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+    return " AND ".join(clauses) or "1", params
+
+
+class LocalCollection:
+    def __init__(self, path: str, metadata: dict | None = None):
+        self.path = path
+        self.name = os.path.basename(path)
+        os.makedirs(path, exist_ok=True)
+        info_path = os.path.join(path, "collection.json")
+        if os.path.exists(info_path):
+            with open(info_path) as f:
+                self._info = json.load(f)
+        else:
+            self._info = {"dimensions": None, "metadata": metadata or {}}
+            self._save_info()
+
+        self._lock = threading.RLock()
+        self._lock_file = open(os.path.join(path, "write.lock"), "a")
+        self._lock_depth = 0
+        self._generation = 0
+        self._mapped = None  # (inode, size) of vectors.f32 when it was mapped
+        self._db = sqlite3.connect(os.path.join(path, "rows.sqlite"), check_same_thread=False)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS rows (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                doc_id TEXT,
+                document TEXT,
+                metadata TEXT
+            );
+            CREATE INDEX IF NOT EXISTS rows_doc_id ON rows(doc_id);
+        """)
+        self._graph = None
+        self._graph_dirty = False
+        with self._exclusive():
+            self._remap(repair=True)
+
+    @property
+    def metadata(self) -> dict:
+        return self._info["metadata"]
+
+    @property
+    def _dimensions(self) -> int | None:
+        return self._info["dimensions"]
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _save_info(self):
+        tmp = self._file("collection.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self._info, f)
+        os.replace(tmp, self._file("collection.json"))
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the collection's write lock against other threads and processes."""
+        with self._lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """Catch up on writes other processes made since the files were mapped (call under self._lock)."""
+        if self._dimensions is None:
+            info_path = self._file("collection.json")
+            with open(info_path) as f:
+                self._info = json.load(f)
+            if self._dimensions is None:
+                return
+        try:
+            stat = os.stat(self._file("vectors.f32"))
+        except FileNotFoundError:
+            return
+        if self._mapped is not None and self._mapped == (stat.st_ino, stat.st_size):
+            return
+        if self._mapped is None or self._mapped[0] != stat.st_ino:
+            # Compacted elsewhere: row numbers moved, so searches in flight and the graph are stale
+            self._graph = None
+            self._graph_dirty = False
+            self._generation += 1
+            self._remap()
+            return
+        old_rows = self._rows
+        self._remap()
+        if self._graph is not None and self._rows > old_rows:
+            self._graph_add(old_rows, self._rows)
+
+    def _remap(self, repair: bool = False):
+        """Map the vector and liveness files; on open, cut off a torn trailing write."""
+        dims = self._dimensions
+        if not dims:
+            self._rows = 0
+            self._vectors = np.empty((0, 0), dtype=np.float32)
+            self._alive = np.empty(0, dtype=np.uint8)
+            return
+        vectors_path, alive_path = self._file("vectors.f32"), self._file("alive.u8")
+        for p in (vectors_path, alive_path):
+            if not os.path.exists(p):
+                open(p, "wb").close()
+        rows = min(os.path.getsize(vectors_path) // (dims * 4), os.path.getsize(alive_path))
+        if repair:
+            os.truncate(vectors_path, rows * dims * 4)
+            os.truncate(alive_path, rows)
+            self._db.execute("DELETE FROM rows WHERE row >= ?", (rows,))
+            self._db.commit()
+        stat = os.stat(vectors_path)
+        self._mapped = (stat.st_ino, stat.st_size)
+        self._rows = rows
+        if rows:
+            self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(rows, dims))
+            self._alive = np.memmap(alive_path, dtype=np.uint8, mode="r+", shape=(rows,))
+        else:
+            self._vectors = np.empty((0, dims), dtype=np.float32)
+            self._alive = np.empty(0, dtype=np.uint8)
+
+    # -- rows -------------------------------------------------------------
+
+    def _select_rows(self, ids=None, where=None, limit=None, offset=None) -> list[tuple]:
+        sql, params = "SELECT row, id, document, metadata FROM rows WHERE 1", []
+        if ids is not None:
+            ids = list(ids)
+            if not ids:
+                return []
+            if len(ids) > _SQL_BATCH:
+                found = []
+                for i in range(0, len(ids), _SQL_BATCH):
+                    found.extend(self._select_rows(ids[i:i + _SQL_BATCH], where))
+                found.sort()
+                return found[offset or 0:(offset or 0) + limit if limit else None]
+            sql += f" AND id IN ({', '.join('?' * len(ids))})"
+            params.extend(ids)
+        if where:
+            where_sql, where_params = _where_sql(where)
+            sql += f" AND ({where_sql})"
+            params.extend(where_params)
+        sql += " ORDER BY row"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit if limit is not None else -1, offset or 0])
+        return self._db.execute(sql, params).fetchall()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas")) -> dict:
+        with self._lock:
+            self._refresh()
+            found = self._select_rows(ids, where, limit, offset)
+            result = {
+                "ids": [r[1] for r in found],
+                "documents": [r[2] for r in found] if "documents" in include else None,
+                "metadatas": [json.loads(r[3]) for r in found] if "metadatas" in include else None,
+                "embeddings": None,
+            }
+            if "embeddings" in include:
+                rows = np.asarray([r[0] for r in found], dtype=np.int64)
+                result["embeddings"] = self._vectors[rows].tolist() if len(rows) else []
+        return result
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        ids = list(ids)
+        vectors = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        documents = list(documents) if documents is not None else [None] * len(ids)
+        metadatas = [m or {} for m in metadatas] if metadatas is not None else [{}] * len(ids)
+        with self._exclusive():
+            self._refresh()
+            if self._dimensions is None:
+                self._info["dimensions"] = int(vectors.shape[1])
+                self._save_info()
+                self._remap()
+            elif vectors.shape[1] != self._dimensions:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection ({self._dimensions})")
+
+            replaced = [r[0] for r in self._select_rows(ids)]
+            start = self._rows
+            # Vectors land dead and only become visible once their rows are committed
+            with open(self._file("alive.u8"), "ab") as f:
+                f.write(bytes(len(ids)))
+            with open(self._file("vectors.f32"), "ab") as f:
+                f.write(vectors.tobytes())
+            self._delete_rows(replaced, commit=False)
+            self._db.executemany(
+                "INSERT INTO rows (row, id, doc_id, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (start + i, id_, meta.get("doc_id"), doc, json.dumps(meta))
+                    for i, (id_, doc, meta) in enumerate(zip(ids, documents, metadatas))
+                ],
+            )
+            self._db.commit()
+            self._remap()
+            self._alive[start:start + len(ids)] = 1
+            self._alive.flush()
+            if self._graph is not None:
+                self._graph_add(start, self._rows)
+
+    add = upsert
+
+    def _delete_rows(self, rows: list[int], commit: bool = True):
+        if not rows:
+            return
+        self._alive[np.asarray(rows, dtype=np.int64)] = 0
+        self._alive.flush()
+        for i in range(0, len(rows), _SQL_BATCH):
+            part = rows[i:i + _SQL_BATCH]
+            self._db.execute(f"DELETE FROM rows WHERE row IN ({', '.join('?' * len(part))})", part)
+        if commit:
+            self._db.commit()
+
+    def delete(self, ids=None, where=None):
+        with self._exclusive():
+            self._refresh()
+            rows = [r[0] for r in self._select_rows(ids, where)]
+            self._delete_rows(rows)
+            dead = self._rows - self.count()
+            if dead >= _COMPACT_MIN_DEAD and dead > self._rows // 2:
+                self.compact()
+
+    def compact(self):
+        """Rewrite the files without tombstoned rows and renumber the rest."""
+        with self._exclusive():
+            self._refresh()
+            live = np.flatnonzero(np.asarray(self._alive))
+            tmp = self._file("vectors.f32.tmp")
+            with open(tmp, "wb") as f:
+                for i in range(0, len(live), _SEARCH_BLOCK):
+                    f.write(np.ascontiguousarray(self._vectors[live[i:i + _SEARCH_BLOCK]]).tobytes())
+            # Ascending renumbering never collides: a row only moves down into
+            # numbers already vacated
+            self._db.executemany(
+                "UPDATE rows SET row = ? WHERE row = ?",
+                [(new, int(old)) for new, old in enumerate(live) if new != old],
+            )
+            # Replaced rather than truncated: other processes may still have the old files mapped
+            with open(self._file("alive.u8.tmp"), "wb") as f:
+                f.write(b"\x01" * len(live))
+            os.replace(tmp, self._file("vectors.f32"))
+            os.replace(self._file("alive.u8.tmp"), self._file("alive.u8"))
+            self._db.commit()
+            self._drop_graph()
+            self._generation += 1
+            self._remap()
+            logger.info("Compacted %s to %d rows", self.name, len(live))
+
+    # -- search -----------------------------------------------------------
+
+    def _space(self) -> str:
+        return self.metadata.get("hnsw:space", "l2")
+
+    def _exact(self, queries: np.ndarray, k: int, vectors, alive, candidates) -> tuple[np.ndarray, np.ndarray]:
+        space = self._space()
+        if space == "cosine":
+            queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        q_norms = (queries * queries).sum(axis=1)[:, None]
+        n = len(candidates) if candidates is not None else len(vectors)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_dist = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, n, _SEARCH_BLOCK):
+            if candidates is not None:
+                rows = candidates[start:start + _SEARCH_BLOCK]
+            else:
+                rows = np.arange(start, min(start + _SEARCH_BLOCK, n))
+            block = np.asarray(vectors[rows] if candidates is not None else vectors[start:start + len(rows)])
+            dots = queries @ block.T
+            if space == "l2":
+                dist = q_norms - 2 * dots + (block * block).sum(axis=1)[None, :]
+            elif space == "cosine":
+                dist = 1 - dots / np.maximum(np.linalg.norm(block, axis=1), 1e-12)[None, :]
+            else:
+                dist = 1 - dots
+            dist[:, np.asarray(alive[rows]) == 0] = np.inf
+            rows = np.concatenate([best_rows, np.broadcast_to(rows, dist.shape)], axis=1)
+            dist = np.concatenate([best_dist, dist], axis=1)
+            if dist.shape[1] > k:
+                top = np.argpartition(dist, k - 1, axis=1)[:, :k]
+                rows = np.take_along_axis(rows, top, axis=1)
+                dist = np.take_along_axis(dist, top, axis=1)
+            best_rows, best_dist = rows, dist
+        order = np.argsort(best_dist, axis=1)
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_dist, order, axis=1)
+
+    def _graph_add(self, start: int, end: int):
+        graph = self._graph
+        if graph.get_max_elements() < end:
+            graph.resize_index(max(end, graph.get_max_elements() * 2))
+        for i in range(start, end, _SEARCH_BLOCK):
+            j = min(i + _SEARCH_BLOCK, end)
+            graph.add_items(np.asarray(self._vectors[i:j]), np.arange(i, j))
+        self._graph_dirty = True
+
+    def _ensure_graph(self):
+        global _hnswlib_missing
+        if self._graph is not None or not settings.local_use_hnsw or _hnswlib_missing or not self._rows:
+            return self._graph
+        try:
+            import hnswlib
+        except ImportError:
+            logger.warning("local_use_hnsw is set but hnswlib is not installed; using exact search")
+            _hnswlib_missing = True
+            return None
+        meta = self.metadata
+        graph = hnswlib.Index(space=self._space(), dim=self._dimensions)
+        path = self._file("hnsw.bin")
+        if os.path.exists(path):
+            graph.load_index(path, max_elements=self._rows)
+            if graph.get_current_count() > self._rows:
+                # Saved before a torn write was cut off on open; rebuild
+                graph = hnswlib.Index(space=self._space(), dim=self._dimensions)
+                os.unlink(path)
+        if not os.path.exists(path):
+            graph.init_index(
+                max_elements=self._rows,
+                M=meta.get("hnsw:M", 16),
+                ef_construction=meta.get("hnsw:construction_ef", 100),
+            )
+        graph.set_ef(meta.get("hnsw:search_ef", 10))
+        self._graph = graph
+        built = graph.get_current_count()
+        if built < self._rows:
+            # Rows appended since the graph was last saved
+            self._graph_add(built, self._rows)
+            self.flush()
+        return graph
+
+    def _drop_graph(self):
+        self._graph = None
+        self._graph_dirty = False
+        try:
+            os.unlink(self._file("hnsw.bin"))
+        except FileNotFoundError:
+            pass
+
+    def _approximate(self, queries: np.ndarray, k: int, graph, alive) -> tuple[np.ndarray, np.ndarray]:
+        live = int(np.count_nonzero(alive))
+        fetch = min(k, live)
+        while True:
+            labels, dist = graph.knn_query(queries, k=min(fetch, graph.get_current_count()))
+            keep = np.asarray(alive[labels]) == 1
+            if keep.sum(axis=1).min() >= min(k, live) or fetch >= graph.get_current_count():
+                break
+            fetch *= 2
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        dists = np.full((len(queries), k), np.inf, dtype=np.float32)
+        for i in range(len(queries)):
+            found = labels[i][keep[i]][:k]
+            rows[i, :len(found)] = found
+            dists[i, :len(found)] = dist[i][keep[i]][:k]
+        return rows, dists
+
+    def query(self, query_embeddings, n_results: int = 10, where=None, include=("documents", "metadatas", "distances")) -> dict:
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        while True:
+            with self._lock:
+                self._refresh()
+                generation = self._generation
+                vectors, alive = self._vectors, self._alive
+                candidates = None
+                if where:
+                    candidates = np.asarray([r[0] for r in self._select_rows(where=where)], dtype=np.int64)
+                graph = self._ensure_graph() if candidates is None else None
+            k = min(n_results, len(candidates) if candidates is not None else len(vectors))
+            if k <= 0:
+                rows = np.empty((len(queries), 0), dtype=np.int64)
+                dists = np.empty((len(queries), 0), dtype=np.float32)
+            elif graph is not None:
+                try:
+                    rows, dists = self._approximate(queries, k, graph, alive)
+                except RuntimeError:  # graph too sparse for k; fall back to exact
+                    rows, dists = self._exact(queries, k, vectors, alive, None)
+            else:
+                rows, dists = self._exact(queries, k, vectors, alive, candidates)
+
+            with self._lock:
+                self._refresh()
+                if generation != self._generation:
+                    continue  # compacted while searching; row numbers moved
+                wanted = sorted({int(r) for r in rows[np.isfinite(dists)].ravel()})
+                by_row = {}
+                for i in range(0, len(wanted), _SQL_BATCH):
+                    part = wanted[i:i + _SQL_BATCH]
+                    for row in self._db.execute(
+                        f"SELECT row, id, document, metadata FROM rows WHERE row IN ({', '.join('?' * len(part))})",
+                        part,
+                    ):
+                        by_row[row[0]] = row
+            break
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query_rows, query_dists in zip(rows, dists):
+            hits = [(by_row[int(r)], float(d)) for r, d in zip(query_rows, query_dists) if int(r) in by_row]
+            result["ids"].append([h[1] for h, _ in hits])
+            result["documents"].append([h[2] for h, _ in hits])
+            result["metadatas"].append([json.loads(h[3]) for h, _ in hits])
+            result["distances"].append([d for _, d in hits])
+        return result
+
+    def flush(self):
+        """Persist the HNSW graph if it changed since it was last saved."""
+        with self._lock:
+            if self._graph is not None and self._graph_dirty:
+                # Another process may be loading it
+                self._graph.save_index(self._file("hnsw.bin.tmp"))
+                os.replace(self._file("hnsw.bin.tmp"), self._file("hnsw.bin"))
+                self._graph_dirty = False
+
+    def close(self):
+        self.flush()
+        self._db.close()
+        self._lock_file.close()
+
+
+class LocalClient:
+    """Directory of LocalCollections with the chromadb client calls the backend uses."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, name: str) -> str:
+        return os.path.abspath(os.path.join(self.root, name))
+
+    def get_collection(self, name: str) -> LocalCollection:
+        path = self._path(name)
+        with _open_lock:
+            if path not in _open_collections:
+                if not os.path.exists(os.path.join(path, "collection.json")):
+                    raise ValueError(f"Collection {name} does not exist.")
+                _open_collections[path] = LocalCollection(path)
+            return _open_collections[path]
+
+    def get_or_create_collection(self, name: str, metadata: dict | None = None) -> LocalCollection:
+        path = self._path(name)
+        with _open_lock:
+            if path not in _open_collections:
+                _open_collections[path] = LocalCollection(path, metadata)
+            return _open_collections[path]
+
+    def delete_collection(self, name: str):
+        path = self._path(name)
+        with _open_lock:
+            collection = _open_collections.pop(path, None)
+            if collection is not None:
+                collection.close()
+        shutil.rmtree(path, ignore_errors=True)
+
+    def list_collections(self) -> list[LocalCollection]:
+        if not os.path.isdir(self.root):
+            return []
+        return [
+            self.get_collection(name) for name in sorted(os.listdir(self.root))
+            if os.path.exists(os.path.join(self.root, name, "collection.json"))
+        ]
+
+
+def flush_collections():
+    """Save changed HNSW graphs of every open collection (called on shutdown)."""
+    with _open_lock:
+        collections = list(_open_collections.values())
+    for collection in collections:
+        collection.flush()
+
+
+class LocalVectorStore(VectorStore):
+    """LangChain VectorStore over a LocalCollection (drop-in for the Chroma wrapper)."""
+
+    def __init__(self, collection_name: str, embedding_function: Embeddings, persist_directory: str):
+        self._collection = LocalClient(persist_directory).get_or_create_collection(collection_name)
+        self._embedding_function = embedding_function
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    def add_texts(self, texts: Iterable[str], metadatas: list[dict] | None = None, ids: list[str] | None = None, **kwargs: Any) -> list[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        vectors = self._embedding_function.embed_documents(texts)
+        self._collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+        return ids
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict | None = None, **kwargs: Any) -> list[tuple[Document, float]]:
+        vector = self._embedding_function.embed_query(query)
+        results = self._collection.query([vector], n_results=k, where=filter)
+        return [
+            (Document(page_content=text or "", metadata=metadata), distance)
+            for text, metadata, distance in zip(results["documents"][0], results["metadatas"][0], results["distances"][0])
+        ]
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict | None = None, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        space = self._collection.metadata.get("hnsw:space", "l2")
+        if space == "cosine":
+            return self._cosine_relevance_score_fn
+        if space == "ip":
+            return self._max_inner_product_relevance_score_fn
+        return self._euclidean_relevance_score_fn
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas")) -> dict:
+        return self._collection.get(ids=ids, where=where, limit=limit, offset=offset, include=include)
+
+    def delete(self, ids: list[str] | None = None, **kwargs: Any):
+        self._collection.delete(ids=ids)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: list[dict] | None = None,
+        ids: list[str] | None = None,
+        collection_name: str = "ragforge",
+        persist_directory: str | None = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(collection_name, embedding, persist_directory or settings.local_vector_dir)
+        store.add_texts(texts, metadatas, ids)
+        return store
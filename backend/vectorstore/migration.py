@@ -0,0 +1,429 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+import aiosqlite
+import chromadb
+from langchain_core.documents import Document
+from config import apply_settings, settings
+from database import DB_PATH
+from providers.factory import get_embeddings
+from providers.scheduler import BACKGROUND, run_at
+from bus.factory import MAINTENANCE, dispatch, invalidate, job_handler, on_invalidate
+from rag.chunking import chunk_documents
+from vectorstore.chroma import (
+    LEGACY_COLLECTION,
+    collection_hnsw_params,
+    collection_name_for,
+    ensure_collection,
+    get_active_index,
+    get_client,
+    index_spec,
+    list_doc_ids,
+    set_active_index,
+)
+from vectorstore.routing import drop_doc_collection, update_doc_centroid
+
+logger = logging.getLogger(__name__)
+
+CHUNKING_KEYS = ("chunk_size", "chunk_overlap", "chunk_tokenizer")
+# Metadata the chunker/processor adds per chunk; everything else identifies the source section
+_CHUNK_KEYS = ("start_index", "chunk_id")
+
+
+class _IndexWriteGate:
+    """Ingestion writes run concurrently with each other but never across a collection switch."""
+
+    def __init__(self):
+        self._writers = 0
+        self._switching = False
+        self._cond = asyncio.Condition()
+
+    @asynccontextmanager
+    async def write(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: not self._switching)
+            self._writers += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._writers -= 1
+                self._cond.notify_all()
+
+    @asynccontextmanager
+    async def switch(self):
+        async with self._cond:
+            self._switching = True
+            await self._cond.wait_for(lambda: self._writers == 0)
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._switching = False
+                self._cond.notify_all()
+
+
+_gate = _IndexWriteGate()
+
+
+def _reassemble(chunks: list[tuple[str, dict]]) -> str:
+    """Rebuild a section's text from its overlapping chunks using their start offsets."""
+    text = ""
+    def offset(chunk):
+        start = chunk[1].get("start_index")
+        return start if start is not None and start >= 0 else float("inf")
+
+    for content, meta in sorted(chunks, key=offset):
+        start = meta.get("start_index")
+        if start is None or start < 0:
+            text = f"{text}\n\n{content}" if text else content
+        elif start <= len(text):
+            if start + len(content) > len(text):
+                text = text[:start] + content
+        else:
+            # The splitter strips whitespace at chunk edges; newlines keep paragraph breaks
+            text += "\n" * (start - len(text)) + content
+    return text
+
+
+def _rebuild_documents(texts: list[str], metadatas: list[dict]) -> list[Document]:
+    sections: dict[str, list[tuple[str, dict]]] = {}
+    for text, meta in zip(texts, metadatas):
+        meta = meta or {}
+        base = {k: v for k, v in meta.items() if k not in _CHUNK_KEYS}
+        sections.setdefault(json.dumps(base, sort_keys=True), []).append((text, meta))
+    return [
+        Document(page_content=_reassemble(chunks), metadata=json.loads(key))
+        for key, chunks in sections.items()
+    ]
+
+
+def _has_legacy_chroma_collection() -> bool:
+    try:
+        chromadb.PersistentClient(path=settings.chroma_persist_dir).get_collection(LEGACY_COLLECTION)
+    except Exception:
+        return False
+    return True
+
+
+async def save_state(key: str, value: dict):
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(
+            """INSERT INTO index_state (key, value, updated_at) VALUES (?, ?, ?)
+               ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at""",
+            (key, json.dumps(value), datetime.utcnow().isoformat()),
+        )
+        await db.commit()
+
+
+async def load_state(key: str) -> dict | None:
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute("SELECT value FROM index_state WHERE key = ?", (key,))
+        row = await cursor.fetchone()
+    return json.loads(row[0]) if row else None
+
+
+async def _save_active_index(index: dict):
+    await save_state("active_index", index)
+
+
+async def load_index_state():
+    """Restore the active collection, recording the legacy one on first start."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute("SELECT value FROM index_state WHERE key = 'active_index'")
+        row = await cursor.fetchone()
+    if row:
+        index = json.loads(row[0])
+        index["spec"].setdefault("vector_backend", "chroma")
+    else:
+        index = get_active_index()
+        if await asyncio.to_thread(_has_legacy_chroma_collection):
+            index["spec"]["vector_backend"] = "chroma"
+    # Record what the collection was really built with (older states and the
+    # legacy collection carry no HNSW parameters)
+    actual = await asyncio.to_thread(collection_hnsw_params, index)
+    index["spec"] = {**index["spec"], **actual}
+    set_active_index(index)
+    await _save_active_index(index)
+
+
+class ReindexJob:
+    """Re-chunks and re-embeds the corpus into a new collection, then switches to it.
+
+    Queries keep using the active collection while the job runs. Documents
+    written or deleted meanwhile are marked dirty and migrated again before the
+    switch, which happens with ingestion writes paused so nothing is lost.
+    Embedding calls are batched (reindex_batch_size) and spaced out
+    (reindex_pause_ms) to leave provider quota for live traffic.
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._dirty: set[str] = set()
+        self._saved_at = 0.0
+        self._reset(None, None)
+
+    def _reset(self, source: dict | None, target: dict | None):
+        self.source = source
+        self.target = target
+        self.status = "idle"
+        self.docs_total = 0
+        self.docs_done = 0
+        self.chunks_written = 0
+        self.error: str | None = None
+        self.started_at: str | None = None
+        self.finished_at: str | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def snapshot(self) -> dict:
+        return {
+            "status": self.status,
+            "source": self.source["name"] if self.source else None,
+            "target": self.target["name"] if self.target else None,
+            "target_spec": self.target["spec"] if self.target else None,
+            "docs_total": self.docs_total,
+            "docs_done": self.docs_done,
+            "chunks_written": self.chunks_written,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    async def _save_status(self, force: bool = False):
+        """Share progress with the other workers (at most once a second unless forced)."""
+        now = time.monotonic()
+        if force or now - self._saved_at >= 1.0:
+            self._saved_at = now
+            await save_state("reindex", self.snapshot())
+
+    def mark_dirty(self, doc_id: str):
+        if self.running:
+            self._dirty.add(doc_id)
+
+    async def wait(self):
+        """Until no re-index is running here, including one restarted meanwhile with new settings."""
+        while self.running:
+            await asyncio.wait([self._task])
+
+    async def cancel(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def start(self, target: dict):
+        await self.cancel()
+        self._reset(get_active_index(), target)
+        self._dirty.clear()
+        self.status = "running"
+        self.started_at = datetime.utcnow().isoformat()
+        await self._save_status(force=True)
+        self._task = asyncio.create_task(self._run())
+
+    @run_at(BACKGROUND)
+    async def _run(self):
+        source, target = self.source, self.target
+        logger.info("Re-indexing %s -> %s (%s)", source["name"], target["name"], target["spec"])
+        try:
+            await asyncio.to_thread(ensure_collection, target)
+            doc_ids = await asyncio.to_thread(list_doc_ids, source)
+            self.docs_total = len(doc_ids)
+            for doc_id in doc_ids:
+                self._dirty.discard(doc_id)
+                self.chunks_written += await self._migrate_doc(doc_id)
+                self.docs_done += 1
+                await self._save_status()
+
+            # Catch up with ingestion that happened during the bulk pass, then
+            # drain the rest with writes paused and switch
+            while len(self._dirty) > settings.reindex_batch_size:
+                self.chunks_written += await self._migrate_doc(self._dirty.pop())
+            async with _gate.switch():
+                while self._dirty:
+                    self.chunks_written += await self._migrate_doc(self._dirty.pop())
+                set_active_index(target)
+            await _save_active_index(target)
+            # Other workers switch when they hear about it
+            await invalidate("index")
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+            self.finished_at = datetime.utcnow().isoformat()
+            await asyncio.to_thread(self._drop_collection, target)
+            await self._save_status(force=True)
+            raise
+        except Exception as exc:
+            logger.exception("Re-indexing into %s failed", target["name"])
+            self.status = "failed"
+            self.error = str(exc)
+            self.finished_at = datetime.utcnow().isoformat()
+            await asyncio.to_thread(self._drop_collection, target)
+            await self._save_status(force=True)
+            return
+
+        self.status = "completed"
+        self.finished_at = datetime.utcnow().isoformat()
+        await self._save_status(force=True)
+        logger.info("Switched to collection %s (%d chunks)", target["name"], self.chunks_written)
+        if not settings.reindex_keep_old_collection:
+            await asyncio.to_thread(self._drop_collection, source)
+
+    @staticmethod
+    def _drop_collection(index: dict):
+        try:
+            get_client(index).delete_collection(index["name"])
+        except Exception:
+            pass  # never created or already gone
+        drop_doc_collection(index)
+
+    async def _migrate_doc(self, doc_id: str) -> int:
+        """Replace doc_id's chunks (and routing centroid) in the target with the source's current ones."""
+        written = await self._migrate_chunks(doc_id)
+        await asyncio.to_thread(update_doc_centroid, doc_id, self.target)
+        return written
+
+    async def _migrate_chunks(self, doc_id: str) -> int:
+        source_spec, target_spec = self.source["spec"], self.target["spec"]
+        rechunk = any(source_spec.get(k) != target_spec.get(k) for k in CHUNKING_KEYS)
+        reembed = rechunk or source_spec.get("embedding") != target_spec.get("embedding")
+
+        src = get_client(self.source).get_or_create_collection(self.source["name"])
+        dst = get_client(self.target).get_collection(self.target["name"])
+        include = ["documents", "metadatas"] if reembed else ["documents", "metadatas", "embeddings"]
+        found = await asyncio.to_thread(src.get, where={"doc_id": doc_id}, include=include)
+        await asyncio.to_thread(dst.delete, where={"doc_id": doc_id})
+        if not found["ids"]:
+            return 0  # deleted while the job was running
+
+        batch = max(1, settings.reindex_batch_size)
+        if not reembed:
+            for i in range(0, len(found["ids"]), batch):
+                await asyncio.to_thread(
+                    dst.upsert,
+                    ids=found["ids"][i:i + batch],
+                    embeddings=found["embeddings"][i:i + batch],
+                    documents=found["documents"][i:i + batch],
+                    metadatas=found["metadatas"][i:i + batch],
+                )
+            return len(found["ids"])
+
+        if rechunk:
+            docs = _rebuild_documents(found["documents"], found["metadatas"])
+            chunks = await asyncio.to_thread(chunk_documents, docs)
+            for chunk in chunks:
+                chunk.metadata["chunk_id"] = str(uuid.uuid4())
+            ids = [chunk.metadata["chunk_id"] for chunk in chunks]
+        else:
+            chunks = [
+                Document(page_content=text, metadata=meta or {})
+                for text, meta in zip(found["documents"], found["metadatas"])
+            ]
+            ids = found["ids"]
+
+        embeddings = get_embeddings(self.target["provider"])
+        pause = settings.reindex_pause_ms / 1000
+        for i in range(0, len(chunks), batch):
+            part = chunks[i:i + batch]
+            vectors = await asyncio.to_thread(embeddings.embed_documents, [c.page_content for c in part])
+            await asyncio.to_thread(
+                dst.upsert,
+                ids=ids[i:i + batch],
+                embeddings=vectors,
+                documents=[c.page_content for c in part],
+                metadatas=[c.metadata for c in part],
+            )
+            if pause:
+                await asyncio.sleep(pause)
+        return len(chunks)
+
+
+reindex_job = ReindexJob()
+
+
+async def reindex_status() -> dict:
+    """This worker's re-index if it is running one, else the last one any worker saved."""
+    if reindex_job.status != "idle":
+        return reindex_job.snapshot()
+    return await load_state("reindex") or reindex_job.snapshot()
+
+
+@asynccontextmanager
+async def index_writes(*doc_ids: str):
+    """Wrap writes to the active collection so a running re-index and the
+    document routing index pick them up.
+
+    Bulk writers pass every document of a batch at once: entering the gate
+    once per document could deadlock against a waiting collection switch.
+    """
+    async with _gate.write():
+        try:
+            yield
+        finally:
+            for doc_id in doc_ids:
+                reindex_job.mark_dirty(doc_id)
+            await asyncio.to_thread(_update_centroids, doc_ids)
+            # Workers drop cached handles; the one running a re-index marks the docs dirty
+            await invalidate("vectorstore", doc_ids=list(doc_ids))
+
+
+def _update_centroids(doc_ids):
+    for doc_id in doc_ids:
+        update_doc_centroid(doc_id)
+
+
+@on_invalidate("vectorstore")
+def _on_doc_written(message: dict):
+    for doc_id in message.get("doc_ids") or ():
+        reindex_job.mark_dirty(doc_id)
+
+
+@on_invalidate("index")
+async def _on_index_switched(message: dict):
+    await load_index_state()
+
+
+async def ensure_index_current() -> dict:
+    """Start (or cancel) re-indexing so the active collection matches the current settings."""
+    spec = index_spec()
+    active = get_active_index()
+    if active["spec"] == spec:
+        if reindex_job.running:
+            await reindex_job.cancel()  # settings were changed back
+        return reindex_job.snapshot()
+
+    target = {"name": collection_name_for(spec), "provider": settings.llm_provider, "spec": spec}
+    if not (reindex_job.running and reindex_job.target["name"] == target["name"]):
+        await reindex_job.start(target)
+    return reindex_job.snapshot()
+
+
+@job_handler("ensure_index", pool=MAINTENANCE)
+async def run_index_check(fields: dict | None = None):
+    """Job form of ensure_index_current: one worker at a time runs (and waits out) the re-index."""
+    # Settings changed elsewhere may reach this worker's invalidation listener after the job
+    if fields:
+        apply_settings(fields)
+    await ensure_index_current()
+    await reindex_job.wait()
+
+
+async def request_index_check(fields: dict | None = None):
+    """Ask some worker to bring the index in line with the settings (plus `fields`, if given)."""
+    # Deduplicated: while a worker is re-indexing, it picks up settings
+    # changes through the "settings" invalidation instead
+    await dispatch("ensure_index", dedupe_key="ensure_index", fields=fields)
+
+
+@on_invalidate("settings")
+async def _on_settings_changed(message: dict):
+    apply_settings(message.get("fields") or {})
+    if reindex_job.running:
+        await ensure_index_current()
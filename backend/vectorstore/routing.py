@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import numpy as np
+from providers.scheduler import BACKGROUND, run_at
+from vectorstore.chroma import get_active_index, get_client, get_or_create, list_doc_ids
+
+logger = logging.getLogger(__name__)
+
+# Collection handles by name; looking one up costs a sysdb round trip per query
+_doc_collections: dict = {}
+
+
+def doc_collection_name(index: dict) -> str:
+    return f"{index['name']}_docs"
+
+
+def get_doc_collection(index: dict | None = None):
+    """Secondary index with one centroid vector per document, alongside the chunk collection."""
+    index = index or get_active_index()
+    name = doc_collection_name(index)
+    if name not in _doc_collections:
+        _doc_collections[name] = get_or_create(get_client(index), name, {"hnsw:space": "cosine"})
+    return _doc_collections[name]
+
+
+def drop_doc_collection(index: dict):
+    _doc_collections.pop(doc_collection_name(index), None)
+    try:
+        get_client(index).delete_collection(doc_collection_name(index))
+    except Exception:
+        pass
+
+
+def centroid(vectors) -> list[float]:
+    """Mean direction of a document's chunk embeddings."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    mean = matrix.mean(axis=0)
+    return (mean / max(float(np.linalg.norm(mean)), 1e-12)).tolist()
+
+
+def update_doc_centroid(doc_id: str, index: dict | None = None):
+    """Recompute a document's centroid from its stored chunks (or drop it if none are left)."""
+    index = index or get_active_index()
+    chunks = get_client(index).get_collection(index["name"]).get(where={"doc_id": doc_id}, include=["embeddings"])
+    docs = get_doc_collection(index)
+    if not chunks["ids"]:
+        docs.delete(ids=[doc_id])
+        return
+    docs.upsert(
+        ids=[doc_id],
+        embeddings=[centroid(chunks["embeddings"])],
+        metadatas=[{"doc_id": doc_id, "chunks": len(chunks["ids"])}],
+    )
+
+
+def route_documents(vectors: list[list[float]], top_n: int, doc_ids: list[str] | None = None) -> list[list[str]] | None:
+    """The top_n closest documents per query vector (among doc_ids, if given), or None while the doc index is empty."""
+    docs = get_doc_collection()
+    total = docs.count()
+    if not total:
+        return None
+    where = {"doc_id": {"$in": doc_ids}} if doc_ids else None
+    results = docs.query(query_embeddings=vectors, n_results=min(top_n, total), where=where, include=["distances"])
+    return results["ids"]
+
+
+@run_at(BACKGROUND)
+async def backfill_doc_index():
+    """Build centroids for a collection indexed before document routing existed."""
+    index = get_active_index()
+    if await asyncio.to_thread(lambda: get_doc_collection(index).count()):
+        return
+    doc_ids = await asyncio.to_thread(list_doc_ids, index)
+    if not doc_ids:
+        return
+    logger.info("Building document routing index for %d documents", len(doc_ids))
+    for doc_id in doc_ids:
+        await asyncio.to_thread(update_doc_centroid, doc_id, index)
@@ -0,0 +1,450 @@
+"""Export the knowledge base to binary shards and bulk-load it back.
+
+    python -m vectorstore.snapshot export --name nightly
+    python -m vectorstore.snapshot import ./data/snapshots/nightly
+    python -m vectorstore.snapshot export --url http://127.0.0.1:8000
+
+A snapshot is a directory: manifest.json, documents.jsonl (the documents
+table) and shards/*.npz. Each shard holds a float32 (chunks x dims) matrix
+of embeddings plus ids, texts and JSON metadata as zlib-compressed UTF-8
+blobs with int64 offsets, so loading needs neither pickle nor the embedding
+provider. The manifest records the source collection's spec (embedding
+model and chunking settings) and a sha256 per file; import checks them all
+before it writes anything.
+
+Export reads the active collection a few documents at a time while the
+backend keeps serving: every document is captured whole, but one written
+during the export may or may not be in it. Import upserts
+snapshot_batch_size chunks at a time through index_writes, replacing the
+chunks of each document in the snapshot and leaving other documents alone.
+Without --url the commands open the data directories themselves; with a
+backend running, pass --url so the job runs inside it.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import urllib.request
+import zlib
+from datetime import datetime
+from pathlib import Path
+import aiosqlite
+import numpy as np
+from bus.factory import MAINTENANCE, job_handler
+from config import settings
+from database import DB_PATH, init_db
+from vectorstore.chroma import ensure_collection, get_active_index, get_client, list_doc_ids
+from vectorstore.migration import CHUNKING_KEYS, index_writes, load_index_state, load_state, save_state
+
+logger = logging.getLogger(__name__)
+
+FORMAT = "ragforge-snapshot"
+VERSION = 1
+
+_DOCS_PER_READ = 64
+_PARTIAL_SUFFIX = ".partial"
+_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,127}$")
+_STRING_FIELDS = ("ids", "texts", "metadatas")
+
+
+def default_snapshot_name() -> str:
+    return datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+
+
+def snapshot_path(name: str) -> Path:
+    """Directory of a named snapshot under snapshot_dir."""
+    if not _NAME_RE.match(name) or name.endswith(_PARTIAL_SUFFIX):
+        raise ValueError(f"Invalid snapshot name: {name!r}")
+    return Path(settings.snapshot_dir) / name
+
+
+def _pack_strings(values: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    encoded = [value.encode() for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(zlib.compress(b"".join(encoded)), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> list[str]:
+    data = zlib.decompress(blob.tobytes())
+    return [data[start:end].decode() for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def _file_info(path: Path) -> dict:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {"sha256": digest.hexdigest(), "bytes": path.stat().st_size}
+
+
+class _ShardWriter:
+    """Buffers exported chunks and writes them out snapshot_shard_chunks at a time."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.shards: list[dict] = []
+        self.files: dict[str, dict] = {}
+        self.chunks = 0
+        self.dimensions: int | None = None
+        self._reset()
+
+    def _reset(self):
+        self._ids, self._texts, self._metadatas, self._embeddings = [], [], [], []
+
+    def add(self, found: dict):
+        if not found["ids"]:
+            return
+        self._ids += found["ids"]
+        self._texts += [text or "" for text in found["documents"]]
+        self._metadatas += [json.dumps(meta or {}, separators=(",", ":")) for meta in found["metadatas"]]
+        self._embeddings.append(np.asarray(found["embeddings"], dtype=np.float32))
+        size = max(1, settings.snapshot_shard_chunks)
+        while len(self._ids) >= size:
+            self._write(size)
+
+    def flush(self):
+        if self._ids:
+            self._write(len(self._ids))
+
+    def _write(self, count: int):
+        embeddings = np.concatenate(self._embeddings)
+        if self.dimensions is None:
+            self.dimensions = int(embeddings.shape[1])
+        elif embeddings.shape[1] != self.dimensions:
+            raise ValueError(f"Collection mixes {self.dimensions}- and {embeddings.shape[1]}-dimensional vectors")
+        arrays = {"embeddings": embeddings[:count]}
+        for field, values in zip(_STRING_FIELDS, (self._ids, self._texts, self._metadatas)):
+            arrays[field], arrays[f"{field}_offsets"] = _pack_strings(values[:count])
+
+        name = f"shards/{len(self.shards):05d}.npz"
+        with open(self.root / name, "wb") as f:
+            # Texts are already compressed and float vectors barely shrink
+            np.savez(f, **arrays)
+        self.shards.append({"file": name, "chunks": count})
+        self.files[name] = _file_info(self.root / name)
+        self.chunks += count
+
+        rest = (self._ids[count:], self._texts[count:], self._metadatas[count:], [embeddings[count:]])
+        self._reset()
+        if rest[0]:
+            self._ids, self._texts, self._metadatas, self._embeddings = rest
+
+
+def _read_shard(path: Path) -> dict:
+    with np.load(path, allow_pickle=False) as data:
+        shard = {field: _unpack_strings(data[field], data[f"{field}_offsets"]) for field in _STRING_FIELDS}
+        shard["embeddings"] = data["embeddings"]
+    shard["metadatas"] = [json.loads(meta) for meta in shard["metadatas"]]
+    return shard
+
+
+def read_manifest(root: Path) -> dict:
+    try:
+        manifest = json.loads((root / "manifest.json").read_text())
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No snapshot at {root}") from None
+    if manifest.get("format") != FORMAT or manifest.get("version") != VERSION:
+        raise ValueError(f"{root} is not a version {VERSION} {FORMAT}")
+    return manifest
+
+
+def verify_snapshot(root: Path) -> dict:
+    """The manifest, once every file it lists matches its checksum."""
+    manifest = read_manifest(root)
+    for name, expected in manifest["files"].items():
+        path = root / name
+        if not path.is_file():
+            raise ValueError(f"Snapshot file {name} is missing")
+        if _file_info(path) != expected:
+            raise ValueError(f"Snapshot file {name} does not match its checksum")
+    return manifest
+
+
+def list_snapshots() -> list[dict]:
+    root = Path(settings.snapshot_dir)
+    if not root.is_dir():
+        return []
+    snapshots = []
+    for path in root.iterdir():
+        if path.name.endswith(_PARTIAL_SUFFIX) or not (path / "manifest.json").is_file():
+            continue
+        try:
+            manifest = read_manifest(path)
+        except ValueError:
+            continue
+        snapshots.append(summary(path.name, manifest))
+    return sorted(snapshots, key=lambda s: s["created_at"], reverse=True)
+
+
+def summary(name: str, manifest: dict) -> dict:
+    return {
+        "name": name,
+        "created_at": manifest["created_at"],
+        "collection": manifest["index"]["name"],
+        "embedding": manifest["index"]["spec"].get("embedding"),
+        "dimensions": manifest["dimensions"],
+        "documents": manifest["documents"],
+        "chunks": manifest["chunks"],
+        "bytes": sum(info["bytes"] for info in manifest["files"].values()),
+    }
+
+
+class _Status:
+    """Progress of the snapshot job this worker runs, saved to index_state for every worker to read."""
+
+    def __init__(self, operation: str, name: str):
+        self.value = {
+            "operation": operation,
+            "name": name,
+            "status": "running",
+            "documents": 0,
+            "chunks": 0,
+            "started_at": datetime.utcnow().isoformat(),
+            "finished_at": None,
+            "error": None,
+        }
+        self._saved_at = 0.0
+
+    async def update(self, force: bool = False, **fields):
+        self.value.update(fields)
+        if force or time.monotonic() - self._saved_at >= 1.0:
+            self._saved_at = time.monotonic()
+            await save_state("snapshot", self.value)
+
+    async def finish(self, error: str | None = None, **fields):
+        await self.update(
+            force=True,
+            status="failed" if error else "completed",
+            error=error,
+            finished_at=datetime.utcnow().isoformat(),
+            **fields,
+        )
+
+
+async def snapshot_status() -> dict | None:
+    """The running or last snapshot export/import, as any worker saved it."""
+    return await load_state("snapshot")
+
+
+async def _document_rows(doc_ids: set[str]) -> list[dict]:
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM documents")
+        return [dict(row) for row in await cursor.fetchall() if row["id"] in doc_ids]
+
+
+async def export_snapshot(name: str) -> dict:
+    """Write the active collection and its documents rows to snapshot_dir/name."""
+    final = snapshot_path(name)
+    if final.exists():
+        raise FileExistsError(f"Snapshot {name} already exists")
+    work = final.with_name(name + _PARTIAL_SUFFIX)
+    shutil.rmtree(work, ignore_errors=True)
+    (work / "shards").mkdir(parents=True)
+    status = _Status("export", name)
+    await status.update(force=True)
+
+    index = get_active_index()
+    collection = get_client(index).get_or_create_collection(index["name"])
+    writer = _ShardWriter(work)
+    exported: set[str] = set()
+    try:
+        doc_ids = await asyncio.to_thread(list_doc_ids, index)
+        await status.update(documents_total=len(doc_ids))
+        for i in range(0, len(doc_ids), _DOCS_PER_READ):
+            # One read per group: each document's chunks come from a single
+            # consistent view, whatever ingestion does in between
+            found = await asyncio.to_thread(
+                collection.get,
+                where={"doc_id": {"$in": doc_ids[i:i + _DOCS_PER_READ]}},
+                include=["documents", "metadatas", "embeddings"],
+            )
+            await asyncio.to_thread(writer.add, found)
+            exported.update(meta["doc_id"] for meta in found["metadatas"])
+            await status.update(documents=len(exported), chunks=writer.chunks + len(writer._ids))
+        await asyncio.to_thread(writer.flush)
+
+        # Rows only for documents whose chunks made it in; connector chunks have none
+        rows = await _document_rows(exported)
+        with open(work / "documents.jsonl", "w") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+        writer.files["documents.jsonl"] = _file_info(work / "documents.jsonl")
+
+        manifest = {
+            "format": FORMAT,
+            "version": VERSION,
+            "created_at": datetime.utcnow().isoformat(),
+            "index": {"name": index["name"], "provider": index["provider"], "spec": index["spec"]},
+            "dimensions": writer.dimensions,
+            "documents": len(exported),
+            "document_rows": len(rows),
+            "chunks": writer.chunks,
+            "shards": writer.shards,
+            "files": writer.files,
+        }
+        (work / "manifest.json").write_text(json.dumps(manifest, indent=2))
+        os.replace(work, final)
+    except BaseException as exc:
+        shutil.rmtree(work, ignore_errors=True)
+        await status.finish(error=str(exc) or type(exc).__name__)
+        raise
+    await status.finish(documents=manifest["documents"], chunks=manifest["chunks"])
+    logger.info("Exported %d chunks of %d documents to %s", manifest["chunks"], manifest["documents"], final)
+    return manifest
+
+
+def check_compatible(manifest: dict):
+    """Raise ValueError unless the snapshot's chunks and vectors can go into the active collection."""
+    snapshot_spec = manifest["index"]["spec"]
+    active_spec = get_active_index()["spec"]
+    snapshot_embedding = snapshot_spec.get("embedding")
+    active_embedding = active_spec.get("embedding")
+    if snapshot_embedding != active_embedding:
+        raise ValueError(
+            f"Snapshot vectors come from {snapshot_embedding}, the active index uses {active_embedding}; "
+            "switch the embedding model (and let re-indexing finish) before importing"
+        )
+    # Chunks cut differently would mix two chunk geometries in one index
+    differing = {key: (snapshot_spec.get(key), active_spec.get(key))
+                 for key in CHUNKING_KEYS if snapshot_spec.get(key) != active_spec.get(key)}
+    if differing:
+        details = ", ".join(f"{key}={snap} (active: {active})" for key, (snap, active) in differing.items())
+        raise ValueError(
+            f"Snapshot was chunked with {details}; "
+            "change the chunking settings to match (and let re-indexing finish) before importing"
+        )
+
+
+async def import_snapshot(root: Path) -> dict:
+    """Bulk-load a snapshot's chunks, vectors and documents rows into the active collection."""
+    status = _Status("import", root.name)
+    await status.update(force=True)
+    try:
+        manifest = await asyncio.to_thread(verify_snapshot, root)
+        check_compatible(manifest)
+        await status.update(documents_total=manifest["documents"], chunks_total=manifest["chunks"])
+
+        collection = ensure_collection(get_active_index())
+        batch = max(1, settings.snapshot_batch_size)
+        seen: set[str] = set()
+        chunks = 0
+        for shard_info in manifest["shards"]:
+            shard = await asyncio.to_thread(_read_shard, root / shard_info["file"])
+            for i in range(0, len(shard["ids"]), batch):
+                metadatas = shard["metadatas"][i:i + batch]
+                doc_ids = list(dict.fromkeys(meta["doc_id"] for meta in metadatas))
+                async with index_writes(*doc_ids):
+                    # A document's chunks can span batches and shards; clear it only once
+                    fresh = [doc_id for doc_id in doc_ids if doc_id not in seen]
+                    if fresh:
+                        await asyncio.to_thread(collection.delete, where={"doc_id": {"$in": fresh}})
+                        seen.update(fresh)
+                    await asyncio.to_thread(
+                        collection.upsert,
+                        ids=shard["ids"][i:i + batch],
+                        embeddings=shard["embeddings"][i:i + batch],
+                        documents=shard["texts"][i:i + batch],
+                        metadatas=metadatas,
+                    )
+                chunks += len(metadatas)
+                await status.update(documents=len(seen), chunks=chunks)
+
+        rows = await _import_document_rows(root / "documents.jsonl")
+    except BaseException as exc:
+        await status.finish(error=str(exc) or type(exc).__name__)
+        raise
+    result = {"documents": len(seen), "document_rows": rows, "chunks": chunks}
+    await status.finish(**result)
+    logger.info("Imported %d chunks of %d documents from %s", chunks, len(seen), root)
+    return result
+
+
+async def _import_document_rows(path: Path) -> int:
+    with open(path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    if not rows:
+        return 0
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute("PRAGMA table_info(documents)")
+        columns = {row[1] for row in await cursor.fetchall()}
+        for row in rows:
+            # Snapshots from older schemas lack newer columns; those take their defaults
+            keys = [key for key in row if key in columns]
+            await db.execute(
+                f"INSERT OR REPLACE INTO documents ({', '.join(keys)}) VALUES ({', '.join('?' * len(keys))})",
+                [row[key] for key in keys],
+            )
+        await db.commit()
+    return len(rows)
+
+
+@job_handler("snapshot_export", pool=MAINTENANCE)
+async def run_export(name: str):
+    await export_snapshot(name)
+
+
+@job_handler("snapshot_import", pool=MAINTENANCE)
+async def run_import(name: str):
+    await import_snapshot(snapshot_path(name))
+
+
+def _request(url: str, method: str = "GET", body: dict | None = None) -> dict:
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode() if body is not None else None,
+        headers={"Content-Type": "application/json"},
+        method=method,
+    )
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read())
+
+
+def _run_remote(url: str, command: str, name: str) -> dict:
+    if command == "export":
+        _request(f"{url}/api/snapshots", "POST", {"name": name})
+    else:
+        _request(f"{url}/api/snapshots/{name}/import", "POST")
+    while True:
+        time.sleep(1)
+        status = _request(f"{url}/api/snapshots/status")
+        if status and status.get("name") == name and status["status"] != "running":
+            return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("target", nargs="?", help="import: snapshot directory (or name, with --url)")
+    parser.add_argument("--name", help="export: snapshot name under snapshot_dir (default: a timestamp)")
+    parser.add_argument("--url", help="run the job in the backend at this URL instead of in this process")
+    args = parser.parse_args()
+    if args.command == "import" and not args.target:
+        parser.error("import needs a snapshot")
+
+    name = (args.name or default_snapshot_name()) if args.command == "export" else Path(args.target).name
+    if args.url:
+        status = _run_remote(args.url.rstrip("/"), args.command, name)
+        print(json.dumps(status, indent=2))
+        if status["status"] == "failed":
+            raise SystemExit(1)
+        return
+
+    async def _run():
+        await init_db()
+        await load_index_state()
+        if args.command == "export":
+            return summary(name, await export_snapshot(name))
+        return await import_snapshot(Path(args.target))
+
+    print(json.dumps(asyncio.run(_run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Sweep HNSW parameters on the active collection against a recall/latency target.
+
+    python -m vectorstore.tune --k 10 --target-recall 0.95 --target-p95-ms 20
+    python -m vectorstore.tune --questions questions.txt --apply --url http://127.0.0.1:8000
+
+Exact neighbours are computed by brute force and used as ground truth. Each
+M/construction_ef pair is built once with hnswlib (the library Chroma's index
+is built on) and searched at every search_ef. Without --questions, stored
+chunk vectors are used as queries, with the chunk itself excluded from both
+result lists. --apply sends the recommendation to a running backend, which
+rebuilds the collection in the background.
+"""
+import argparse
+import asyncio
+import json
+import time
+import urllib.request
+import hnswlib
+import numpy as np
+from config import settings
+from database import init_db
+from vectorstore.chroma import HNSW_DEFAULTS, get_active_index, get_client, get_index_embeddings
+from vectorstore.migration import load_index_state
+
+_PAGE_SIZE = 5000
+
+
+def _load_vectors(collection_name: str, max_vectors: int, rng: np.random.Generator) -> np.ndarray:
+    collection = get_client().get_collection(collection_name)
+    total = collection.count()
+    keep = min(1.0, max_vectors / total) if total else 1.0
+    parts = []
+    for offset in range(0, total, _PAGE_SIZE):
+        page = collection.get(include=["embeddings"], limit=_PAGE_SIZE, offset=offset)
+        vectors = np.asarray(page["embeddings"], dtype=np.float32)
+        if keep < 1.0:
+            vectors = vectors[rng.random(len(vectors)) < keep]
+        parts.append(vectors)
+    return np.concatenate(parts) if parts else np.empty((0, 0), dtype=np.float32)
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+def exact_neighbours(corpus: np.ndarray, queries: np.ndarray, k: int, space: str, block: int = 50_000) -> np.ndarray:
+    """Brute-force top-k corpus indices per query, nearest first, scanning the corpus in blocks."""
+    if space == "cosine":
+        corpus, queries = _normalize(corpus), _normalize(queries)
+    best_idx = np.empty((len(queries), 0), dtype=np.int64)
+    best_dist = np.empty((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(corpus), block):
+        chunk = corpus[start:start + block]
+        scores = queries @ chunk.T
+        if space == "l2":
+            dist = (chunk * chunk).sum(axis=1)[None, :] - 2 * scores
+        else:
+            dist = -scores
+        idx = np.concatenate([best_idx, np.arange(start, start + len(chunk))[None, :].repeat(len(queries), 0)], axis=1)
+        dist = np.concatenate([best_dist, dist], axis=1)
+        top = np.argpartition(dist, min(k, dist.shape[1] - 1), axis=1)[:, :k]
+        best_idx = np.take_along_axis(idx, top, axis=1)
+        best_dist = np.take_along_axis(dist, top, axis=1)
+    # argpartition leaves the top k unordered, and _recall cuts them to k once the query row is gone
+    order = np.argsort(best_dist, axis=1, kind="stable")
+    return np.take_along_axis(best_idx, order, axis=1)
+
+
+def _recall(approx: np.ndarray, exact: np.ndarray, exclude: np.ndarray | None, k: int) -> float:
+    hits = 0
+    for i, (found, truth) in enumerate(zip(approx, exact)):
+        if exclude is not None:
+            found = found[found != exclude[i]][:k]
+            truth = truth[truth != exclude[i]][:k]
+        hits += len(set(found.tolist()) & set(truth.tolist()))
+    return hits / (len(approx) * k)
+
+
+def sweep(corpus, queries, exclude, k, space, ms, construction_efs, search_efs) -> list[dict]:
+    fetch = k + 1 if exclude is not None else k
+    exact = exact_neighbours(corpus, queries, fetch, space)
+    results = []
+    for m in ms:
+        for construction_ef in construction_efs:
+            index = hnswlib.Index(space=space, dim=corpus.shape[1])
+            index.init_index(max_elements=len(corpus), M=m, ef_construction=construction_ef)
+            started = time.perf_counter()
+            index.add_items(corpus, np.arange(len(corpus)))
+            build_s = time.perf_counter() - started
+            index.set_num_threads(1)
+            for search_ef in search_efs:
+                index.set_ef(max(search_ef, fetch))
+                latencies, found = [], []
+                for query in queries:
+                    started = time.perf_counter()
+                    labels, _ = index.knn_query(query[None, :], k=fetch)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    found.append(labels[0])
+                results.append({
+                    "hnsw_m": m,
+                    "hnsw_construction_ef": construction_ef,
+                    "hnsw_search_ef": search_ef,
+                    "recall": round(_recall(np.asarray(found), exact, exclude, k), 4),
+                    "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                    "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+                    "build_s": round(build_s, 2),
+                })
+                print(
+                    f"M={m:3d} construction_ef={construction_ef:4d} search_ef={search_ef:4d}  "
+                    f"recall@{k}={results[-1]['recall']:.4f}  p95={results[-1]['p95_ms']:.3f}ms"
+                )
+    return results
+
+
+def recommend(results: list[dict], target_recall: float, target_p95_ms: float | None) -> dict | None:
+    """Cheapest configuration meeting both targets: fastest, then smallest graph, then quickest build."""
+    ok = [
+        r for r in results
+        if r["recall"] >= target_recall and (target_p95_ms is None or r["p95_ms"] <= target_p95_ms)
+    ]
+    if not ok:
+        return None
+    return min(ok, key=lambda r: (r["p95_ms"], r["hnsw_m"], r["hnsw_construction_ef"], r["hnsw_search_ef"]))
+
+
+def _apply(url: str, space: str, config: dict):
+    body = {"hnsw_space": space, **{k: config[k] for k in ("hnsw_m", "hnsw_construction_ef", "hnsw_search_ef")}}
+    req = urllib.request.Request(
+        f"{url}/api/settings",
+        data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json"},
+        method="PUT",
+    )
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        resp.read()
+
+
+def _ints(value: str) -> list[int]:
+    return [int(x) for x in value.split(",") if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=settings.retrieval_top_k)
+    parser.add_argument("--queries", type=int, default=500, help="number of sampled queries")
+    parser.add_argument("--questions", help="file with one question per line, embedded with the active model")
+    parser.add_argument("--max-vectors", type=int, default=200_000, help="sample the corpus down to this size")
+    parser.add_argument("--space", choices=["l2", "cosine", "ip"], help="defaults to the active collection's")
+    parser.add_argument("--m", default="8,16,32,48")
+    parser.add_argument("--construction-ef", default="100,200")
+    parser.add_argument("--search-ef", default="10,20,40,80,160,320")
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--target-p95-ms", type=float)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--apply", action="store_true", help="PUT the recommendation to --url")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args()
+
+    async def _load():
+        await init_db()
+        await load_index_state()
+    asyncio.run(_load())
+
+    active = get_active_index()
+    space = args.space or active["spec"].get("hnsw_space", HNSW_DEFAULTS["hnsw_space"])
+    rng = np.random.default_rng(args.seed)
+    corpus = _load_vectors(active["name"], args.max_vectors, rng)
+    if len(corpus) == 0:
+        parser.error(f"collection {active['name']} is empty")
+    print(f"Collection {active['name']}: {len(corpus)} vectors x {corpus.shape[1]} dims, space={space}")
+
+    if args.questions:
+        with open(args.questions) as f:
+            questions = [line.strip() for line in f if line.strip()][:args.queries]
+        queries = np.asarray(get_index_embeddings().embed_queries(questions), dtype=np.float32)
+        exclude = None
+    else:
+        exclude = rng.choice(len(corpus), size=min(args.queries, len(corpus)), replace=False)
+        queries = corpus[exclude]
+
+    results = sweep(
+        corpus, queries, exclude, args.k, space,
+        _ints(args.m), _ints(args.construction_ef), _ints(args.search_ef),
+    )
+    best = recommend(results, args.target_recall, args.target_p95_ms)
+    current = {k: active["spec"].get(k, HNSW_DEFAULTS[k]) for k in ("hnsw_m", "hnsw_construction_ef", "hnsw_search_ef")}
+    print(f"Current: space={active['spec'].get('hnsw_space', 'l2')} {current}")
+    if best is None:
+        print(f"No configuration reaches recall@{args.k} >= {args.target_recall}"
+              + (f" within p95 {args.target_p95_ms}ms" if args.target_p95_ms else ""))
+    else:
+        print(f"Recommended: space={space} M={best['hnsw_m']} construction_ef={best['hnsw_construction_ef']} "
+              f"search_ef={best['hnsw_search_ef']} (recall {best['recall']}, p95 {best['p95_ms']}ms)")
+        print(f"  HNSW_SPACE={space} HNSW_M={best['hnsw_m']} "
+              f"HNSW_CONSTRUCTION_EF={best['hnsw_construction_ef']} HNSW_SEARCH_EF={best['hnsw_search_ef']}")
+        if args.apply:
+            _apply(args.url, space, best)
+            print(f"Applied to {args.url}; the collection is being rebuilt in the background")
+
+    if args.out:
+        report = {
+            "collection": active["name"],
+            "vectors": len(corpus),
+            "space": space,
+            "k": args.k,
+            "target_recall": args.target_recall,
+            "target_p95_ms": args.target_p95_ms,
+            "results": results,
+            "recommended": best,
+        }
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _load_llm_clients():
+    from providers.factory import get_streaming_llm
+    from providers.hedging import provider_order
+    for provider in provider_order():
+        get_streaming_llm(provider)
+
+
+def _load_tokenizer():
+    from rag.packing import PROMPT_ENCODING
+    from rag.tokens import count_tokens
+    count_tokens("warm-up", PROMPT_ENCODING)
+
+
+def _load_retrieval():
+    from vectorstore.chroma import get_index_embeddings, similarity_search_by_vectors
+    # Loads the embedding model (local for Groq) and the collection's index segments
+    vector = get_index_embeddings().embed_query("warm-up")
+    similarity_search_by_vectors([vector], 1)
+
+
+def _load_reranker():
+    from rag.reranking import get_reranker
+    # The first predict pays one-off kernel/graph set-up on top of the weights
+    get_reranker().predict([["warm-up", "warm-up"]])
+
+
+class Warmup:
+    """Loads provider SDKs and models in the background after startup.
+
+    The process answers /api/health as soon as it is up; /api/ready reports
+    warm only once every step has run, so the first chat turn does not pay
+    for the imports, the embedding model or the cross-encoder. A failed step
+    is recorded and does not hold readiness back; the request that needs it
+    will retry and report the error itself.
+    """
+
+    def __init__(self):
+        self.status = "idle"
+        self.started_at: str | None = None
+        self.finished_at: str | None = None
+        self.steps: dict[str, dict] = {}
+        self._task: asyncio.Task | None = None
+
+    def _plan(self) -> list[tuple[str, callable]]:
+        steps = [("llm_clients", _load_llm_clients), ("tokenizer", _load_tokenizer), ("retrieval", _load_retrieval)]
+        if settings.use_reranking:
+            steps.append(("reranker", _load_reranker))
+        return steps
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def start(self):
+        if not settings.warmup_on_startup:
+            self.status = "ready"
+            return
+        if self._task is None:
+            self.status = "warming"
+            self.started_at = datetime.utcnow().isoformat()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        plan = self._plan()
+        self.steps = {name: {"status": "pending"} for name, _ in plan}
+        for name, fn in plan:
+            self.steps[name] = {"status": "running"}
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(fn)
+                self.steps[name] = {"status": "ok"}
+            except Exception as exc:
+                logger.warning("Warm-up step %s failed: %s", name, exc)
+                self.steps[name] = {"status": "failed", "error": str(exc)}
+            self.steps[name]["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self.status = "ready"
+        self.finished_at = datetime.utcnow().isoformat()
+        logger.info("Warm-up finished: %s", {name: step["ms"] for name, step in self.steps.items()})
+
+    def snapshot(self) -> dict:
+        return {
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": self.steps,
+        }
+
+
+warmup = Warmup()
@@ -28,6 +28,7 @@ function HomeContent() {
   const [sidebarCollapsed, setSidebarCollapsed] = useState(false);
   const [isLoading, setIsLoading] = useState(false);
   const [streamingContent, setStreamingContent] = useState("");
+  const [streamingStage, setStreamingStage] = useState("");
 
   const ws = useWebSocket();
   const toast = useToast();
@@ -109,6 +110,7 @@ function HomeContent() {
       setMessages((prev) => [...prev, userMsg]);
       setIsLoading(true);
       setStreamingContent("");
+      setStreamingStage("");
 
       try {
         let fullContent = "";
@@ -120,6 +122,8 @@ function HomeContent() {
             setStreamingContent(fullContent);
           } else if (event.type === "sources" && event.sources) {
             sources = event.sources;
+          } else if (event.type === "stage" && event.stage) {
+            setStreamingStage(event.stage);
           }
         });
 
@@ -145,6 +149,7 @@ function HomeContent() {
       } finally {
         setIsLoading(false);
         setStreamingContent("");
+        setStreamingStage("");
       }
     },
     [activeConvId, ws, refreshConversations, toast]
@@ -205,6 +210,7 @@ function HomeContent() {
               onSend={handleSend}
               isLoading={isLoading}
               streamingContent={streamingContent}
+              streamingStage={streamingStage}
             />
           ) : (
             <DataSourcesPanel />
@@ -12,13 +12,23 @@ interface Props {
   onSend: (message: string) => void;
   isLoading: boolean;
   streamingContent: string;
+  streamingStage?: string;
 }
 
+const STAGE_LABELS: Record<string, string> = {
+  condensing: "Understanding your question...",
+  retrieving: "Searching documents...",
+  reranking: "Ranking results...",
+  postprocessing: "Preparing context...",
+  generating: "Writing answer...",
+};
+
 export default function ChatPanel({
   messages,
   onSend,
   isLoading,
   streamingContent,
+  streamingStage,
 }: Props) {
   const bottomRef = useRef<HTMLDivElement>(null);
 
@@ -97,7 +107,9 @@ export default function ChatPanel({
         {isLoading && !streamingContent && (
           <div className="flex items-center gap-2 text-muted-foreground">
             <LoadingSpinner size={16} />
-            <span className="text-sm">Thinking...</span>
+            <span className="text-sm">
+              {(streamingStage && STAGE_LABELS[streamingStage]) || "Thinking..."}
+            </span>
           </div>
         )}
         <div ref={bottomRef} />
@@ -18,6 +18,11 @@ export default function SourceCard({ source }: { source: Source }) {
         {source.page != null && (
           <span className="text-muted-foreground text-xs">p.{source.page}</span>
         )}
+        {source.rows != null && (
+          <span className="text-muted-foreground text-xs shrink-0">
+            {source.sheet ? `${source.sheet} ` : ""}rows {source.rows}
+          </span>
+        )}
         <span className="ml-auto text-xs text-muted-foreground">
           {(source.relevance_score * 100).toFixed(0)}%
         </span>
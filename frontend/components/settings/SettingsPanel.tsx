@@ -269,6 +269,18 @@ export default function SettingsPanel({ open, onClose }: Props) {
                     description:
                       "Re-scores retrieved documents with a cross-encoder model for higher precision",
                   },
+                  {
+                    key: "use_compression" as const,
+                    label: "Context Compression",
+                    description:
+                      "Keeps only the sentences relevant to the question to shrink the prompt",
+                  },
+                  {
+                    key: "use_doc_routing" as const,
+                    label: "Document Routing",
+                    description:
+                      "Picks the closest documents first, then searches only their chunks",
+                  },
                 ].map((toggle) => (
                   <label
                     key={toggle.key}
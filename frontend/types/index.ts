@@ -1,6 +1,8 @@
 export interface Source {
   doc_name: string;
   page: number | null;
+  sheet?: string | null;
+  rows?: string | null;
   chunk_text: string;
   relevance_score: number;
 }
@@ -10,6 +12,7 @@ export interface Message {
   role: "user" | "assistant";
   content: string;
   sources?: Source[] | null;
+  cancelled?: boolean;
   created_at: string;
 }
 
@@ -18,6 +21,16 @@ export interface Conversation {
   title: string;
   created_at: string;
   updated_at: string;
+  pinned_doc_ids?: string[];
+}
+
+export interface RetrievalFilters {
+  doc_ids?: string[];
+  source_types?: string[];
+  filename_prefix?: string;
+  url_prefix?: string;
+  created_after?: string;
+  created_before?: string;
 }
 
 export interface ConversationDetail extends Conversation {
@@ -69,6 +82,15 @@ export interface Settings {
   use_multi_query: boolean;
   use_hyde: boolean;
   use_reranking: boolean;
+  use_compression: boolean;
+  use_doc_routing: boolean;
+  routing_top_docs: number;
+  hnsw_space: "l2" | "cosine" | "ip";
+  hnsw_m: number;
+  hnsw_construction_ef: number;
+  hnsw_search_ef: number;
+  hedge_providers: string[];
+  hedge_delay_ms: number;
 }
 
 export interface ChatResponse {
@@ -78,7 +100,13 @@ export interface ChatResponse {
 }
 
 export interface StreamEvent {
-  type: "token" | "sources" | "done";
+  type: "token" | "sources" | "stage" | "usage" | "error" | "done";
   content?: string;
   sources?: Source[];
+  stage?: string;
+  elapsed_ms?: number;
+  timings?: Record<string, number>;
+  prompt_tokens?: number;
+  cancelled?: boolean;
+  message?: string;
 }